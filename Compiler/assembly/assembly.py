@@ -1,10 +1,34 @@
+import itertools
 import re
 
+from assembly.peephole import load_rules, apply_rules
+from assembly.scheduler import schedule
+from assembly.target import TARGETS, DEFAULT_TARGET
+from assembly.tiling import Tree, select
+
+OPCODES = dict(TARGETS[DEFAULT_TARGET].mnemonics)
+
+# Relative latency of each instruction on the default target. The
+# optimizer's strength reduction only rewrites an operation when the
+# replacement costs less by this table, and the superoptimizer searches for
+# cheaper sequences by it.
+INSTRUCTION_COSTS = TARGETS[DEFAULT_TARGET].latencies
+
 class AssemblyGenerator:
-    def __init__(self, id_types=None):
+    def __init__(self, id_types=None, target=None):
         self.instructions = []
         self.id_types = id_types if id_types else {}
-        self.registers = ["R1", "R2"] # Restricted to 2 registers as requested
+        self.target = target if target else TARGETS[DEFAULT_TARGET]
+        # Trees taken from each register file so far, for targets that rotate them
+        self.trees = {False: 0, True: 0}
+
+    def registers(self, is_float):
+        """Registers for the next tree of a type, the destination first."""
+        registers = list(self.target.register_file(is_float))
+        if self.target.rotate_registers:
+            start = self.trees[is_float and not self.target.shared_registers] % len(registers)
+            registers = registers[start:] + registers[:start]
+        return registers
 
     def get_type(self, operand):
         """Determine if operand is FLOAT or INT"""
@@ -44,152 +68,126 @@ class AssemblyGenerator:
     def is_literal(self, op):
         return op.replace('.','',1).isdigit()
 
+    def operand_tree(self, raw, pending, materialize, converts=False):
+        """
+        Leaf for an IR operand, or the pending tree of a temp read only
+        here, with the set of names in memory it reads. converts is whether
+        the reader is a FLOAT operation, which converts its operands. On a
+        target with a separate FLOAT register file, those operands are
+        FLOAT leaves and an INT tree crosses over through memory.
+        """
+        operand = self.parse_operand(raw)
+        is_float = self.get_type(raw) == "FLOAT"
+        shared = self.target.shared_registers
+        if converts and not shared:
+            is_float = True
+        if operand in pending:
+            if (converts and shared) or pending[operand][0].is_float == is_float:
+                return pending.pop(operand)
+            # A converted copy loads the temp back from memory, which converts it
+            materialize(operand)
+        is_literal = self.is_literal(operand)
+        return Tree.leaf(operand, is_literal, is_float), set() if is_literal else {operand}
+
     def generate(self, icg_instructions):
+        """
+        Assembly for straight-line IR. Instructions are regrouped into
+        expression trees, a temp read by a single later instruction being
+        folded into it, and each tree is covered by the tiles of
+        assembly.tiling. Other temps are stored, and their readers load them.
+        """
         asm_code = []
-        current_temp_in_r1 = None
-        
+        # The (name, is_float, register) value left by the last tree
+        resident = None
+
+        # A temp read more than once (a shared subexpression) is stored,
+        # since the registers are reused before its later reads
+        temp_reads = {}
+        last_temp = 0
+        for instr in icg_instructions:
+            if '=' in instr:
+                for word in set(re.findall(r'temp\d+', instr.split('=', 1)[1])):
+                    temp_reads[word] = temp_reads.get(word, 0) + 1
+            for number in re.findall(r'temp(\d+)', instr):
+                last_temp = max(last_temp, int(number))
+        spills = itertools.count(last_temp + 1)
+
+        def new_spill():
+            return f"temp{next(spills)}"
+
+        def emit(lhs, tree, store):
+            nonlocal resident
+            registers = self.registers(tree.is_float)
+            in_destination = resident[:2] if resident and resident[2] == registers[0] else None
+            asm_code.extend(select(tree, registers, in_destination, new_spill, self.target))
+            if store:
+                asm_code.append(f"{self.target.opcode('STR', tree.is_float)} {lhs}, {registers[0]}")
+            resident = (lhs, tree.is_float, registers[0])
+            self.trees[tree.is_float and not self.target.shared_registers] += 1
+
+        # temp -> (tree, names it reads) for temps folded into a later reader
+        pending = {}
+
+        def materialize(temp):
+            tree, _ = pending.pop(temp)
+            emit(temp, tree, store=True)
+
         for instr in icg_instructions:
             if '=' not in instr:
                 continue
-                
+
             lhs, rhs = instr.split('=', 1)
             lhs = lhs.strip()
-            rhs = rhs.strip()
-            
-            # Check for binary operation
-            # We support +, -, *, /
-            op_match = re.search(r'([\+\-\*\/])', rhs)
-            
-            if op_match:
-                # Binary Operation
-                op = op_match.group(1)
-                parts = rhs.split(op, 1)
-                op1_raw = parts[0].strip()
-                op2_raw = parts[1].strip()
-                
-                op1 = self.parse_operand(op1_raw)
-                op2 = self.parse_operand(op2_raw)
-                
-                type1 = self.get_type(op1_raw)
-                type2 = self.get_type(op2_raw)
-                
-                is_float_op = (type1 == "FLOAT" or type2 == "FLOAT")
-                
-                # Determine Instruction Suffix
-                suffix = "F" if is_float_op else ""
-                
-                # Map operator to instruction
-                op_map = {
-                    '+': 'ADD',
-                    '-': 'SUB',
-                    '*': 'MUL',
-                    '/': 'DIV'
-                }
-                instr_name = op_map[op] + suffix
-                
-                reg1 = "R1"
-                reg2 = "R2"
-                
-                is_commutative = op in ['+', '*']
-                op1_is_lit = self.is_literal(op1)
-                op2_is_lit = self.is_literal(op2)
-                
-                # Swap if commutative and op1 is lit (to put lit in op2 position)
-                if is_commutative and op1_is_lit and not op2_is_lit:
-                    op1, op2 = op2, op1
-                    op1_is_lit, op2_is_lit = op2_is_lit, op1_is_lit
-                    type1, type2 = type2, type1
-                
-                # Swap if commutative and op2 is in R1 but op1 is not
-                if is_commutative and op2 == current_temp_in_r1 and op1 != current_temp_in_r1:
-                    op1, op2 = op2, op1
-                    op1_is_lit, op2_is_lit = op2_is_lit, op1_is_lit
-                    type1, type2 = type2, type1
-
-                # Generate Code
-                if op1 == current_temp_in_r1:
-                    # R1 has op1
-                    if op2_is_lit:
-                        asm_code.append(f"{instr_name} {reg1}, {reg1}, #{op2}")
-                    else:
-                        # Load op2 into R2
-                        load_instr2 = "LOAD" + ("F" if type2 == "FLOAT" else "")
-                        asm_code.append(f"{load_instr2} {reg2}, {op2}")
-                        asm_code.append(f"{instr_name} {reg1}, {reg1}, {reg2}")
-                        
-                elif op2 == current_temp_in_r1:
-                    # R1 has op2 (and op1 is NOT in R1)
-                    # Non-commutative case (otherwise swapped)
-                    if op1_is_lit:
-                        # Lit - R1
-                        asm_code.append(f"{instr_name} {reg1}, #{op1}, {reg1}")
-                    else:
-                        # Var - R1
-                        load_instr1 = "LOAD" + ("F" if type1 == "FLOAT" else "")
-                        asm_code.append(f"{load_instr1} {reg2}, {op1}")
-                        asm_code.append(f"{instr_name} {reg1}, {reg2}, {reg1}")
-                        
-                else:
-                    # Neither in R1
-                    if op1_is_lit and not op2_is_lit:
-                        # Lit OP Var (Non-commutative, e.g. 3 - y)
-                        # Load op2 to R1
-                        load_instr = "LOAD" + ("F" if type2 == "FLOAT" else "")
-                        asm_code.append(f"{load_instr} {reg1}, {op2}")
-                        # 3 - R1
-                        asm_code.append(f"{instr_name} {reg1}, #{op1}, {reg1}")
-                    else:
-                        # Load op1 to R1
-                        load_instr = "LOAD" + ("F" if type1 == "FLOAT" else "")
-                        if op1_is_lit:
-                            asm_code.append(f"{load_instr} {reg1}, #{op1}")
-                        else:
-                            asm_code.append(f"{load_instr} {reg1}, {op1}")
-                            
-                        if op2_is_lit:
-                            asm_code.append(f"{instr_name} {reg1}, {reg1}, #{op2}")
-                        else:
-                            load_instr2 = "LOAD" + ("F" if type2 == "FLOAT" else "")
-                            asm_code.append(f"{load_instr2} {reg2}, {op2}")
-                            asm_code.append(f"{instr_name} {reg1}, {reg1}, {reg2}")
-                
-                # Store result logic
-                if lhs.startswith('temp'):
-                    current_temp_in_r1 = lhs
-                    self.id_types[lhs] = "FLOAT" if is_float_op else "INT"
-                else:
-                    store_instr = "STR" + ("F" if is_float_op else "")
-                    asm_code.append(f"{store_instr} {lhs}, {reg1}")
-                    current_temp_in_r1 = None
+            operands = rhs.split()
 
-            else:
-                # Simple Assignment: x = y
-                op_raw = rhs
-                op = self.parse_operand(op_raw)
-                type_op = self.get_type(op_raw)
-                
-                reg = "R1"
-                
-                if op == current_temp_in_r1:
-                    # Value already in R1
-                    pass
-                else:
-                    load_instr = "LOAD" + ("F" if type_op == "FLOAT" else "")
-                    if op.replace('.','',1).isdigit():
-                        asm_code.append(f"{load_instr} {reg}, #{op}")
-                    else:
-                        asm_code.append(f"{load_instr} {reg}, {op}")
-                
-                if lhs.startswith('temp'):
-                    current_temp_in_r1 = lhs
-                    self.id_types[lhs] = type_op
+            if len(operands) == 3:
+                op1_raw, op, op2_raw = operands
+                is_float_op = self.get_type(op1_raw) == "FLOAT" or self.get_type(op2_raw) == "FLOAT"
+                left, names = self.operand_tree(op1_raw, pending, materialize, is_float_op)
+                if op2_raw == op1_raw:
+                    right = left
                 else:
-                    store_instr = "STR" + ("F" if type_op == "FLOAT" else "")
-                    asm_code.append(f"{store_instr} {lhs}, {reg}")
-                    current_temp_in_r1 = None
+                    right, right_names = self.operand_tree(op2_raw, pending, materialize, is_float_op)
+                    if len(right_names) > len(names):
+                        names, right_names = right_names, names
+                    names |= right_names
+                tree = Tree.operation(op, left, right, is_float_op)
+                is_float = is_float_op
+            else:
+                # A temp holding a converted value may keep it unconverted:
+                # FLOAT operations convert it, and loading it back does
+                is_float = self.get_type(operands[0]) == "FLOAT"
+                converts = lhs.startswith('temp') and self.target.shared_registers
+                tree, names = self.operand_tree(operands[0], pending, materialize, converts)
+
+            # Trees that read lhs are computed before it changes
+            for temp in [temp for temp, (_, read) in pending.items() if lhs in read]:
+                materialize(temp)
+
+            # Later reads load lhs with the type of its current value
+            self.id_types[lhs] = "FLOAT" if is_float else "INT"
+            if lhs.startswith('temp'):
+                if temp_reads.get(lhs, 0) == 1:
+                    pending[lhs] = (tree, names)
+                    continue
+            emit(lhs, tree, store=not lhs.startswith('temp') or temp_reads.get(lhs, 0) > 1)
 
         return asm_code
 
-def generate_assembly(instructions, id_types):
-    generator = AssemblyGenerator(id_types)
-    return generator.generate(instructions)
+def generate_assembly(instructions, id_types, target=None, peephole=True, schedule_code=True):
+    """
+    Assembly for optimized intermediate code on a target (assembly.target;
+    the default one if None). With peephole, windows the target's rule
+    database (for the default target assembly/peephole_rules.json, built by
+    assembly.superoptimizer) has a cheaper equivalent for are rewritten.
+    With schedule_code, the code is then list-scheduled for the target's
+    pipeline.
+    """
+    target = target if target else TARGETS[DEFAULT_TARGET]
+    generator = AssemblyGenerator(id_types, target)
+    code = generator.generate(instructions)
+    if peephole and target.rules:
+        code = apply_rules(code, load_rules(target.rules))
+    if schedule_code:
+        code = schedule(code, target.pipeline())
+    return code
@@ -0,0 +1,316 @@
+"""
+C source backend: formulas compiled to native batch kernels.
+
+c_source turns an equation, or a formula sheet (a program of statements),
+into a C function computing one row and a kernel looping it over input
+arrays. Each statement is typed by semantic.analyze_statement as it is
+reached, like semantic_analysis does. INT is int64_t and FLOAT is double:
+  - INT arithmetic wraps on overflow.
+  - INT division truncates toward zero.
+  - An INT power with a negative exponent truncates 1 / base^-n.
+A division by zero, or a power without a real value, stops the kernel
+at that row.
+
+build compiles the source with the system C compiler into a shared library
+named by the hash of the source and the compiler command, so a formula
+already built is only loaded. compile_kernel does both and returns a Kernel
+called through ctypes.
+"""
+
+import ctypes
+import hashlib
+import math
+import os
+import subprocess
+import sysconfig
+import tempfile
+from array import array
+from functools import lru_cache
+
+from semantic.semantic import analyze_statement
+from syntax.syntax import statements
+
+CACHE_DIR = os.environ.get("UNICOMPILER_NATIVE_CACHE") or os.path.join(tempfile.gettempdir(), "unicompiler-native")
+# No FMA contraction or fast math: FLOAT results match Python's bit for bit
+CFLAGS = ("-O2", "-shared", "-fPIC", "-fwrapv", "-ffp-contract=off")
+
+C_TYPES = {'INT': "int64_t", 'FLOAT': "double"}
+TYPECODES = {'INT': 'q', 'FLOAT': 'd'}
+
+# Error codes set by the generated code, and their messages (those of the Hybrid executor)
+ERRORS = {
+    1: "Division by zero",
+    2: "Zero raised to a negative power",
+    3: "Power overflows",
+    4: "Negative number raised to a fractional power",
+}
+
+PRELUDE = """\
+#include <math.h>
+#include <stdint.h>
+
+static inline int64_t div_i(int64_t a, int64_t b, int *error) {
+    if (b == 0) { *error = 1; return 0; }
+    if (b == -1) return (int64_t)(0 - (uint64_t)a);
+    return a / b;
+}
+
+static inline double div_f(double a, double b, int *error) {
+    if (b == 0.0) *error = 1;
+    return a / b;
+}
+
+static inline int64_t pow_i(int64_t a, int64_t b, int *error) {
+    if (b < 0) {
+        if (a == 0) *error = 2;
+        if (a == 1 || a == -1) return (b & 1) ? a : 1;
+        return 0;
+    }
+    uint64_t result = 1, base = (uint64_t)a;
+    for (; b; b >>= 1, base *= base)
+        if (b & 1) result *= base;
+    return (int64_t)result;
+}
+
+static inline double pow_f(double a, double b, int *error) {
+    if (a == 0.0 && b < 0.0) { *error = 2; return 0.0; }
+    double result = pow(a, b);
+    if (isinf(result) && isfinite(a) && isfinite(b)) *error = 3;
+    else if (isnan(result) && !isnan(a) && !isnan(b)) *error = 4;
+    return result;
+}
+"""
+
+
+def c_literal(text, type_):
+    if type_ == 'INT':
+        value = int(text)
+        if value >= 2 ** 63:
+            raise ValueError(f"Integer literal {text} does not fit in 64 bits")
+        return f"INT64_C({value})"
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(f"Float literal {text} is out of range")
+    return repr(value)
+
+
+class SourceGenerator:
+    """
+    C for the statements of a syntax tree, given the types of its inputs.
+    Every assignment defines a new local, so a variable may change type
+    between statements; the kernel writes each variable's last value.
+    """
+
+    def __init__(self, id_types):
+        self.id_types = dict(id_types)
+        self.lines = []
+        self.inputs = []        # (name, type, C parameter)
+        self.current = {}       # name -> C expression holding its value
+        self.locals = 0
+
+    def new_local(self, type_, expression):
+        self.locals += 1
+        name = f"t{self.locals}"
+        self.lines.append(f"    const {C_TYPES[type_]} {name} = {expression};")
+        return name
+
+    def read(self, name):
+        if name not in self.current:
+            type_ = self.id_types.get(name, 'INT')
+            self.id_types[name] = type_
+            parameter = f"in{len(self.inputs)}"
+            self.inputs.append((name, type_, parameter))
+            self.current[name] = parameter
+        return self.current[name]
+
+    def expression(self, tree):
+        """C expression for a typed expression tree; operations go to locals, in post-order."""
+        values = {}
+        stack = [(tree, False)]
+        while stack:
+            node, visited = stack.pop()
+            key = id(node)
+            if key in values:
+                continue
+            if node.left is None and node.right is None:
+                value = self.read(node.value) if node.kind == 'name' else c_literal(node.value, node.type)
+            elif not visited:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+                continue
+            else:
+                value = self.operation(node, values[id(node.left)], values[id(node.right)])
+            values[key] = f"(double){value}" if node.convert else value
+        return values[id(tree)]
+
+    def operation(self, node, a, b):
+        is_float = node.type == 'FLOAT'
+        op = node.value
+        if op == '/':
+            expression = f"div_{'f' if is_float else 'i'}({a}, {b}, error)"
+        elif op == '^':
+            # The exponent keeps its type; pow_f takes it as a double
+            expression = f"pow_{'f' if is_float else 'i'}({a}, {b}, error)"
+        else:
+            expression = f"{a} {op} {b}"
+        return self.new_local(node.type, expression)
+
+    def statement(self, statement):
+        """Computes an assignment; returns its target."""
+        typed = analyze_statement(statement, self.id_types)
+        target = typed.left.value
+        expression = self.expression(typed.right)
+        if not expression.isidentifier():
+            # A literal or a conversion
+            expression = self.new_local(self.id_types[target], expression)
+        self.current[target] = expression
+        return target
+
+
+def c_source(tree, id_types, name="formula"):
+    """
+    (source, inputs, outputs) for a syntax tree: an equation or a formula
+    sheet. inputs and outputs are (variable, type) lists, in the order of
+    the C parameters. Besides the row function, the source has:
+      - name(inputs..., &outputs...), returning an error code (0 if none);
+      - name_kernel(rows, input arrays..., output arrays..., &error),
+        returning the row it stopped at, or -1 when every row was computed.
+    The outputs are the assigned variables.
+    """
+    generator = SourceGenerator(id_types)
+    targets = []
+    for statement in statements(tree):
+        if statement is None:
+            continue
+        target = generator.statement(statement)
+        if target not in targets:
+            targets.append(target)
+
+    inputs = [(variable, type_) for variable, type_, _ in generator.inputs]
+    outputs = [(variable, generator.id_types[variable]) for variable in targets]
+    in_types = [C_TYPES[type_] for _, type_ in inputs]
+    out_types = [C_TYPES[type_] for _, type_ in outputs]
+    in_names = [parameter for _, _, parameter in generator.inputs]
+    out_names = [f"out{i}" for i in range(len(outputs))]
+
+    row_parameters = [f"{c} {p}" for c, p in zip(in_types, in_names)] + [f"{c} *{p}" for c, p in zip(out_types, out_names)]
+    kernel_parameters = ([f"const {c} *{p}" for c, p in zip(in_types, in_names)]
+                         + [f"{c} *{p}" for c, p in zip(out_types, out_names)])
+    signature = ", ".join(f"{variable} {type_}" for variable, type_ in inputs)
+    results = ", ".join(f"{variable} {type_}" for variable, type_ in outputs)
+
+    source = [f"/* {name}({signature}) -> {results} */", PRELUDE]
+    source.append(f"static inline void {name}_row({', '.join(row_parameters + ['int *error'])}) {{")
+    source.extend(generator.lines)
+    source.extend(f"    *{p} = {generator.current[variable]};" for p, (variable, _) in zip(out_names, outputs))
+    source.append("}")
+    source.append("")
+    source.append(f"int {name}({', '.join(row_parameters)}) {{")
+    source.append("    int error = 0;")
+    source.append(f"    {name}_row({', '.join(in_names + out_names + ['&error'])});")
+    source.append("    return error;")
+    source.append("}")
+    source.append("")
+    source.append(f"int64_t {name}_kernel({', '.join(['int64_t rows'] + kernel_parameters + ['int *status'])}) {{")
+    source.append("    for (int64_t i = 0; i < rows; i++) {")
+    source.append("        int error = 0;")
+    arguments = [f"{p}[i]" for p in in_names] + [f"&{p}[i]" for p in out_names] + ["&error"]
+    source.append(f"        {name}_row({', '.join(arguments)});")
+    source.append("        if (error) { *status = error; return i; }")
+    source.append("    }")
+    source.append("    return -1;")
+    source.append("}")
+    return "\n".join(source) + "\n", inputs, outputs
+
+
+def build(source, compiler=None, cache_dir=CACHE_DIR):
+    """Path of the shared library built from C source, compiled only if it is not cached yet."""
+    compiler = compiler or os.environ.get("CC") or "cc"
+    command = [compiler, *CFLAGS]
+    digest = hashlib.sha256("\0".join(command + [source]).encode()).hexdigest()
+    path = os.path.join(cache_dir, digest + (sysconfig.get_config_var("SHLIB_SUFFIX") or ".so"))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    source_path = os.path.join(cache_dir, digest + ".c")
+    with open(source_path, "w") as f:
+        f.write(source)
+    # Built under a temporary name, so a concurrent build never loads a partial library
+    fd, partial = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        result = subprocess.run(command + ["-o", partial, source_path, "-lm"], capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(f"C compiler failed:\n{result.stderr}")
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_library(path):
+    return ctypes.CDLL(path)
+
+
+class Kernel:
+    """
+    A formula compiled to native code. kernel(**values) computes one row
+    and returns {output: value}; kernel.run(columns) computes every row of
+    the input columns and returns {output: array}.
+    """
+
+    def __init__(self, library, name, inputs, outputs):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        c_types = {'INT': ctypes.c_int64, 'FLOAT': ctypes.c_double}
+        self.row = getattr(library, name)
+        self.row.argtypes = ([c_types[type_] for _, type_ in inputs]
+                             + [ctypes.POINTER(c_types[type_]) for _, type_ in outputs])
+        self.row.restype = ctypes.c_int
+        self.kernel = getattr(library, f"{name}_kernel")
+        self.kernel.argtypes = ([ctypes.c_int64] + [ctypes.c_void_p] * (len(inputs) + len(outputs))
+                                + [ctypes.POINTER(ctypes.c_int)])
+        self.kernel.restype = ctypes.c_int64
+        self.c_types = c_types
+
+    def __call__(self, **values):
+        results = [self.c_types[type_]() for _, type_ in self.outputs]
+        error = self.row(*[values[variable] for variable, _ in self.inputs], *[ctypes.byref(r) for r in results])
+        if error:
+            raise ValueError(ERRORS[error])
+        return {variable: result.value for (variable, _), result in zip(self.outputs, results)}
+
+    def run(self, columns):
+        """
+        Output arrays for input columns, a mapping of each input to a
+        sequence. An array.array of the input's typecode ('q' for INT,
+        'd' for FLOAT) is used in place; anything else is copied into one.
+        """
+        arrays = []
+        for variable, type_ in self.inputs:
+            column = columns[variable]
+            if not (isinstance(column, array) and column.typecode == TYPECODES[type_]):
+                column = array(TYPECODES[type_], column)
+            arrays.append(column)
+        rows = len(arrays[0]) if arrays else 1
+        if any(len(column) != rows for column in arrays):
+            raise ValueError("Input columns differ in length")
+        results = [array(TYPECODES[type_], [0]) * rows for _, type_ in self.outputs]
+
+        status = ctypes.c_int(0)
+        pointers = [column.buffer_info()[0] for column in arrays + results]
+        stopped = self.kernel(rows, *pointers, ctypes.byref(status))
+        if stopped >= 0:
+            raise ValueError(f"Row {stopped}: {ERRORS[status.value]}")
+        return {variable: result for (variable, _), result in zip(self.outputs, results)}
+
+
+def compile_kernel(tree, id_types, name="formula", compiler=None, cache_dir=CACHE_DIR):
+    """Kernel for a syntax tree (an equation or a formula sheet), given the types of its inputs."""
+    source, inputs, outputs = c_source(tree, id_types, name)
+    return Kernel(load_library(build(source, compiler, cache_dir)), name, inputs, outputs)
@@ -0,0 +1,141 @@
+"""
+Peephole stage for generated assembly, driven by a rule database.
+
+A rule replaces a short window of instructions with a cheaper equivalent
+one. Rules are found offline by the superoptimizer (assembly.superoptimizer)
+and stored as JSON: a pattern and a replacement, where $0, $1, ... stand for
+distinct memory operands, and the registers that may still be read after
+the window. A rule only applies where no other register is live there.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+REGISTERS = ("R1", "R2")
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "peephole_rules.json")
+# How far live_after looks ahead; a register still undecided there counts as live
+LIVENESS_HORIZON = 32
+
+
+def parse_instruction(line):
+    """('ADD', ['R1', 'R1', '#3']) for 'ADD R1, R1, #3'."""
+    opcode, _, operands = line.partition(" ")
+    return opcode, [operand.strip() for operand in operands.split(",")] if operands else []
+
+
+def is_memory(operand):
+    return operand not in REGISTERS and not operand.startswith("#")
+
+
+def reads_writes(opcode, operands):
+    """Registers an instruction reads, and the register it writes (or None)."""
+    if opcode.startswith("LOAD"):
+        return (), operands[0]
+    if opcode.startswith("STR"):
+        return (operands[1],), None
+    return tuple(operand for operand in operands[1:] if operand in REGISTERS), operands[0]
+
+
+def live_after(code, end):
+    """Registers read after code[end - 1] before being written again; code is parsed."""
+    live = set()
+    decided = set()
+    for opcode, operands in code[end:end + LIVENESS_HORIZON]:
+        reads, write = reads_writes(opcode, operands)
+        for register in reads:
+            if register not in decided:
+                live.add(register)
+                decided.add(register)
+        if write is not None:
+            decided.add(write)
+        if len(decided) == len(REGISTERS):
+            return live
+    if end + LIVENESS_HORIZON < len(code):
+        live.update(register for register in REGISTERS if register not in decided)
+    return live
+
+
+def format_instruction(opcode, operands):
+    return f"{opcode} {', '.join(operands)}" if operands else opcode
+
+
+class Rule:
+    __slots__ = ("pattern", "opcodes", "replacement", "live", "cost")
+
+    def __init__(self, pattern, replacement, live, cost=0):
+        self.pattern = [parse_instruction(line) for line in pattern]
+        self.opcodes = tuple(opcode for opcode, _ in self.pattern)
+        self.replacement = [parse_instruction(line) for line in replacement]
+        self.live = frozenset(live)
+        self.cost = cost
+
+    def match(self, code, start):
+        """Memory operand bindings if the pattern matches parsed code at start, else None.
+
+        The caller has already matched the opcodes.
+        """
+        bindings = {}
+        for (_, operands), (_, actual) in zip(self.pattern, code[start:start + len(self.pattern)]):
+            if len(actual) != len(operands):
+                return None
+            for expected, operand in zip(operands, actual):
+                if expected.startswith("$"):
+                    if not is_memory(operand) or bindings.setdefault(expected, operand) != operand:
+                        return None
+                elif expected != operand:
+                    return None
+        # Distinct placeholders were verified as independent operands
+        if len(set(bindings.values())) != len(bindings):
+            return None
+        return bindings
+
+    def instantiate(self, bindings):
+        return [(opcode, [bindings.get(operand, operand) for operand in operands])
+                for opcode, operands in self.replacement]
+
+
+@lru_cache(maxsize=None)
+def load_rules(path=RULES_PATH):
+    """Rules of a database, indexed by the opcodes of their pattern; empty if there is none."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        database = json.load(f)
+    index = {}
+    for entry in database["rules"]:
+        rule = Rule(entry["pattern"], entry["replacement"], entry["live"], entry.get("saves", 0))
+        index.setdefault(rule.opcodes, []).append(rule)
+    for rules in index.values():
+        rules.sort(key=lambda rule: -rule.cost)
+    return index
+
+
+def rewrite_tail(out, code, end, rules, lengths):
+    """Replace the longest window ending out, which code[end:] follows, that a rule matches; whether one did."""
+    for length in lengths:
+        start = len(out) - length
+        if start < 0:
+            continue
+        opcodes = tuple(opcode for opcode, _ in out[start:])
+        for rule in rules.get(opcodes, ()):
+            bindings = rule.match(out, start)
+            if bindings is not None and live_after(code, end) <= rule.live:
+                out[start:] = rule.instantiate(bindings)
+                return True
+    return False
+
+
+def apply_rules(code, rules):
+    """code with every window a rule matches replaced. Each rewrite lowers the cost, so this ends."""
+    if not rules:
+        return code
+    code = [parse_instruction(line) for line in code]
+    lengths = sorted({len(opcodes) for opcodes in rules}, reverse=True)
+    out = []
+    for end, instruction in enumerate(code, 1):
+        out.append(instruction)
+        # A rewrite may complete another window that ends with it
+        while rewrite_tail(out, code, end, rules, lengths):
+            pass
+    return [format_instruction(opcode, operands) for opcode, operands in out]
@@ -0,0 +1,139 @@
+"""
+List scheduling of straight-line assembly for a pipelined target.
+
+The target issues up to issue_width instructions a cycle, in order, and
+an instruction waits until the registers and memory it reads or writes
+are ready: a result is ready latency(opcode) cycles after its instruction
+issues. schedule builds the data-dependence graph (true, anti and output
+dependences on registers and on every name in memory) and lists instructions
+cycle by cycle, the ready one with the longest latency path to the end of
+the program first, so that long MULF and DIVF results get independent
+work issued behind them.
+"""
+
+import heapq
+
+from assembly.peephole import parse_instruction
+
+
+class Pipeline:
+    """
+    A pipelined target: result latency in cycles by opcode, instructions
+    issued per cycle, and how its loads, stores and immediates are spelled.
+    """
+
+    def __init__(self, latencies, issue_width=1, default_latency=1, load="LOAD", store="STR",
+                 immediate_prefix="#"):
+        self.latencies = dict(latencies)
+        self.issue_width = issue_width
+        self.default_latency = default_latency
+        self.load = load
+        self.store = store
+        self.immediate_prefix = immediate_prefix
+
+    def latency(self, opcode):
+        return self.latencies.get(opcode, self.default_latency)
+
+    def accesses(self, opcode, operands):
+        """Registers and memory names an instruction reads, and those it writes."""
+        if opcode.startswith(self.store):
+            return [operands[1]], [operands[0]]
+        sources = [operand for operand in operands[1:] if not operand.startswith(self.immediate_prefix)]
+        return sources, [operands[0]]
+
+
+def simulate(code, pipeline):
+    """(cycles, stall cycles) for parsed instructions issued in order on a pipeline."""
+    ready = {}
+    cycle = issued = stalls = finish = 0
+    for opcode, operands in code:
+        reads, writes = pipeline.accesses(opcode, operands)
+        next_slot = cycle if issued < pipeline.issue_width else cycle + 1
+        start = max([next_slot] + [ready.get(name, 0) for name in reads + writes])
+        stalls += start - next_slot
+        if start != cycle:
+            cycle, issued = start, 0
+        issued += 1
+        done = start + pipeline.latency(opcode)
+        for name in writes:
+            ready[name] = done
+        finish = max(finish, done)
+    return finish, stalls
+
+
+def dependences(code, pipeline):
+    """successors[i] = [(j, latency)]: instruction j may issue latency cycles after i, at the earliest."""
+    successors = [[] for _ in code]
+    last_write = {}
+    readers = {}
+    for j, (opcode, operands) in enumerate(code):
+        reads, writes = pipeline.accesses(opcode, operands)
+        for name in reads:
+            if name in last_write:
+                i = last_write[name]
+                successors[i].append((j, pipeline.latency(code[i][0])))
+            readers.setdefault(name, []).append(j)
+        for name in writes:
+            if name in last_write:
+                i = last_write[name]
+                successors[i].append((j, pipeline.latency(code[i][0])))
+            # A later write may issue with the last read, listed after it
+            for i in readers.pop(name, ()):
+                if i != j:
+                    successors[i].append((j, 0))
+            last_write[name] = j
+    return successors
+
+
+def list_schedule(code, pipeline):
+    """Parsed instructions in the order list scheduling issues them."""
+    successors = dependences(code, pipeline)
+    predecessors = [0] * len(code)
+    for edges in successors:
+        for j, _ in edges:
+            predecessors[j] += 1
+
+    # Priority: the longest latency path from an instruction to the end
+    height = [0] * len(code)
+    for i in reversed(range(len(code))):
+        height[i] = max([pipeline.latency(code[i][0])] + [latency + height[j] for j, latency in successors[i]])
+
+    earliest = [0] * len(code)
+    waiting = [(0, i) for i in range(len(code)) if not predecessors[i]]     # (earliest cycle, i)
+    heapq.heapify(waiting)
+    ready = []      # (-height, i), for instructions that may issue now
+    order = []
+    cycle = 0
+    while len(order) < len(code):
+        while waiting and waiting[0][0] <= cycle:
+            i = heapq.heappop(waiting)[1]
+            heapq.heappush(ready, (-height[i], i))
+        if not ready:
+            cycle = waiting[0][0]
+            continue
+        issued = 0
+        while ready and issued < pipeline.issue_width:
+            i = heapq.heappop(ready)[1]
+            order.append(i)
+            issued += 1
+            for j, latency in successors[i]:
+                earliest[j] = max(earliest[j], cycle + latency)
+                predecessors[j] -= 1
+                if not predecessors[j]:
+                    if earliest[j] <= cycle:
+                        # Issues in this cycle if a slot is left
+                        heapq.heappush(ready, (-height[j], j))
+                    else:
+                        heapq.heappush(waiting, (earliest[j], j))
+        cycle += 1
+    return [code[i] for i in order]
+
+
+def schedule(lines, pipeline):
+    """lines reordered to stall less on pipeline; unchanged if that does not take fewer cycles."""
+    code = [parse_instruction(line) for line in lines]
+    scheduled = list_schedule(code, pipeline)
+    if simulate(scheduled, pipeline) >= simulate(code, pipeline):
+        return list(lines)
+    position = {id(instruction): i for i, instruction in enumerate(code)}
+    return [lines[position[id(instruction)]] for instruction in scheduled]
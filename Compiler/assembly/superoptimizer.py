@@ -0,0 +1,429 @@
+"""
+Offline superoptimizer for short windows of generated assembly.
+
+The target has two registers and a handful of instructions, so the
+cheapest sequence equivalent to a short window can be found by exhaustive
+search. Windows are collected from the assembly the back end generates
+for a corpus of programs, with memory operands abstracted to $0, $1, ...
+For each frequent window, sequences of up to --max-length instructions
+built from its operands, literals and instruction family are searched
+cheapest first (by INSTRUCTION_COSTS). Candidates are run on random inputs
+alongside the window, and states the two reach identically are merged.
+A candidate that leaves the same values in memory and in the registers
+still live after the window is then checked symbolically: INT values as
+polynomials, FLOAT values as expressions normalized only by exact
+identities. Verified rewrites are written to the peephole rule database
+that generate_assembly loads.
+
+    cd Compiler && python -m assembly.superoptimizer [--programs 200] [--windows 400] [--max-length 3]
+"""
+
+import argparse
+import heapq
+import json
+import random
+import time
+from collections import Counter
+from itertools import count
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+from optimization.optimizer import optimize_code
+from assembly.assembly import generate_assembly, INSTRUCTION_COSTS
+from assembly.peephole import (REGISTERS, RULES_PATH, parse_instruction, format_instruction, is_memory,
+                               reads_writes, live_after)
+
+ARITHMETIC = ("ADD", "SUB", "MUL", "DIV")
+TEST_VECTORS = 8
+
+
+def split_opcode(opcode):
+    """('ADD', True) for ADDF: the base operation and whether it is the FLOAT form."""
+    if opcode.endswith("F"):
+        return opcode[:-1], True
+    return opcode, False
+
+
+def run(code, domain, memory, registers):
+    """Registers and stored memory after parsed instructions, in a value domain."""
+    registers = dict(registers)
+    memory = dict(memory)
+    stores = {}
+    for opcode, operands in code:
+        step(domain, opcode, operands, registers, memory, stores)
+    return registers, stores
+
+
+def step(domain, opcode, operands, registers, memory, stores):
+    def read(operand):
+        if operand in REGISTERS:
+            return registers.get(operand)
+        if operand.startswith("#"):
+            return domain.constant(operand[1:])
+        return memory.get(operand)
+
+    base, is_float = split_opcode(opcode)
+    if base == "LOAD":
+        registers[operands[0]] = domain.load(read(operands[1]), is_float)
+    elif base == "STR":
+        memory[operands[0]] = stores[operands[0]] = domain.store(registers.get(operands[1]), is_float)
+    else:
+        registers[operands[0]] = domain.arith(base, is_float, read(operands[1]), read(operands[2]))
+
+
+class Concrete:
+    """Python ints and floats; None is an undefined value (a division by zero, or a type mismatch)."""
+
+    @staticmethod
+    def constant(text):
+        return float(text) if "." in text else int(text)
+
+    @staticmethod
+    def load(value, is_float):
+        if value is None or (isinstance(value, float) and not is_float):
+            return None
+        return float(value) if is_float else value
+
+    @staticmethod
+    def store(value, is_float):
+        if value is None or isinstance(value, float) != is_float:
+            return None
+        return value
+
+    @staticmethod
+    def arith(base, is_float, a, b):
+        if a is None or b is None:
+            return None
+        if is_float:
+            a, b = float(a), float(b)
+        elif isinstance(a, float) or isinstance(b, float):
+            return None
+        if base == "ADD":
+            return a + b
+        if base == "SUB":
+            return a - b
+        if base == "MUL":
+            return a * b
+        if b == 0:
+            return None
+        if is_float:
+            return a / b
+        quotient = abs(a) // abs(b)
+        return quotient if (a < 0) == (b < 0) else -quotient
+
+
+class Symbolic:
+    """
+    ('I', polynomial) and ('F', expression) values. A polynomial is a
+    sorted tuple of (monomial, coefficient), a monomial a sorted tuple of
+    atoms: inputs, and INT quotients, which are kept whole. Expressions are
+    only normalized by exact identities: operand order of ADDF and MULF,
+    x * 1.0, x / 1.0, x - 0.0 and folding of literal operations.
+    """
+
+    @staticmethod
+    def polynomial(terms):
+        return ("I", tuple(sorted((monomial, c) for monomial, c in terms.items() if c)))
+
+    @classmethod
+    def constant(cls, text):
+        if "." in text:
+            return ("F", ("lit", float(text)))
+        return cls.polynomial({(): int(text)})
+
+    @classmethod
+    def input(cls, name, is_float):
+        return ("F", ("in", name)) if is_float else cls.polynomial({(name,): 1})
+
+    @staticmethod
+    def constant_term(value):
+        """The int of a constant polynomial, or None."""
+        terms = value[1]
+        if not terms:
+            return 0
+        if len(terms) == 1 and terms[0][0] == ():
+            return terms[0][1]
+        return None
+
+    @classmethod
+    def to_float(cls, value):
+        if value[0] == "F":
+            return value
+        c = cls.constant_term(value)
+        return ("F", ("lit", float(c)) if c is not None else ("conv", value[1]))
+
+    @classmethod
+    def load(cls, value, is_float):
+        if value is None or (value[0] == "F" and not is_float):
+            return None
+        return cls.to_float(value) if is_float else value
+
+    @staticmethod
+    def store(value, is_float):
+        if value is None or (value[0] == "F") != is_float:
+            return None
+        return value
+
+    @classmethod
+    def arith(cls, base, is_float, a, b):
+        if a is None or b is None:
+            return None
+        if is_float:
+            return cls.float_arith(base, cls.to_float(a)[1], cls.to_float(b)[1])
+        if a[0] == "F" or b[0] == "F":
+            return None
+
+        x, y = dict(a[1]), dict(b[1])
+        if base in ("ADD", "SUB"):
+            sign = 1 if base == "ADD" else -1
+            for monomial, c in y.items():
+                x[monomial] = x.get(monomial, 0) + sign * c
+            return cls.polynomial(x)
+        if base == "MUL":
+            product = {}
+            for m1, c1 in x.items():
+                for m2, c2 in y.items():
+                    monomial = tuple(sorted(m1 + m2))
+                    product[monomial] = product.get(monomial, 0) + c1 * c2
+            return cls.polynomial(product)
+
+        divisor, dividend = cls.constant_term(b), cls.constant_term(a)
+        if divisor == 0:
+            return None
+        if divisor == 1:
+            return a
+        if divisor is not None and dividend is not None:
+            return cls.polynomial({(): Concrete.arith("DIV", False, dividend, divisor)})
+        return cls.polynomial({(repr(("div", a[1], b[1])),): 1})
+
+    @staticmethod
+    def float_arith(base, x, y):
+        if x[0] == "lit" and y[0] == "lit":
+            value = Concrete.arith(base, True, x[1], y[1])
+            return ("F", ("lit", value)) if value is not None else None
+        if base in ("MUL", "DIV") and y == ("lit", 1.0):
+            return ("F", x)
+        if base == "MUL" and x == ("lit", 1.0):
+            return ("F", y)
+        if base == "SUB" and y == ("lit", 0.0):
+            return ("F", x)
+        if base in ("ADD", "MUL"):
+            x, y = sorted((x, y), key=repr)
+        return ("F", (base, x, y))
+
+
+class Window:
+    """An abstracted window of assembly and what it reads, writes and leaves live."""
+
+    def __init__(self, lines, live):
+        self.lines = list(lines)
+        self.code = [parse_instruction(line) for line in lines]
+        self.live = frozenset(live)
+        self.cost = sequence_cost(self.code)
+
+        self.loaded, self.stored, self.literals = [], [], []
+        self.families = set()
+        self.float_inputs = {}      # input -> whether it is a FLOAT value
+        written = set()
+        for opcode, operands in self.code:
+            base, is_float = split_opcode(opcode)
+            reads, write = reads_writes(opcode, operands)
+            for register in reads:
+                if register not in written:
+                    self.float_inputs.setdefault(register, is_float)
+            if base == "STR":
+                self.add(self.stored, operands[0])
+            else:
+                if base != "LOAD":
+                    self.families.add(is_float)
+                source_operands = operands[1:]
+                for operand in source_operands:
+                    if operand.startswith("#"):
+                        self.add(self.literals, operand)
+                    elif is_memory(operand):
+                        self.add(self.loaded, operand)
+                        if not is_float:
+                            self.float_inputs[operand] = False
+                        else:
+                            self.float_inputs.setdefault(operand, True)
+            if write is not None:
+                written.add(write)
+        if not self.families:
+            self.families.add(any(split_opcode(opcode)[1] for opcode, _ in self.code))
+        zero = "#0.0" if self.families == {True} else "#0"
+        self.add(self.literals, zero)
+
+    @staticmethod
+    def add(items, item):
+        if item not in items:
+            items.append(item)
+
+    def inputs(self, domain, rng=None):
+        memory, registers = {}, {}
+        for name, is_float in self.float_inputs.items():
+            if domain is Symbolic:
+                value = Symbolic.input(name, is_float)
+            elif is_float:
+                value = rng.uniform(-1000, 1000)
+            else:
+                value = rng.choice((rng.randint(-9, 9), rng.randint(-10**6, 10**6)))
+            (registers if name in REGISTERS else memory)[name] = value
+        return memory, registers
+
+    def alphabet(self):
+        """Every instruction a replacement may use: (cost, opcode, operands)."""
+        used = {opcode for opcode, _ in self.code}
+        suffixes = ["F" if is_float else "" for is_float in sorted(self.families)]
+        loads = sorted(used & {"LOAD", "LOADF"} | {"LOAD" + suffix for suffix in suffixes})
+        stores = sorted(used & {"STR", "STRF"})
+        sources = list(REGISTERS) + self.literals
+
+        instructions = []
+        for register in REGISTERS:
+            for opcode in loads:
+                for operand in self.loaded + self.literals:
+                    if opcode == "LOADF" or "." not in operand:
+                        instructions.append((opcode, [register, operand]))
+            for suffix in suffixes:
+                for base in ARITHMETIC:
+                    for a in sources:
+                        for b in sources:
+                            if a in REGISTERS or b in REGISTERS:
+                                instructions.append((base + suffix, [register, a, b]))
+            for opcode in stores:
+                for name in self.stored:
+                    instructions.append((opcode, [name, register]))
+        return [(INSTRUCTION_COSTS[opcode], opcode, operands) for opcode, operands in instructions]
+
+    def outcome(self, registers, stores):
+        return (tuple(registers.get(r) for r in sorted(self.live)), tuple(sorted(stores.items())))
+
+
+def sequence_cost(code):
+    """Cost of parsed instructions; a memory operand of an operation costs a load, as in instruction selection."""
+    cost = 0
+    for opcode, operands in code:
+        cost += INSTRUCTION_COSTS[opcode]
+        base, is_float = split_opcode(opcode)
+        if base in ARITHMETIC:
+            cost += INSTRUCTION_COSTS["LOADF" if is_float else "LOAD"] * sum(map(is_memory, operands[1:]))
+    return cost
+
+
+def fingerprint(states):
+    return tuple((tuple(registers.get(r) for r in REGISTERS), tuple(sorted(stores.items())))
+                 for registers, memory, stores in states)
+
+
+def superoptimize(window, max_length, deadline, seed=0):
+    """Cheapest verified replacement for a window, as parsed instructions, or None."""
+    rng = random.Random(seed)
+    vectors = [window.inputs(Concrete, rng) for _ in range(TEST_VECTORS)]
+    target = []
+    for memory, registers in vectors:
+        outcome = window.outcome(*run(window.code, Concrete, memory, registers))
+        if any(value is None for value in outcome[0]) or any(value is None for _, value in outcome[1]):
+            return None
+        target.append(outcome)
+    symbolic_inputs = window.inputs(Symbolic)
+    expected = window.outcome(*run(window.code, Symbolic, *symbolic_inputs))
+
+    alphabet = window.alphabet()
+    start = [(dict(registers), dict(memory), {}) for memory, registers in vectors]
+    best = {fingerprint(start): 0}
+    order = count()
+    heap = [(0, next(order), (), start)]
+    while heap:
+        if time.perf_counter() > deadline:
+            return None
+        cost, _, sequence, states = heapq.heappop(heap)
+        if best.get(fingerprint(states), cost) < cost:
+            continue
+        if all(window.outcome(registers, stores) == goal
+                            for (registers, _, stores), goal in zip(states, target)):
+            code = [(opcode, operands) for opcode, operands in sequence]
+            if window.outcome(*run(code, Symbolic, *symbolic_inputs)) == expected:
+                return code
+        if len(sequence) == max_length:
+            continue
+        for instruction_cost, opcode, operands in alphabet:
+            new_cost = cost + instruction_cost
+            if new_cost >= window.cost:
+                continue
+            new_states = []
+            for registers, memory, stores in states:
+                registers, memory, stores = dict(registers), dict(memory), dict(stores)
+                step(Concrete, opcode, operands, registers, memory, stores)
+                new_states.append((registers, memory, stores))
+            key = fingerprint(new_states)
+            if best.get(key, new_cost + 1) <= new_cost:
+                continue
+            best[key] = new_cost
+            heapq.heappush(heap, (new_cost, next(order), sequence + ((opcode, operands),), new_states))
+    return None
+
+
+def abstract(window):
+    """The parsed window with memory operands renamed $0, $1, ... in order of appearance."""
+    names = {}
+    result = []
+    for opcode, operands in window:
+        operands = [names.setdefault(o, f"${len(names)}") if is_memory(o) else o for o in operands]
+        result.append(f"{opcode} {', '.join(operands)}")
+    return tuple(result)
+
+
+def collect_windows(programs, window_size, seed=0):
+    """Counter of (abstract window, live registers after it) over a corpus's generated assembly."""
+    windows = Counter()
+    for n in range(programs):
+        tokens, id_map = program_tokens(60, seed=seed + n, statement_nodes=14, inputs=4, float_share=0.05)
+        types = input_types(tokens, seed=seed + n, float_share=0.2)
+        tree = semantic_analysis(build_syntax_tree(tokens), dict(types))
+        ids = {id_map[name]: t for name, t in types.items()}
+        optimized = optimize_code(generate_intermediate_code(tree, id_map))
+        # Windows of the code the peephole stage sees: not yet rewritten or scheduled
+        lines = generate_assembly(optimized, ids, peephole=False, schedule_code=False)
+        code = [parse_instruction(line) for line in lines]
+        for length in range(1, window_size + 1):
+            for i in range(len(code) - length + 1):
+                live = frozenset(live_after(code, i + length))
+                windows[abstract(code[i:i + length]), live] += 1
+    return windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--programs", type=int, default=200, help="corpus programs to collect windows from")
+    parser.add_argument("--window", type=int, default=4, help="longest window, in instructions")
+    parser.add_argument("--windows", type=int, default=400, help="most frequent windows to search")
+    parser.add_argument("--max-length", type=int, default=3, help="longest replacement searched")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="seconds of search per window")
+    parser.add_argument("--out", default=RULES_PATH)
+    args = parser.parse_args()
+
+    windows = collect_windows(args.programs, args.window)
+    rules = []
+    for (lines, live), frequency in windows.most_common(args.windows):
+        window = Window(lines, live)
+        start = time.perf_counter()
+        code = superoptimize(window, args.max_length, start + args.time_limit)
+        if code is None:
+            continue
+        replacement = [format_instruction(opcode, operands) for opcode, operands in code]
+        saves = window.cost - sequence_cost(code)
+        print(f"{' ; '.join(lines)}  ->  {' ; '.join(replacement)}  (saves {saves}, seen {frequency}x, "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms)")
+        rules.append({"pattern": list(lines), "replacement": replacement, "live": sorted(live),
+                      "saves": saves, "seen": frequency})
+
+    with open(args.out, "w") as f:
+        json.dump({"costs": INSTRUCTION_COSTS, "rules": rules}, f, indent=1)
+        f.write("\n")
+    print(f"{len(rules)} rules from {min(args.windows, len(windows))} windows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
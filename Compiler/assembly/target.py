@@ -0,0 +1,126 @@
+"""
+Target descriptions for the assembly backend.
+
+A Target names the machine code is generated for: its register files,
+which operations take an immediate operand and whether they take memory
+operands, the latency (cycles until the result is ready) and size (bytes)
+of each opcode, how many instructions issue per cycle, and how
+instructions are spelled. Instruction selection picks the cheapest tiles
+by its latencies, the scheduler plans for its pipeline, and the same IR
+can be compiled for each target and the results compared.
+"""
+
+from assembly.peephole import RULES_PATH, parse_instruction
+from assembly.scheduler import Pipeline, simulate
+
+OPERATORS = '+-*/^'
+
+
+class Target:
+    """A machine description; see the module docstring. Targets are looked up by name in TARGETS."""
+
+    def __init__(self, name, description, registers, float_registers=None, immediates=OPERATORS,
+                 memory_operands=True, latencies=None, sizes=None, issue_width=1, rotate_registers=False,
+                 mnemonics=None, load="LOAD", store="STR", float_suffix="F", immediate_prefix="#", rules=None):
+        self.name = name
+        self.description = description
+        # FLOAT values share the INT registers unless float_registers is given
+        self.registers = tuple(registers)
+        self.float_registers = tuple(float_registers) if float_registers else None
+        self.immediates = frozenset(immediates)
+        self.memory_operands = memory_operands
+        self.latencies = dict(latencies or {})
+        self.sizes = dict(sizes or {})
+        self.issue_width = issue_width
+        # Start each tree in the next register, so independent trees can overlap
+        self.rotate_registers = rotate_registers
+        self.mnemonics = dict(mnemonics or {'+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', '^': 'POW'})
+        self.load = load
+        self.store = store
+        self.float_suffix = float_suffix
+        self.immediate_prefix = immediate_prefix
+        # Peephole rule database found for this target, or None
+        self.rules = rules
+
+    def __repr__(self):
+        return f"Target({self.name!r})"
+
+    @property
+    def shared_registers(self):
+        return self.float_registers is None
+
+    def register_file(self, is_float):
+        return self.float_registers if is_float and not self.shared_registers else self.registers
+
+    def opcode(self, operation, is_float):
+        """Mnemonic of an operator ('+') or of a load or store ('LOAD', 'STR') on INT or FLOAT values."""
+        base = {"LOAD": self.load, "STR": self.store}.get(operation) or self.mnemonics[operation]
+        return base + self.float_suffix if is_float else base
+
+    def immediate(self, value):
+        return f"{self.immediate_prefix}{value}"
+
+    def latency(self, opcode):
+        return self.latencies.get(opcode, 1)
+
+    def size(self, opcode):
+        return self.sizes.get(opcode, 4)
+
+    def code_size(self, assembly_code):
+        """Bytes of assembly lines."""
+        return sum(self.size(line.split()[0]) for line in assembly_code)
+
+    def pipeline(self):
+        return Pipeline(self.latencies, self.issue_width, load=self.load, store=self.store,
+                        immediate_prefix=self.immediate_prefix)
+
+    def simulate(self, assembly_code):
+        """(cycles, stall cycles) of assembly lines on the target's pipeline."""
+        return simulate([parse_instruction(line) for line in assembly_code], self.pipeline())
+
+
+TARGETS = {}
+
+
+def register_target(target):
+    TARGETS[target.name] = target
+    return target
+
+
+register_target(Target(
+    "embedded", "two shared registers, single issue, immediate and memory operands",
+    registers=("R1", "R2"),
+    latencies={
+        'ADD': 1, 'SUB': 1, 'MUL': 3, 'DIV': 20,
+        'ADDF': 3, 'SUBF': 3, 'MULF': 4, 'DIVF': 14,
+        'POW': 30, 'POWF': 40,
+        'LOAD': 2, 'LOADF': 2, 'STR': 2, 'STRF': 2,
+    },
+    # 16-bit encodings for INT arithmetic, 32-bit for the rest
+    sizes={'ADD': 2, 'SUB': 2, 'MUL': 2, 'DIV': 2},
+    rules=RULES_PATH,
+))
+
+register_target(Target(
+    "wide", "8 INT and 8 FLOAT registers, 4-issue load/store machine, no immediate division",
+    registers=[f"R{i}" for i in range(1, 9)],
+    float_registers=[f"F{i}" for i in range(1, 9)],
+    immediates='+-*',
+    memory_operands=False,
+    latencies={
+        'ADD': 1, 'SUB': 1, 'MUL': 3, 'DIV': 12,
+        'ADDF': 2, 'SUBF': 2, 'MULF': 4, 'DIVF': 10,
+        'POW': 20, 'POWF': 24,
+        'LOAD': 3, 'LOADF': 3, 'STR': 1, 'STRF': 1,
+    },
+    issue_width=4,
+    rotate_registers=True,
+))
+
+DEFAULT_TARGET = "embedded"
+
+
+def add_target_arguments(parser):
+    names = ", ".join(f"{name}: {target.description}" for name, target in TARGETS.items())
+    parser.add_argument("--target", choices=sorted(TARGETS), default=DEFAULT_TARGET,
+                        help=f"machine to generate assembly for (default: {DEFAULT_TARGET}; {names})")
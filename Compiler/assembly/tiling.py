@@ -0,0 +1,252 @@
+"""
+Instruction selection by tree tiling.
+
+An expression tree is covered by tiles from TILES, a table of instruction
+patterns over the shapes of an operation's operands: an immediate, a value
+in memory, a value computed into a register, the same value as the other
+operand, or a value computed and spilled to memory when no second register
+is free. Which tiles a target allows follows its description (see
+assembly.target): the operations that take an immediate, and whether
+operations read memory or only loads do. For every node and number of free
+registers, dynamic programming keeps the cheapest cover by the target's
+latencies, then the smallest in bytes, and select emits it.
+"""
+
+IMM, MEM, REG, SAME, SPILL = "imm", "mem", "reg", "same", "spill"
+COMMUTATIVE = frozenset('+*')
+
+
+class Tile:
+    """
+    An instruction pattern. left and right are operand shapes; for REG
+    operands, first says which is computed first, into the destination
+    register {d}; the other goes to the next free register {s}, which
+    also holds a value a tile loads itself. memory_operand is whether the
+    operation reads its MEM or SPILL operand from memory.
+    """
+
+    __slots__ = ("name", "left", "right", "template", "first", "memory_operand", "computed", "scratch")
+
+    def __init__(self, name, left, right, template, first="left", memory_operand=False):
+        self.name = name
+        self.left = left
+        self.right = right
+        self.template = template
+        self.first = first
+        self.memory_operand = memory_operand
+        # (operand index, shape) of the operands computed, in order
+        computed = [(i, shape) for i, shape in enumerate((left, right)) if shape in (REG, SPILL)]
+        self.computed = tuple(reversed(computed) if first == "right" else computed)
+        self.scratch = template is not None and any("{s}" in line for line in template)
+
+
+TILES = (
+    # Leaves: the template is None for a value already in {d}
+    Tile("load-imm", IMM, None, ("{load} {d}, {a}",)),
+    Tile("load-mem", MEM, None, ("{load} {d}, {a}",)),
+    Tile("resident", REG, None, None),
+    # Operations
+    Tile("reg-imm", REG, IMM, ("{op} {d}, {d}, {b}",)),
+    Tile("imm-reg", IMM, REG, ("{op} {d}, {a}, {d}",), first="right"),
+    Tile("reg-mem", REG, MEM, ("{op} {d}, {d}, {b}",), memory_operand=True),
+    Tile("mem-reg", MEM, REG, ("{op} {d}, {a}, {d}",), first="right", memory_operand=True),
+    Tile("reg-same", REG, SAME, ("{op} {d}, {d}, {d}",)),
+    Tile("reg-reg", REG, REG, ("{op} {d}, {d}, {s}",)),
+    Tile("reg-reg-reversed", REG, REG, ("{op} {d}, {s}, {d}",), first="right"),
+    Tile("reg-spill", REG, SPILL, ("{op} {d}, {d}, {b}",), first="right", memory_operand=True),
+    Tile("spill-reg", SPILL, REG, ("{op} {d}, {a}, {d}",), memory_operand=True),
+    # Spills on a load/store target, loaded back into {s}
+    Tile("reg-reload", REG, SPILL, ("{load} {s}, {b}", "{op} {d}, {d}, {s}"), first="right"),
+    Tile("reload-reg", SPILL, REG, ("{load} {s}, {a}", "{op} {d}, {s}, {d}")),
+)
+
+
+class Tree:
+    """An operation on two subtrees, or a leaf: a literal or a name in memory."""
+
+    __slots__ = ("op", "left", "right", "value", "is_literal", "is_float")
+
+    def __init__(self, op=None, left=None, right=None, value=None, is_literal=False, is_float=False):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.value = value
+        self.is_literal = is_literal
+        self.is_float = is_float
+
+    @classmethod
+    def leaf(cls, value, is_literal, is_float):
+        return cls(value=value, is_literal=is_literal, is_float=is_float)
+
+    @classmethod
+    def operation(cls, op, left, right, is_float):
+        return cls(op, left, right, is_float=is_float)
+
+
+def fits(shape, node, other):
+    if shape == IMM:
+        return node.op is None and node.is_literal
+    if shape == MEM:
+        return node.op is None and not node.is_literal
+    if shape == SAME:
+        return node is other
+    # Spilling a leaf only moves it to memory, where it already is
+    return shape == REG or node.op is not None
+
+
+def allowed(tile, op, target):
+    """Whether the target has the instruction a tile emits for op."""
+    if tile.memory_operand and not target.memory_operands:
+        return False
+    return op is None or IMM not in (tile.left, tile.right) or op in target.immediates
+
+
+def tile_cost(tile, op, is_float, target):
+    """
+    (cost, size) of a tile's own instructions: the latency and bytes of
+    each, with a load per memory operand and a store per spill.
+    """
+    if tile.template is None:
+        return 0, 0
+    load = target.opcode("LOAD", is_float)
+    opcodes = [load if line.startswith("{load}") else target.opcode(op, is_float) for line in tile.template]
+    cost = sum(target.latency(opcode) for opcode in opcodes)
+    size = sum(target.size(opcode) for opcode in opcodes)
+    for shape in (tile.left, tile.right):
+        if shape in (MEM, SPILL) and tile.memory_operand:
+            cost += target.latency(load)
+        if shape == SPILL:
+            store = target.opcode("STR", is_float)
+            cost += target.latency(store)
+            size += target.size(store)
+    return cost, size
+
+
+def postorder(tree):
+    order = []
+    seen = set()
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in seen:
+            continue
+        if expanded or node.op is None:
+            seen.add(id(node))
+            order.append(node)
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+    return order
+
+
+def cover(tree, registers, resident, target):
+    """
+    best[id(node)][k, first] = (cost, size, tile, swapped) for computing
+    node into a register with k registers free, or None if the target
+    cannot. first is whether node is computed first in the tree, so a
+    resident value (a (name, is_float) pair already in the destination
+    register) is free to use.
+    """
+    best = {}
+    for node in postorder(tree):
+        best[id(node)] = choose(node, registers, best, resident, target)
+    return best
+
+
+def choose(node, registers, best, resident, target):
+    states = [(k, first) for k in range(1, registers + 1) for first in (True, False)]
+    if node.op is None:
+        leaves = [tile_cost(tile, None, node.is_float, target) + (tile, False)
+                  for tile in TILES if tile.right is None and tile.template is not None and fits(tile.left, node, None)]
+        load = min(leaves, key=lambda c: c[:2])
+        table = dict.fromkeys(states, load)
+        if not node.is_literal and resident == (node.value, node.is_float):
+            in_register = next(tile for tile in TILES if tile.right is None and tile.template is None)
+            for k in range(1, registers + 1):
+                table[k, True] = (0, 0, in_register, False)
+        return table
+
+    # The tiles that fit, whatever the registers: (own cost and size, tile, swapped, computed operand tables)
+    plans = []
+    orientations = [(node.left, node.right, False)]
+    if node.op in COMMUTATIVE and node.left is not node.right:
+        orientations.append((node.right, node.left, True))
+    for left, right, swapped in orientations:
+        sides = (left, right)
+        for tile in TILES:
+            if tile.right is None or not (fits(tile.left, left, right) and fits(tile.right, right, left)):
+                continue
+            if not allowed(tile, node.op, target):
+                continue
+            computed = [best[id(sides[i])] for i, _ in tile.computed]
+            plans.append((tile_cost(tile, node.op, node.is_float, target), tile, swapped, computed))
+
+    table = {}
+    for k, first in states:
+        chosen = None
+        for (cost, size), tile, swapped, computed in plans:
+            if tile.scratch and k < 2:
+                continue
+            # A second register operand waits in the next free register
+            both = len(computed) == 2 and tile.computed[0][1] == tile.computed[1][1] == REG
+            for position, side in enumerate(computed):
+                side = side[k - 1 if position and both else k, first and not position]
+                if side is None:
+                    break
+                cost += side[0]
+                size += side[1]
+            else:
+                if chosen is None or (cost, size) < chosen[:2]:
+                    chosen = (cost, size, tile, swapped)
+        table[k, first] = chosen
+    return table
+
+
+def select(tree, registers, resident, new_spill, target):
+    """
+    Assembly for target computing tree into registers[0]. resident is the
+    (name, is_float) value already in registers[0], or None; new_spill()
+    names a fresh memory cell for a spilled value.
+    """
+    best = cover(tree, len(registers), resident, target)
+    code = []
+    # Work items: (tree, free registers, whether it is computed first) or an instruction
+    stack = [(tree, tuple(registers), True)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            code.append(item)
+            continue
+        node, free, first = item
+        _, _, tile, swapped = best[id(node)][len(free), first]
+        load = target.opcode("LOAD", node.is_float)
+        if node.op is None:
+            if tile.template is not None:
+                value = target.immediate(node.value) if tile.left == IMM else node.value
+                code.extend(line.format(load=load, d=free[0], a=value) for line in tile.template)
+            continue
+
+        left, right = (node.right, node.left) if swapped else (node.left, node.right)
+        operands = {}
+        steps = []
+        computed = [((left, right)[i], shape, "ab"[i]) for i, shape in tile.computed]
+        for side, shape, name in ((left, tile.left, "a"), (right, tile.right, "b")):
+            if shape == IMM:
+                operands[name] = target.immediate(side.value)
+            elif shape == MEM:
+                operands[name] = side.value
+        second = free[1] if len(free) > 1 else None
+        for position, (side, shape, name) in enumerate(computed):
+            if position and shape == REG and computed[0][1] == REG:
+                steps.append((side, free[1:], False))
+            else:
+                steps.append((side, free, first and not position))
+            if shape == SPILL:
+                cell = operands[name] = new_spill()
+                steps.append(f"{target.opcode('STR', side.is_float)} {cell}, {free[0]}")
+        op = target.opcode(node.op, node.is_float)
+        steps.extend(line.format(op=op, load=load, d=free[0], s=second, a=operands.get("a"), b=operands.get("b"))
+                     for line in tile.template)
+        stack.extend(reversed(steps))
+    return code
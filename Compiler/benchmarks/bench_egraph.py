@@ -0,0 +1,65 @@
+"""
+Benchmark: the e-graph optimizer (-O3) against -O2.
+
+Compiles generated programs of about N nodes at -O2 and at -O3 and reports
+the cost of the assembly by INSTRUCTION_COSTS, the instruction count and
+the time spent in the e-graph. Few inputs and mostly INT operands leave
+common factors to find; the time limit keeps large programs bounded, at
+the price of leaving their later statements as they are.
+
+    cd Compiler && python -m benchmarks.bench_egraph [--nodes 1000 100000] [--time-limit 0.5]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree, statements
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+from optimization.optimizer import optimize_code
+from optimization.egraph import optimize_tree, NODE_LIMIT, TIME_LIMIT
+from assembly.assembly import generate_assembly, INSTRUCTION_COSTS
+
+
+def assembly_cost(assembly_code):
+    return sum(INSTRUCTION_COSTS.get(line.split()[0], 0) for line in assembly_code)
+
+
+def compile_tree(tree, id_map, id_types):
+    optimized = optimize_code(generate_intermediate_code(tree, id_map))
+    return generate_assembly(optimized, dict(id_types))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--statement-nodes", type=int, default=12)
+    parser.add_argument("--inputs", type=int, default=4)
+    parser.add_argument("--node-limit", type=int, default=NODE_LIMIT)
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT)
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tokens, id_map = program_tokens(nodes, statement_nodes=args.statement_nodes,
+                                        inputs=args.inputs, float_share=0.02)
+        types = input_types(tokens, float_share=0.1)
+        tree = semantic_analysis(build_syntax_tree(tokens), dict(types))
+
+        start = time.perf_counter()
+        rewritten = optimize_tree(tree, node_limit=args.node_limit, time_limit=args.time_limit)
+        elapsed = time.perf_counter() - start
+        changed = sum(a is not b for a, b in zip(statements(tree), statements(rewritten)))
+
+        o2 = compile_tree(tree, id_map, types)
+        o3 = compile_tree(rewritten, id_map, types)
+        print(f"{nodes:,} nodes, {len(statements(tree)):,} statements")
+        print(f"  e-graph: {elapsed * 1000:.1f} ms, {changed:,} statements rewritten")
+        print(f"  {'':<14} {'-O2':>9} {'-O3':>9} {'change':>8}")
+        for name, a, b in (("cost", assembly_cost(o2), assembly_cost(o3)),
+                           ("instructions", len(o2), len(o3))):
+            print(f"  {name:<14} {a:>9,} {b:>9,} {(b - a) / a:>+8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: flat struct-of-arrays AST against the Node object tree.
+
+Parses a generated program of about N nodes both ways and reports the
+memory each representation holds, and the time to build it, to walk every
+node, to run semantic analysis and to generate intermediate code.
+
+    cd Compiler && python -m benchmarks.bench_flat_ast [--nodes 1000000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from functools import partial
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree
+from syntax.flat_ast import build_flat_ast
+from semantic.semantic import semantic_analysis, analyze_flat
+from icg.icg import generate_intermediate_code, generate_flat_code
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def retained(fn, *args):
+    """Result of fn and the bytes still allocated once it returns."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn(*args)
+    # Parser closures form reference cycles; only what the result keeps counts
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def walk_tree(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.left is not None:
+            stack.append(node.left)
+        if node.right is not None:
+            stack.append(node.right)
+    return count
+
+
+def walk_flat(ast):
+    # Children come before parents: a forward loop is a post-order walk
+    count = 0
+    for left, right in zip(ast.left, ast.right):
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tokens, id_map = program_tokens(nodes)
+        types = input_types(tokens)
+
+        # Unshared, as the flat AST is: the same nodes and the same code
+        build_tree = partial(build_syntax_tree, share=False)
+        tree, tree_bytes = retained(build_tree, tokens)
+        ast, flat_bytes = retained(build_flat_ast, tokens)
+        _, tree_parse = timed(build_tree, tokens)
+        _, flat_parse = timed(build_flat_ast, tokens)
+
+        _, tree_walk = timed(walk_tree, tree)
+        _, flat_walk = timed(walk_flat, ast)
+
+        semantic_tree, tree_semantic = timed(semantic_analysis, tree, dict(types))
+        _, flat_semantic = timed(analyze_flat, ast, dict(types))
+
+        tree_code, tree_icg = timed(generate_intermediate_code, semantic_tree, id_map)
+        flat_code, flat_icg = timed(generate_flat_code, ast, id_map)
+        assert tree_code == flat_code
+
+        print(f"{len(ast):,} nodes")
+        print(f"  {'':<10} {'object tree':>12} {'flat':>12} {'ratio':>7}")
+        rows = (
+            ("memory", tree_bytes / 2**20, flat_bytes / 2**20, "MiB"),
+            ("parse", tree_parse * 1000, flat_parse * 1000, "ms"),
+            ("walk", tree_walk * 1000, flat_walk * 1000, "ms"),
+            ("semantic", tree_semantic * 1000, flat_semantic * 1000, "ms"),
+            ("icg", tree_icg * 1000, flat_icg * 1000, "ms"),
+        )
+        for name, a, b, unit in rows:
+            print(f"  {name:<10} {a:>9.1f}{unit:<3} {b:>9.1f}{unit:<3} {a / b:>6.1f}x")
+        print(f"  flat columns {ast.nbytes() / len(ast):.0f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: hash-consed (shared) syntax trees against plain trees.
+
+Parses generated programs of about N nodes with and without sharing and
+reports the nodes and memory each holds, the parse time, and the
+intermediate code generated from each. "repetitive" programs read only a
+few inputs in short statements, so more of their subexpressions repeat.
+
+    cd Compiler && python -m benchmarks.bench_hashcons [--nodes 1000000]
+"""
+
+import argparse
+import time
+
+from benchmarks.bench_flat_ast import retained, timed
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree, structural_hash
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+
+CORPORA = {
+    "generated": {},
+    "repetitive": {"statement_nodes": 20, "inputs": 4},
+}
+
+
+def count_nodes(tree):
+    """Nodes reached from tree, and distinct node objects among them."""
+    expanded = 0
+    seen = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        expanded += 1
+        seen.add(id(node))
+        if node.left is not None:
+            stack.append(node.left)
+        if node.right is not None:
+            stack.append(node.right)
+    return expanded, len(seen)
+
+
+def distinct_structures(tree):
+    memo = {}
+    structural_hash(tree, memo)
+    return len(set(memo.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for corpus, options in CORPORA.items():
+        for nodes in args.nodes:
+            tokens, id_map = program_tokens(nodes, **options)
+            types = input_types(tokens)
+
+            tree, tree_bytes = retained(build_syntax_tree, tokens, None, False)
+            dag, dag_bytes = retained(build_syntax_tree, tokens, None, True)
+            _, tree_parse = timed(build_syntax_tree, tokens, None, False)
+            _, dag_parse = timed(build_syntax_tree, tokens, None, True)
+
+            expanded, _ = count_nodes(tree)
+            _, unique = count_nodes(dag)
+            assert unique == distinct_structures(tree)
+
+            start = time.perf_counter()
+            tree_code = generate_intermediate_code(semantic_analysis(tree, dict(types)), id_map)
+            tree_time = time.perf_counter() - start
+            start = time.perf_counter()
+            dag_code = generate_intermediate_code(semantic_analysis(dag, dict(types)), id_map)
+            dag_time = time.perf_counter() - start
+
+            print(f"{corpus}, {expanded:,} nodes")
+            print(f"  {'':<14} {'tree':>12} {'shared':>12} {'ratio':>7}")
+            rows = (
+                ("nodes", expanded, unique, ""),
+                ("memory", tree_bytes / 2**20, dag_bytes / 2**20, "MiB"),
+                ("parse", tree_parse * 1000, dag_parse * 1000, "ms"),
+                ("semantic+icg", tree_time * 1000, dag_time * 1000, "ms"),
+                ("instructions", len(tree_code), len(dag_code), ""),
+            )
+            for name, a, b, unit in rows:
+                print(f"  {name:<14} {a:>9.1f}{unit:<3} {b:>9.1f}{unit:<3} {a / b:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: temp inlining and renumbering with operand tables against the
+regex rewriting the optimizer used before.
+
+Runs both versions of the inline-temps and renumber-temps passes on
+generated intermediate code streams, checks they agree, and reports their
+times and the whole -O1 and -O2 pipelines' times.
+
+    cd Compiler && python -m benchmarks.bench_inline [--instructions 1000000]
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.corpus import icg_stream
+from optimization.optimizer import inline_temps, renumber_temps, is_temp, optimize_code
+
+IDENTIFIER_RE = re.compile(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b')
+
+
+def regex_inline_temps(instructions, live_out=None):
+    # The inline-temps pass as it was: an re.sub with a closure per instruction
+    definitions = {}
+    result = []
+
+    def replace_match(match):
+        word = match.group(0)
+        return definitions.get(word, word)
+
+    for instr in instructions:
+        if '=' not in instr:
+            result.append(instr)
+            continue
+        lhs, rhs = instr.split('=', 1)
+        lhs = lhs.strip()
+        rhs = IDENTIFIER_RE.sub(replace_match, rhs.strip())
+        if is_temp(lhs) and not any(op in rhs for op in '+-*/'):
+            definitions[lhs] = rhs
+        else:
+            result.append(f"{lhs} = {rhs}")
+    return result
+
+
+def regex_renumber_temps(instructions, live_out=None):
+    temp_map = {}
+
+    def replace_temp(match):
+        word = match.group(0)
+        return temp_map.get(word, word)
+
+    result = []
+    for instr in instructions:
+        if '=' in instr:
+            lhs = instr.split('=', 1)[0].strip()
+            if is_temp(lhs) and lhs not in temp_map:
+                temp_map[lhs] = f"temp{len(temp_map) + 1}"
+        result.append(re.sub(r'\btemp\d+\b', replace_temp, instr))
+    return result
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instructions", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for count in args.instructions:
+        code = icg_stream(count)
+        print(f"{len(code):,} instructions")
+
+        inlined, regex_inline = timed(regex_inline_temps, code)
+        new_inlined, table_inline = timed(inline_temps, code)
+        assert new_inlined == inlined
+        renumbered, regex_renumber = timed(regex_renumber_temps, inlined)
+        new_renumbered, table_renumber = timed(renumber_temps, inlined)
+        assert new_renumbered == renumbered
+
+        print(f"  {'':<14} {'regex':>10} {'tables':>10} {'speedup':>8}")
+        for name, a, b in (("inline-temps", regex_inline, table_inline),
+                           ("renumber-temps", regex_renumber, table_renumber)):
+            print(f"  {name:<14} {a * 1000:>8.0f}ms {b * 1000:>8.0f}ms {a / b:>7.1f}x")
+        for level in (1, 2):
+            _, seconds = timed(optimize_code, code, level=level)
+            print(f"  -O{level} pipeline  {seconds * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
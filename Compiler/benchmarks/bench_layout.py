@@ -0,0 +1,73 @@
+"""
+Benchmark: tidy tree layout against the old leaf-grid layout.
+
+For each shape and size reports the time to flatten a tree, to lay it out
+(tidy vs. leaf grid), to build a TreeModel on a cold and a warm layout
+cache, and how much narrower the tidy layout is.
+
+    cd Compiler && python -m benchmarks.bench_layout [--sizes 1000 10000 100000 1000000]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import SHAPES
+from utils.tree_layout import tidy_layout, fingerprint
+from utils.tree_view import TreeModel, layout_cache
+
+H_SPACING = 70
+V_SPACING = 80
+
+
+def leaf_grid(left, right):
+    # The layout the GUIs used before: leaves on a uniform grid
+    n = len(left)
+    x = [0.0] * n
+    next_leaf = 0
+    for i in range(n):
+        if left[i] < 0 and right[i] < 0:
+            x[i] = next_leaf * H_SPACING
+            next_leaf += 1
+    for i in range(n - 1, -1, -1):
+        l, r = left[i], right[i]
+        if l >= 0 and r >= 0:
+            x[i] = (x[l] + x[r]) / 2
+        elif l >= 0 or r >= 0:
+            x[i] = x[max(l, r)]
+    return x
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+    args = parser.parse_args()
+
+    print(f"{'shape':<9} {'nodes':>8}  {'model cold':>10}  {'model warm':>10}  {'tidy':>8}  {'grid':>8}"
+          f"  {'fingerprint':>11}  {'ns/node':>7}  {'width tidy/grid':>15}")
+    for shape in args.shapes:
+        for size in args.sizes:
+            tree = SHAPES[shape](size)
+            layout_cache.clear()
+            model, cold = timed(TreeModel, tree, H_SPACING, V_SPACING)
+            _, warm = timed(TreeModel, tree, H_SPACING, V_SPACING)
+
+            left, right, parent = model.left, model.right, model.parent
+            tidy, tidy_time = timed(tidy_layout, left, right, parent, H_SPACING)
+            grid, grid_time = timed(leaf_grid, left, right)
+            _, hash_time = timed(fingerprint, left, right, H_SPACING, V_SPACING)
+            ratio = (max(tidy) or 1) / (max(grid) or 1)
+
+            print(f"{shape:<9} {len(model):>8}  {cold * 1000:>8.1f}ms  {warm * 1000:>8.1f}ms  {tidy_time * 1000:>6.1f}ms"
+                  f"  {grid_time * 1000:>6.1f}ms  {hash_time * 1000:>9.1f}ms  {tidy_time / len(model) * 1e9:>7.0f}"
+                  f"  {ratio:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: a formula sheet compiled to a native batch kernel against the
+Hybrid executor.
+
+Evaluates a sheet over N rows of random inputs with assembly.native (C
+built by the system compiler, loaded through ctypes) and with the Hybrid
+DirectExecutor, one row at a time. The Hybrid front end shares module
+names with the Compiler's, so it runs in a worker process, loaded as the
+compile server's execute workers are (server.worker). Reports the build
+time, cold and cached, the time per row and for every row, and checks that
+both give the same outputs on the first rows. --hybrid-rows times the
+Hybrid executor on the first rows only and scales up.
+
+    cd Compiler && python -m benchmarks.bench_native [--rows 10000000] [--hybrid-rows 1000000]
+"""
+
+import argparse
+import io
+import math
+import random
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from server import worker
+
+# No integer division: the Hybrid executor divides INT values into a FLOAT
+SHEET = """\
+gross = qty * price
+discount = gross * rate / 100.0
+net = gross - discount
+tax = net * 0.2
+total = net + tax + fee
+score = qty ^ 2 + fee * 3 - qty * 7
+"""
+INPUT_TYPES = {"qty": "INT", "price": "FLOAT", "rate": "FLOAT", "fee": "INT"}
+CHECKED_ROWS = 1000
+
+
+def input_columns(rows, seed=0):
+    """The same random inputs in every process: {name: array}."""
+    rng = random.Random(seed)
+    return {
+        "qty": array("q", (rng.randrange(1, 100) for _ in range(rows))),
+        "price": array("d", (rng.uniform(1, 500) for _ in range(rows))),
+        "rate": array("d", (rng.uniform(0, 30) for _ in range(rows))),
+        "fee": array("q", (rng.randrange(0, 20) for _ in range(rows))),
+    }
+
+
+def hybrid_rows(sheet, id_types, rows, timed_rows, seed):
+    """Runs in a Hybrid worker: (seconds for timed_rows rows, outputs of the first rows)."""
+    from lexer import lexical_walk
+    from syntax import build_syntax_tree
+    from semantic import semantic_analysis
+    from executor import DirectExecutor
+
+    with redirect_stdout(io.StringIO()):
+        tokens, id_map = lexical_walk(sheet)
+    tree = build_syntax_tree(tokens)
+    semantic_analysis(tree, dict(id_types))
+    columns = input_columns(rows, seed)
+    names = list(columns)
+    executor = DirectExecutor(id_map, {})
+
+    checked = []
+    start = time.perf_counter()
+    for i, values in enumerate(zip(*columns.values())):
+        if i == timed_rows:
+            break
+        executor.id_values = dict(zip(names, values))
+        executor.execute(tree)
+        if i < CHECKED_ROWS:
+            checked.append(executor.id_values)
+    return time.perf_counter() - start, checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--hybrid-rows", type=int, default=None,
+                        help="rows timed on the Hybrid executor (default: every row)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    hybrid_timed = min(args.hybrid_rows or args.rows, args.rows)
+
+    from lexer.lexer import lexical_walk
+    from syntax.syntax import build_syntax_tree
+    from assembly.native import compile_kernel
+
+    with redirect_stdout(io.StringIO()):
+        tokens, _ = lexical_walk(SHEET)
+    tree = build_syntax_tree(tokens)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        compile_kernel(tree, INPUT_TYPES, cache_dir=cache_dir)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        kernel = compile_kernel(tree, INPUT_TYPES, cache_dir=cache_dir)
+        cached = time.perf_counter() - start
+    print(f"Sheet: {len(tokens):,} tokens, inputs {', '.join(name for name, _ in kernel.inputs)}, "
+          f"outputs {', '.join(name for name, _ in kernel.outputs)}")
+    print(f"Build: {cold * 1000:.1f} ms, {cached * 1000:.2f} ms cached\n")
+
+    start = time.perf_counter()
+    columns = input_columns(args.rows, args.seed)
+    print(f"{args.rows:,} rows generated in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    outputs = kernel.run(columns)
+    native = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=1, initializer=worker.init_execute_worker) as pool:
+        hybrid, checked = pool.submit(hybrid_rows, SHEET, INPUT_TYPES, args.rows, hybrid_timed, args.seed).result()
+    hybrid_total = hybrid * args.rows / hybrid_timed
+
+    mismatches = sum(
+        1 for i, expected in enumerate(checked)
+        if any(not math.isclose(outputs[name][i], expected[name], rel_tol=1e-12) for name, _ in kernel.outputs)
+    )
+    estimate = "" if hybrid_timed == args.rows else f" (scaled from {hybrid_timed:,} rows)"
+    print(f"{'executor':<10} {'per row':>12} {'all rows':>12}")
+    print(f"{'native':<10} {native / args.rows * 1e9:>9.1f} ns {native:>10.2f} s")
+    print(f"{'Hybrid':<10} {hybrid / hybrid_timed * 1e9:>9.1f} ns {hybrid_total:>10.2f} s{estimate}")
+    print(f"\nSpeedup: {hybrid_total / native:,.0f}x; {mismatches} of the first {len(checked)} rows differ")
+
+
+if __name__ == "__main__":
+    main()
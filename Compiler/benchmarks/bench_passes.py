@@ -0,0 +1,45 @@
+"""
+Benchmark: optimizer passes at each -O level.
+
+Compiles a generated program of about N nodes to intermediate code and
+optimizes it at every level, reporting the instructions left and, for each
+pass, how often it ran, its total wall time and how many instructions it
+removed, so a pass's cost can be weighed against what it buys.
+
+    cd Compiler && python -m benchmarks.bench_passes [--nodes 100000] [--float-share 0.05]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+from optimization.optimizer import optimize_code, PassStats, PIPELINES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--float-share", type=float, default=0.05, help="share of float literals in the program")
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tokens, id_map = program_tokens(nodes, float_share=args.float_share)
+        tree = semantic_analysis(build_syntax_tree(tokens), input_types(tokens))
+        icg = generate_intermediate_code(tree, id_map)
+        print(f"{nodes:,} nodes, {len(icg):,} instructions")
+
+        for level in sorted(PIPELINES):
+            stats = PassStats()
+            start = time.perf_counter()
+            optimized = optimize_code(icg, level=level, stats=stats)
+            elapsed = time.perf_counter() - start
+            print(f"  -O{level}: {len(optimized):,} instructions in {elapsed * 1000:.1f} ms")
+            for line in stats.format():
+                print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: list scheduling for a pipelined target.
+
+Generates assembly for programs of about N nodes and schedules it for
+pipelines issuing 1, 2 and 4 instructions a cycle, with the latencies of
+INSTRUCTION_COSTS, reporting the simulated cycles and stall cycles before
+and after and the time spent scheduling. A higher float share gives more
+long-latency MULF and DIVF results to hide.
+
+    cd Compiler && python -m benchmarks.bench_schedule [--nodes 10000 100000] [--issue-width 1 2 4]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+from optimization.optimizer import optimize_code
+from assembly.assembly import generate_assembly, INSTRUCTION_COSTS
+from assembly.peephole import parse_instruction
+from assembly.scheduler import Pipeline, schedule, simulate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--issue-width", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--float-share", type=float, default=0.2, help="share of FLOAT inputs and literals")
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tokens, id_map = program_tokens(nodes, float_share=args.float_share)
+        types = input_types(tokens, float_share=args.float_share)
+        tree = semantic_analysis(build_syntax_tree(tokens), dict(types))
+        ids = {id_map[name]: t for name, t in types.items()}
+        code = generate_assembly(optimize_code(generate_intermediate_code(tree, id_map)), ids, schedule_code=False)
+        parsed = [parse_instruction(line) for line in code]
+        print(f"{nodes:,} nodes, {len(code):,} instructions")
+        print(f"  {'issue width':<12} {'cycles':>9} {'scheduled':>10} {'stalls':>9} {'scheduled':>10} {'time':>9}")
+        for width in args.issue_width:
+            pipeline = Pipeline(INSTRUCTION_COSTS, issue_width=width)
+            start = time.perf_counter()
+            scheduled = schedule(code, pipeline)
+            elapsed = time.perf_counter() - start
+            cycles, stalls = simulate(parsed, pipeline)
+            new_cycles, new_stalls = simulate([parse_instruction(line) for line in scheduled], pipeline)
+            print(f"  {width:<12} {cycles:>9,} {new_cycles:>10,} {stalls:>9,} {new_stalls:>10,} "
+                  f"{elapsed * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: the same IR compiled for each target.
+
+Generates assembly for programs of about N nodes for every target in
+assembly.target.TARGETS, reporting instructions, code size in bytes, and
+the cycles and stall cycles simulated on the target's pipeline before and
+after list scheduling.
+
+    cd Compiler && python -m benchmarks.bench_targets [--nodes 10000 100000] [--targets embedded wide]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import program_tokens, input_types
+from syntax.syntax import build_syntax_tree
+from semantic.semantic import semantic_analysis
+from icg.icg import generate_intermediate_code
+from optimization.optimizer import optimize_code
+from assembly.assembly import generate_assembly
+from assembly.scheduler import schedule
+from assembly.target import TARGETS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=list(TARGETS))
+    parser.add_argument("--float-share", type=float, default=0.2, help="share of FLOAT inputs and literals")
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tokens, id_map = program_tokens(nodes, float_share=args.float_share)
+        types = input_types(tokens, float_share=args.float_share)
+        tree = semantic_analysis(build_syntax_tree(tokens), dict(types))
+        ids = {id_map[name]: t for name, t in types.items()}
+        optimized = optimize_code(generate_intermediate_code(tree, id_map))
+        print(f"{nodes:,} nodes, {len(optimized):,} IR instructions")
+        print(f"  {'target':<10} {'instructions':>12} {'bytes':>9} {'cycles':>9} {'scheduled':>10} "
+              f"{'stalls':>9} {'scheduled':>10} {'time':>9}")
+        for name in args.targets:
+            target = TARGETS[name]
+            start = time.perf_counter()
+            code = generate_assembly(optimized, dict(ids), target, schedule_code=False)
+            scheduled = schedule(code, target.pipeline())
+            elapsed = time.perf_counter() - start
+            cycles, stalls = target.simulate(code)
+            new_cycles, new_stalls = target.simulate(scheduled)
+            print(f"  {name:<10} {len(code):>12,} {target.code_size(code):>9,} {cycles:>9,} {new_cycles:>10,} "
+                  f"{stalls:>9,} {new_stalls:>10,} {elapsed * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Synthetic inputs shared by the benchmarks.
+"""
+
+import contextlib
+import io
+import random
+
+from lexer.lexer import lexical_walk, input_identifiers
+from syntax.syntax import Node
+
+OPERATORS = "+-*/"
+
+
+def chain_tree(nodes):
+    """a + b + c + ...: the left-leaning spine the parser builds for long sums."""
+    tree = Node("ID1")
+    for i in range(2, (nodes + 1) // 2 + 1):
+        tree = Node("+", tree, Node(f"ID{i}"))
+    return tree
+
+
+def balanced_tree(nodes):
+    level = [Node(f"ID{i + 1}") for i in range((nodes + 1) // 2)]
+    while len(level) > 1:
+        paired = [Node("*", level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0]
+
+
+def random_tree(nodes, seed=0):
+    """
+    Random expression tree of about `nodes` nodes, with the occasional
+    single-child node standing in for an int_to_float conversion.
+    """
+    rng = random.Random(seed)
+    pool = [Node(f"ID{rng.randrange(1, 50)}") if rng.random() < 0.7 else Node(str(rng.randrange(100)))
+            for _ in range((nodes + 1) // 2)]
+    count = len(pool)
+    while len(pool) > 1:
+        # Combining random neighbours keeps leaf order but varies the shape
+        i = rng.randrange(len(pool) - 1)
+        left, right = pool[i], pool[i + 1]
+        if rng.random() < 0.1 and count < nodes:
+            right = Node(right.value, Node("int_to_float", right))
+            count += 2
+        pool[i:i + 2] = [Node(rng.choice(OPERATORS), left, right)]
+        count += 1
+    return pool[0]
+
+
+SHAPES = {
+    "chain": chain_tree,
+    "balanced": balanced_tree,
+    "random": random_tree,
+}
+
+
+def source_expression(rng, leaves, names, float_share):
+    """Random infix expression with `leaves` operands, parenthesized here and there."""
+    def operand():
+        roll = rng.random()
+        if roll < float_share:
+            return f"{rng.randrange(100)}.5"
+        if roll < 0.4:
+            return str(rng.randrange(1, 100))
+        return rng.choice(names)
+
+    parts = [operand()]
+    for _ in range(leaves - 1):
+        parts.append(rng.choice(OPERATORS))
+        parts.append(operand())
+        if rng.random() < 0.15 and len(parts) >= 3:
+            # Group the last operation
+            parts[-3:] = [f"({parts[-3]} {parts[-2]} {parts[-1]})"]
+    return " ".join(parts)
+
+
+def program_source(nodes, seed=0, statement_nodes=200, inputs=50, float_share=0.05):
+    """
+    Source of a straight-line program of about `nodes` syntax tree nodes:
+    assignments of random expressions of about `statement_nodes` nodes each,
+    reading `inputs` input variables and the earlier results.
+    """
+    rng = random.Random(seed)
+    names = [f"in{i}" for i in range(inputs)]
+    statements = []
+    total = 0
+    while total < nodes:
+        leaves = max(1, min(statement_nodes, nodes - total) // 2)
+        target = f"v{len(statements)}"
+        statements.append(f"{target} = {source_expression(rng, leaves, names, float_share)}")
+        names.append(target)
+        # Operands plus operators, the target and '=', and the ';' joining statements
+        total += 2 * leaves + 2
+    return "; ".join(statements)
+
+
+def program_tokens(nodes, seed=0, **options):
+    """program_source lexed, without lexical_walk's token string printout."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return lexical_walk(program_source(nodes, seed, **options))
+
+
+def input_types(tokens, seed=0, float_share=0.2):
+    """Random INT/FLOAT types for the program's inputs."""
+    rng = random.Random(seed)
+    return {name: 'FLOAT' if rng.random() < float_share else 'INT' for name in input_identifiers(tokens)}
+
+
+def icg_stream(count, seed=0, inputs=50, statement_ops=20):
+    """
+    About `count` instructions of straight-line intermediate code in the
+    ICG's format: each statement computes a random expression through temps
+    (binary operations and int_to_float conversions, each temp read once)
+    and stores it in a new variable that later statements may read.
+    """
+    rng = random.Random(seed)
+    names = [f"ID{i}" for i in range(1, inputs + 1)]
+    lines = []
+    temps = 0
+
+    def new_temp(rhs):
+        nonlocal temps
+        temps += 1
+        lines.append(f"temp{temps} = {rhs}")
+        return f"temp{temps}"
+
+    while len(lines) < count:
+        pending = []    # temps computed but not read yet
+
+        def operand():
+            if pending and rng.random() < 0.6:
+                return pending.pop(rng.randrange(len(pending)))
+            value = str(rng.randrange(1, 100)) if rng.random() < 0.3 else rng.choice(names)
+            return new_temp(f"int_to_float({value})") if rng.random() < 0.2 else value
+
+        for _ in range(statement_ops):
+            left, right = operand(), operand()
+            pending.append(new_temp(f"{left} {rng.choice(OPERATORS)} {right}"))
+        while len(pending) > 1:
+            right, left = pending.pop(), pending.pop()
+            pending.append(new_temp(f"{left} {rng.choice(OPERATORS)} {right}"))
+
+        target = f"ID{len(names) + 1}"
+        names.append(target)
+        lines.append(f"{target} = {pending[0]}")
+    return lines
@@ -1,23 +1,46 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import math
+import argparse
 
 
-from lexer.lexer import lexical_walk
-from syntax.syntax import build_syntax_tree, Node
+from lexer.lexer import lexical_walk, input_identifiers, IncrementalLexer
+from syntax.syntax import build_syntax_tree, Node, SubtreeCache
 from semantic.semantic import semantic_analysis
 from icg.icg import generate_intermediate_code
-from optimization.optimizer import optimize_code
+from optimization.optimizer import optimize_code, add_optimizer_arguments, PassStats, PIPELINES, DEFAULT_LEVEL
+from optimization.egraph import optimize_tree, EGRAPH_LEVEL
 from assembly.assembly import generate_assembly
-from utils.tree_utils import convert_tree_to_display
+from assembly.target import TARGETS, DEFAULT_TARGET, add_target_arguments
+from utils.tree_utils import display_view
+from utils.background import BackgroundRunner
+from utils.tree_view import TreeModel, TreeView
+from utils.listing_view import ListingView, wrap_words
+from metrics.metrics import get_recorder, add_metrics_arguments, configure_from_args, flush
 
 class CompilerGUI:
+    LEAF_SPACING = 70
+    LEVEL_SPACING = 80
+    LIVE_DELAY_MS = 300
+
     def __init__(self, root):
         self.root = root
         self.root.title("UniCompiler GUI")
         self.root.geometry("1000x800")
         
         self.id_types = {}
+        self.metrics_args = None
+        self.opt_level = DEFAULT_LEVEL
+        self.target = TARGETS[DEFAULT_TARGET]
+        self.runner = BackgroundRunner(root)
+
+        # Live mode state: edits are re-lexed and re-parsed incrementally
+        self.lexer = IncrementalLexer()
+        self.subtrees = SubtreeCache()
+        self.live_after = None
+        self.live_run = False
+        self.live_failed = False
+        self.assumed_types = []
         
         self.setup_theme()
         self.create_widgets()
@@ -55,17 +78,43 @@ class CompilerGUI:
         self.entry = ttk.Entry(top_frame, textvariable=self.equation_var, font=("Consolas", 12), width=50)
         self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
         self.entry.bind("<Return>", lambda e: self.compile())
+        self.equation_var.trace_add("write", lambda *args: self.schedule_live())
         
         self.compile_btn = ttk.Button(top_frame, text="Compile", command=self.compile)
         self.compile_btn.pack(side=tk.LEFT)
 
+        self.cancel_btn = ttk.Button(top_frame, text="Cancel", command=self.cancel)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(10, 0))
+        self.cancel_btn.state(['disabled'])
+
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Live", variable=self.live_var, command=self.schedule_live).pack(side=tk.LEFT, padx=(10, 0))
+
+        self.opt_var = tk.StringVar(value=f"-O{self.opt_level}")
+        opt_box = ttk.Combobox(top_frame, textvariable=self.opt_var, values=[f"-O{level}" for level in sorted(PIPELINES)],
+                               state="readonly", width=4)
+        opt_box.pack(side=tk.LEFT, padx=(10, 0))
+        opt_box.bind("<<ComboboxSelected>>", lambda e: self.set_opt_level(int(self.opt_var.get()[2:])))
+
+        self.target_var = tk.StringVar(value=self.target.name)
+        target_box = ttk.Combobox(top_frame, textvariable=self.target_var, values=sorted(TARGETS),
+                                  state="readonly", width=9)
+        target_box.pack(side=tk.LEFT, padx=(10, 0))
+        target_box.bind("<<ComboboxSelected>>", lambda e: self.set_target(self.target_var.get()))
+
+        self.status_var = tk.StringVar()
+        ttk.Label(self.root, textvariable=self.status_var, padding=(20, 0)).pack(fill=tk.X)
+
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
+        # Tabs are only rendered once they are looked at, and only when their content changed
+        self.pending_tabs = {}
+        self.tab_content = {}
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.render_selected_tab())
         
         self.token_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.token_frame, text="Lexical Analysis")
-        self.token_text = tk.Text(self.token_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
-        self.token_text.pack(fill=tk.BOTH, expand=True)
+        self.token_text = ListingView(self.token_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
         
         self.token_text.tag_configure("header", font=("Segoe UI", 16, "bold"), foreground="#007acc", spacing3=10)
         self.token_text.tag_configure("subheader", font=("Segoe UI", 12, "bold"), foreground="#dcdcdc", spacing1=15, spacing3=5)
@@ -75,18 +124,19 @@ class CompilerGUI:
         self.notebook.add(self.syntax_frame, text="Syntax Analysis")
         self.syntax_canvas = tk.Canvas(self.syntax_frame, bg=self.canvas_bg, highlightthickness=0)
         self.syntax_canvas.pack(fill=tk.BOTH, expand=True)
-        self.add_scrollbars(self.syntax_frame, self.syntax_canvas)
+        self.syntax_view = TreeView(self.syntax_canvas, self.node_color)
+        self.add_scrollbars(self.syntax_frame, self.syntax_view)
 
         self.semantic_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.semantic_frame, text="Semantic Analysis")
         self.semantic_canvas = tk.Canvas(self.semantic_frame, bg=self.canvas_bg, highlightthickness=0)
         self.semantic_canvas.pack(fill=tk.BOTH, expand=True)
-        self.add_scrollbars(self.semantic_frame, self.semantic_canvas)
+        self.semantic_view = TreeView(self.semantic_canvas, self.node_color)
+        self.add_scrollbars(self.semantic_frame, self.semantic_view)
 
         self.icg_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.icg_frame, text="Intermediate Code")
-        self.icg_text = tk.Text(self.icg_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
-        self.icg_text.pack(fill=tk.BOTH, expand=True)
+        self.icg_text = ListingView(self.icg_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
         
         self.icg_text.tag_configure("header", font=("Segoe UI", 16, "bold"), foreground="#007acc", spacing3=10)
         self.icg_text.tag_configure("line_num", foreground="#858585")
@@ -94,318 +144,336 @@ class CompilerGUI:
 
         self.opt_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.opt_frame, text="Optimized Code")
-        self.opt_text = tk.Text(self.opt_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
-        self.opt_text.pack(fill=tk.BOTH, expand=True)
+        self.opt_text = ListingView(self.opt_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
         
         self.opt_text.tag_configure("header", font=("Segoe UI", 16, "bold"), foreground="#007acc", spacing3=10)
+        self.opt_text.tag_configure("subheader", font=("Segoe UI", 12, "bold"), foreground="#dcdcdc", spacing1=15, spacing3=5)
         self.opt_text.tag_configure("line_num", foreground="#858585")
         self.opt_text.tag_configure("code", foreground="#d4d4d4")
 
         self.asm_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.asm_frame, text="Assembly Code")
-        self.asm_text = tk.Text(self.asm_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
-        self.asm_text.pack(fill=tk.BOTH, expand=True)
+        self.asm_text = ListingView(self.asm_frame, bg=self.canvas_bg, fg="white", font=("Consolas", 12), padx=20, pady=20, borderwidth=0)
         
         self.asm_text.tag_configure("header", font=("Segoe UI", 16, "bold"), foreground="#007acc", spacing3=10)
+        self.asm_text.tag_configure("subheader", font=("Segoe UI", 12, "bold"), foreground="#dcdcdc", spacing1=15, spacing3=5)
         self.asm_text.tag_configure("line_num", foreground="#858585")
         self.asm_text.tag_configure("code", foreground="#d4d4d4")
 
-    def add_scrollbars(self, parent, canvas):
-        v_scroll = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=canvas.yview)
-        h_scroll = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=canvas.xview)
-        canvas.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+    def add_scrollbars(self, parent, view):
+        # Scrolling goes through the view so it can draw what comes into sight
+        v_scroll = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=view.yview)
+        h_scroll = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=view.xview)
+        view.canvas.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
         
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        # Mousewheel scrolling
-        canvas.bind("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
-        canvas.bind("<Shift-MouseWheel>", lambda e: canvas.xview_scroll(int(-1*(e.delta/120)), "units"))
 
     def compile(self):
         equation = self.equation_var.get().strip()
         if not equation:
             return
-            
+
+        self.stop_live()
+        self.runner.cancel()
+        self.live_run = False
         self.compile_btn.state(['disabled'])
+        self.cancel_btn.state(['!disabled'])
         self.root.config(cursor="watch")
-        self.root.update()
-            
-        try:
-            self.id_types = {}
-
-            self.token_text.delete(1.0, tk.END)
-            self.syntax_canvas.delete("all")
-            self.semantic_canvas.delete("all")
-            self.icg_text.delete(1.0, tk.END)
-            self.opt_text.delete(1.0, tk.END)
-            self.asm_text.delete(1.0, tk.END)
-            
-            # Reset scroll regions
-            self.syntax_canvas.configure(scrollregion=(0,0,0,0))
-            self.semantic_canvas.configure(scrollregion=(0,0,0,0))
-            
-            # Force UI update
-            self.root.update()
-
-            try:
-                tokens, id_map = lexical_walk(equation)
-                
-                for var_name in id_map:
-                    # Check if variable is used only on LHS (assignment target)
-                    is_lhs = False
-                    is_rhs = False
-                    
-                    for i, t in enumerate(tokens):
-                        if t.type == "IDENTIFIER" and t.value == var_name:
-                            if i + 1 < len(tokens) and tokens[i+1].type == "ASSIGN":
-                                is_lhs = True
-                            else:
-                                is_rhs = True
-                    
-                    # If variable is only assigned to and never read, we don't need its type from user
-                    if is_lhs and not is_rhs:
-                        continue
-
-                    if var_name not in self.id_types:
-                        while True:
-                            type_input = simpledialog.askstring("Input", f"Enter type for {var_name} (int/float):", parent=self.root)
-                            if type_input and type_input.strip().lower() in ('int', 'float'):
-                                self.id_types[var_name] = type_input.strip().upper()
-                                break
-                            elif type_input is None:
-                                return
-                            else:
-                                messagebox.showerror("Error", "Invalid type. Please enter 'int' or 'float'.")
-
-                display_tokens = []
-                for t in tokens:
-                    if t.type == "IDENTIFIER" and t.value in id_map:
-                        display_tokens.append(id_map[t.value])
-                    else:
-                        display_tokens.append(t.value)
-                token_string = " ".join(display_tokens)
-
-                self.token_text.insert(tk.END, "Lexical Analysis Result\n", "header")
-                
-                self.token_text.insert(tk.END, "Token String\n", "subheader")
-                self.token_text.insert(tk.END, f"{token_string}\n", "content")
-
-                self.token_text.insert(tk.END, "Token List\n", "subheader")
-                for t in tokens:
-                    self.token_text.insert(tk.END, f"• {t}\n", "content")
-                
-                self.token_text.insert(tk.END, "Symbol Table\n", "subheader")
-                for k, v in id_map.items():
-                    self.token_text.insert(tk.END, f"• {k} -> {v}\n", "content")
-
-            except Exception as e:
-                self.token_text.insert(tk.END, f"Lexical Error:\n{str(e)}")
-                self.notebook.select(0)
-                return
-
-            try:
-                tree = build_syntax_tree(tokens)
-                display_tree = convert_tree_to_display(tree, id_map)
-                self.draw_tree_on_canvas(self.syntax_canvas, display_tree)
-            except Exception as e:
-                self.syntax_canvas.create_text(400, 300, text=f"Syntax Error:\n{str(e)}", fill="red", font=("Segoe UI", 14))
-                self.notebook.select(1)
-                return
-
-            try:
-                semantic_tree = semantic_analysis(tree, self.id_types) 
-                semantic_display_tree = convert_tree_to_display(semantic_tree, id_map)
-                self.draw_tree_on_canvas(self.semantic_canvas, semantic_display_tree)
-            except Exception as e:
-                self.semantic_canvas.create_text(400, 300, text=f"Semantic Error:\n{str(e)}", fill="red", font=("Segoe UI", 14))
-                self.notebook.select(2)
-                return
-
-            try:
-                icg_instructions = generate_intermediate_code(semantic_tree, id_map)
-                
-                self.icg_text.insert(tk.END, "Generated Intermediate Code\n", "header")
-                
-                for i, instr in enumerate(icg_instructions, 1):
-                    self.icg_text.insert(tk.END, f"{i:02d}  ", "line_num")
-                    self.icg_text.insert(tk.END, f"{instr}\n", "code")
-
-                # Optimization
-                optimized_instructions = optimize_code(icg_instructions)
-                
-                self.opt_text.insert(tk.END, "Optimized Code\n", "header")
-                
-                for i, instr in enumerate(optimized_instructions, 1):
-                    self.opt_text.insert(tk.END, f"{i:02d}  ", "line_num")
-                    self.opt_text.insert(tk.END, f"{instr}\n", "code")
-
-                # Assembly Generation
-                assembly_code = generate_assembly(optimized_instructions, self.id_types)
-                
-                self.asm_text.insert(tk.END, "Assembly Code\n", "header")
-                
-                for i, instr in enumerate(assembly_code, 1):
-                    self.asm_text.insert(tk.END, f"{i:02d}  ", "line_num")
-                    self.asm_text.insert(tk.END, f"{instr}\n", "code")
-
-            except Exception as e:
-                self.icg_text.insert(tk.END, f"ICG/Optimization/Assembly Error:\n{str(e)}")
-                self.notebook.select(3)
-                return
-        finally:
-            self.compile_btn.state(['!disabled'])
-            self.root.config(cursor="")
-
-    def draw_tree_on_canvas(self, canvas, root_node):
-        if root_node is None:
+
+        self.id_types = {}
+
+        self.pending_tabs.clear()
+        self.tab_content.clear()
+        self.token_text.clear()
+        self.syntax_view.clear()
+        self.semantic_view.clear()
+        self.icg_text.clear()
+        self.opt_text.clear()
+        self.asm_text.clear()
+
+        self.lexed = None
+        self.status_var.set("Lexical analysis...")
+        self.runner.start(lambda: self.lex_job(equation), self.show_phase, self.show_unexpected_error, self.lexing_done)
+
+    def cancel(self):
+        self.runner.cancel()
+
+    def set_opt_level(self, level):
+        # Read by the worker thread when the next compile reaches optimization
+        self.opt_level = level
+        self.opt_var.set(f"-O{level}")
+        self.schedule_live()
+
+    def set_target(self, name):
+        # Read by the worker thread when the next compile reaches assembly
+        self.target = TARGETS[name]
+        self.target_var.set(name)
+        self.schedule_live()
+
+    def schedule_live(self):
+        # Debounced: every edit restarts the delay and drops a run that is still in flight
+        self.stop_live()
+        if not self.live_var.get():
             return
+        if self.live_run:
+            self.runner.cancel()
+        self.live_after = self.root.after(self.LIVE_DELAY_MS, self.compile_live)
 
+    def stop_live(self):
+        if self.live_after is not None:
+            self.root.after_cancel(self.live_after)
+            self.live_after = None
 
-        positions = {}
-        self.calculate_node_positions(root_node, 0, 0, positions)
-        
+    def compile_live(self):
+        self.live_after = None
+        equation = self.equation_var.get().strip()
+        if not equation or self.compile_btn.instate(['disabled']):
+            return
+        self.live_run = True
+        self.live_failed = False
+        self.status_var.set("Live: compiling...")
+        self.runner.start(lambda: self.live_job(equation, dict(self.id_types)),
+                          self.show_phase, self.show_unexpected_error, self.live_done)
+
+    def live_job(self, equation, id_types):
+        # Types of new inputs can't be asked for while typing; they are taken to be int
+        try:
+            with get_recorder().phase("lexical"):
+                tokens, id_map = self.lexer.lex(equation)
+        except Exception as e:
+            yield "error", ("lexical", e)
+            return
+        yield "lexical", (tokens, id_map, self.token_lines(tokens, id_map))
 
-        min_x = min(p[0] for p in positions.values())
-        max_x = max(p[0] for p in positions.values())
-        max_y = max(p[1] for p in positions.values())
-        
-        tree_width = max_x - min_x
-        
+        assumed = [name for name in input_identifiers(tokens) if name not in id_types]
+        for name in assumed:
+            id_types[name] = 'INT'
+        yield "assumed", assumed
+        yield from self.compile_job(tokens, id_map, id_types)
 
-        canvas.update_idletasks()
-        canvas_width = canvas.winfo_width()
-        
+    def live_done(self, cancelled):
+        self.live_run = False
+        if cancelled or self.live_failed:
+            return
+        note = f" (assuming int for {', '.join(self.assumed_types)})" if self.assumed_types else ""
+        self.status_var.set(f"Live: up to date{note}")
+        if self.metrics_args:
+            flush(self.metrics_args)
 
-        if canvas_width < 100:
-            canvas_width = 960 
+    def lex_job(self, equation):
+        try:
+            with get_recorder().phase("lexical"):
+                tokens, id_map = lexical_walk(equation)
+        except Exception as e:
+            yield "error", ("lexical", e)
+            return
+        yield "lexical", (tokens, id_map, self.token_lines(tokens, id_map))
 
+    def compile_job(self, tokens, id_map, id_types):
+        # Runs on the worker thread: only computes, never touches widgets
+        recorder = get_recorder()
+        phase = "syntax"
+        try:
+            with recorder.phase("syntax"):
+                tree = build_syntax_tree(tokens, self.subtrees)
+                self.subtrees.rotate()
+            yield "syntax", self.tree_model(display_view(tree, id_map))
+
+            phase = "semantic"
+            with recorder.phase("semantic"):
+                semantic_tree = semantic_analysis(tree, id_types)
+            yield "semantic", self.tree_model(display_view(semantic_tree, id_map))
+
+            level = self.opt_level
+            if level >= EGRAPH_LEVEL:
+                phase = "egraph"
+                with recorder.phase("egraph"):
+                    semantic_tree = optimize_tree(semantic_tree)
+
+            phase = "icg"
+            with recorder.phase("icg"):
+                icg_instructions = generate_intermediate_code(semantic_tree, id_map)
+            yield "icg", self.listing_lines("Generated Intermediate Code", icg_instructions)
+
+            pass_stats = PassStats()
+            with recorder.phase("optimization"):
+                optimized_instructions = optimize_code(icg_instructions, level=level, stats=pass_stats)
+            recorder.optimized(pass_stats.rows())
+            lines = self.listing_lines(f"Optimized Code (-O{level})", optimized_instructions)
+            if pass_stats.passes:
+                lines.append([("Optimizer Passes", "subheader")])
+                lines.extend([(line, "line_num")] for line in pass_stats.format())
+            yield "optimization", lines
+
+            target = self.target
+            with recorder.phase("assembly"):
+                assembly_code = generate_assembly(optimized_instructions, id_types, target)
+            recorder.compiled(icg_instructions, assembly_code)
+            lines = self.listing_lines(f"Assembly Code ({target.name})", assembly_code)
+            cycles, stalls = target.simulate(assembly_code)
+            lines.append([(f"{target.code_size(assembly_code)} bytes, {cycles} cycles ({stalls} stalls)", "subheader")])
+            yield "assembly", lines
+        except Exception as e:
+            yield "error", (phase, e)
+
+    def lexing_done(self, cancelled):
+        if cancelled or self.lexed is None:
+            self.compile_done(cancelled)
+            return
 
-        if canvas_width > tree_width + 100:
-            offset_x = (canvas_width - tree_width) / 2 - min_x
+        tokens, id_map = self.lexed
+        for var_name in input_identifiers(tokens):
+            if var_name not in self.id_types:
+                while True:
+                    type_input = simpledialog.askstring("Input", f"Enter type for {var_name} (int/float):", parent=self.root)
+                    if type_input and type_input.strip().lower() in ('int', 'float'):
+                        self.id_types[var_name] = type_input.strip().upper()
+                        break
+                    elif type_input is None:
+                        self.compile_done(True)
+                        return
+                    else:
+                        messagebox.showerror("Error", "Invalid type. Please enter 'int' or 'float'.")
+
+        self.status_var.set("Compiling...")
+        self.runner.start(lambda: self.compile_job(tokens, id_map, dict(self.id_types)),
+                          self.show_phase, self.show_unexpected_error, self.compile_done)
+
+    def compile_done(self, cancelled):
+        self.compile_btn.state(['!disabled'])
+        self.cancel_btn.state(['disabled'])
+        self.root.config(cursor="")
+        if cancelled:
+            self.status_var.set("Cancelled")
+        elif not self.status_var.get().endswith("error"):
+            self.status_var.set("Done")
+        if self.metrics_args:
+            flush(self.metrics_args)
+
+    def show_phase(self, message):
+        # Called on the Tk thread as each phase finishes, so tabs fill in one by one
+        phase, payload = message
+        if phase == "error":
+            self.show_phase_error(*payload)
+        elif phase == "lexical":
+            tokens, id_map, lines = payload
+            self.lexed = (tokens, id_map)
+            self.show_in_tab(self.token_frame, lines, lambda: self.token_text.show(lines))
+        elif phase == "assumed":
+            self.assumed_types = payload
+        elif phase == "syntax":
+            self.status_var.set("Semantic analysis...")
+            self.show_in_tab(self.syntax_frame, self.tree_content(payload), lambda: self.syntax_view.show(payload))
+        elif phase == "semantic":
+            self.status_var.set("Generating intermediate code...")
+            self.show_in_tab(self.semantic_frame, self.tree_content(payload), lambda: self.semantic_view.show(payload))
+        elif phase == "icg":
+            self.status_var.set("Optimizing...")
+            self.show_in_tab(self.icg_frame, payload, lambda: self.icg_text.show(payload))
+        elif phase == "optimization":
+            self.status_var.set("Generating assembly...")
+            self.show_in_tab(self.opt_frame, payload, lambda: self.opt_text.show(payload))
+        elif phase == "assembly":
+            self.show_in_tab(self.asm_frame, payload, lambda: self.asm_text.show(payload))
+
+    def tree_content(self, model):
+        return model.key, model.labels
+
+    def show_in_tab(self, frame, content, render):
+        # Output identical to what the tab already has is not drawn again
+        if self.tab_content.get(str(frame)) == content:
+            return
+        self.tab_content[str(frame)] = content
+        if self.notebook.select() == str(frame):
+            self.pending_tabs.pop(str(frame), None)
+            render()
         else:
-            offset_x = 50 - min_x
-            
-        offset_y = 50
-        
-     
-        scroll_width = max(canvas_width, tree_width + 100)
-        scroll_height = max(canvas.winfo_height(), max_y + 100)
-        
-        canvas.configure(scrollregion=(0, 0, scroll_width, scroll_height))
-        
+            self.pending_tabs[str(frame)] = render
+
+    def render_selected_tab(self):
+        render = self.pending_tabs.pop(self.notebook.select(), None)
+        if render:
+            render()
+
+    def tree_model(self, display_tree):
+        # Flattening and layout happen here, on the worker, not in the Tk thread
+        return TreeModel(display_tree, self.LEAF_SPACING, self.LEVEL_SPACING)
+
+    def show_phase_error(self, phase, e):
+        if self.live_run:
+            # Half-typed equations fail all the time; keep the last good output
+            self.live_failed = True
+            self.status_var.set(f"Live: {phase} error: {e}")
+            return
+        self.status_var.set(f"{phase.capitalize()} error")
+        for frame in (self.token_frame, self.syntax_frame, self.semantic_frame, self.icg_frame):
+            self.tab_content.pop(str(frame), None)
+        if phase == "lexical":
+            self.token_text.show(self.error_lines("Lexical Error:", e))
+            self.notebook.select(0)
+        elif phase == "syntax":
+            self.syntax_canvas.create_text(400, 300, text=f"Syntax Error:\n{str(e)}", fill="red", font=("Segoe UI", 14))
+            self.notebook.select(1)
+        elif phase == "semantic":
+            self.semantic_canvas.create_text(400, 300, text=f"Semantic Error:\n{str(e)}", fill="red", font=("Segoe UI", 14))
+            self.notebook.select(2)
+        else:
+            self.pending_tabs.pop(str(self.icg_frame), None)
+            self.icg_text.show(self.error_lines("ICG/Optimization/Assembly Error:", e))
+            self.notebook.select(3)
+
+    def show_unexpected_error(self, e):
+        messagebox.showerror("Error", str(e))
+
+    def token_lines(self, tokens, id_map):
+        display_tokens = []
+        for t in tokens:
+            if t.type == "IDENTIFIER" and t.value in id_map:
+                display_tokens.append(id_map[t.value])
+            else:
+                display_tokens.append(t.value)
 
-        self.draw_edges(canvas, root_node, positions, offset_x, offset_y)
+        lines = [[("Lexical Analysis Result", "header")]]
 
-        self.draw_nodes(canvas, root_node, positions, offset_x, offset_y)
+        lines.append([("Token String", "subheader")])
+        lines.extend([(line, "content")] for line in wrap_words(display_tokens))
 
-    def calculate_node_positions(self, node, depth, x_idx, positions):
-    
-        if node is None:
-            return 0
-            
+        lines.append([("Token List", "subheader")])
+        lines.extend([(f"• {t}", "content")] for t in tokens)
 
-        NODE_RADIUS = 25
-        H_SPACING = 20
-        V_SPACING = 80
-        
-        
-        self.leaf_counter = 0
-        self.node_depths = {}
-        self.node_x = {}
-        
-        def assign_coordinates(n, d):
-            if n is None:
-                return
-            
-
-            assign_coordinates(n.left, d + 1)
-            assign_coordinates(n.right, d + 1)
-            
-            self.node_depths[id(n)] = d
-            
-            if n.left is None and n.right is None:
-                # Leaf
-                self.node_x[id(n)] = self.leaf_counter * (NODE_RADIUS * 2 + H_SPACING)
-                self.leaf_counter += 1
-            else:
-                # Parent
-                children_x = []
-                if n.left:
-                    children_x.append(self.node_x[id(n.left)])
-                if n.right:
-                    children_x.append(self.node_x[id(n.right)])
-                
-                if children_x:
-                    self.node_x[id(n)] = sum(children_x) / len(children_x)
-                else:
-                    self.node_x[id(n)] = self.leaf_counter * (NODE_RADIUS * 2 + H_SPACING)
-                    self.leaf_counter += 1
-                    
-        assign_coordinates(node, 0)
-        
-        for n_id, x in self.node_x.items():
-          
-            pass
-            
-
-        def populate(n):
-            if n is None:
-                return
-            positions[id(n)] = (self.node_x[id(n)], self.node_depths[id(n)] * V_SPACING)
-            populate(n.left)
-            populate(n.right)
-            
-        populate(node)
-
-    def draw_edges(self, canvas, node, positions, off_x, off_y):
-        if node is None:
-            return
-            
-        x, y = positions[id(node)]
-        x += off_x
-        y += off_y
-        
-        if node.left:
-            lx, ly = positions[id(node.left)]
-            lx += off_x
-            ly += off_y
-            canvas.create_line(x, y, lx, ly, fill="#888888", width=2)
-            self.draw_edges(canvas, node.left, positions, off_x, off_y)
-            
-        if node.right:
-            rx, ry = positions[id(node.right)]
-            rx += off_x
-            ry += off_y
-            canvas.create_line(x, y, rx, ry, fill="#888888", width=2)
-            self.draw_edges(canvas, node.right, positions, off_x, off_y)
-
-    def draw_nodes(self, canvas, node, positions, off_x, off_y):
-        if node is None:
-            return
-            
-        x, y = positions[id(node)]
-        x += off_x
-        y += off_y
-        
-        r = 20
-        
+        lines.append([("Symbol Table", "subheader")])
+        lines.extend([(f"• {k} -> {v}", "content")] for k, v in id_map.items())
+        return lines
 
-        fill_color = "#007acc" 
-        if str(node.value) in ['+', '-', '*', '/', '=']:
-            fill_color = "#d65d0e" 
-        elif str(node.value).startswith('ID'):
-            fill_color = "#98971a" 
-        elif str(node.value).replace('.','',1).isdigit():
-            fill_color = "#b16286" 
-            
-        canvas.create_oval(x-r, y-r, x+r, y+r, fill=fill_color, outline="white", width=2)
-        canvas.create_text(x, y, text=str(node.value), fill="white", font=("Segoe UI", 10, "bold"))
-        
-        self.draw_nodes(canvas, node.left, positions, off_x, off_y)
-        self.draw_nodes(canvas, node.right, positions, off_x, off_y)
+    def listing_lines(self, header, instructions):
+        lines = [[(header, "header")]]
+        lines.extend([(f"{i:02d}  ", "line_num"), (instr, "code")] for i, instr in enumerate(instructions, 1))
+        return lines
+
+    def error_lines(self, title, e):
+        return [[(title, None)]] + [[(line, None)] for line in str(e).split("\n")]
+
+    def node_color(self, value):
+        if value in ['+', '-', '*', '/', '^', '=']:
+            return "#d65d0e"
+        elif value.startswith('ID'):
+            return "#98971a"
+        elif value.replace('.','',1).isdigit():
+            return "#b16286"
+        return "#007acc"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UniCompiler GUI")
+    add_optimizer_arguments(parser)
+    add_target_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
     root = tk.Tk()
     app = CompilerGUI(root)
+    app.metrics_args = args
+    app.set_opt_level(args.opt_level)
+    app.set_target(args.target)
     root.mainloop()
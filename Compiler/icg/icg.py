@@ -1,10 +1,80 @@
-from syntax.syntax import Node
+from functools import lru_cache
+
+from syntax.syntax import Node, statements
+from syntax.flat_ast import OP, LITERAL, ASSIGN, SEQ, POWER, OPERATORS
+
+# Exponents up to this get a shortest addition chain; larger ones use
+# square-and-multiply, which is at most about twice as long
+MAX_CHAIN_SEARCH = 256
+
+
+def _extend_chain(chain, n, steps):
+    # Depth-first search over star chains, where each step adds an earlier
+    # element to the last one; these are shortest for every n searched here
+    last = chain[-1]
+    if last == n:
+        return True
+    if steps == 0 or last << steps < n:
+        return False
+    for element in reversed(chain):
+        if last + element <= n:
+            chain.append(last + element)
+            if _extend_chain(chain, n, steps - 1):
+                return True
+            chain.pop()
+    return False
+
+
+@lru_cache(maxsize=None)
+def power_chain(n):
+    """
+    The multiplications computing x^n (n >= 1) as (a, b) exponent pairs:
+    each one multiplies x^a by x^b, both already computed, starting from
+    x^1. x^8 is (1, 1), (2, 2), (4, 4); x^15 takes five.
+    """
+    if n <= MAX_CHAIN_SEARCH:
+        chain = [1]
+        steps = n.bit_length() - 1
+        while not _extend_chain(chain, n, steps):
+            steps += 1
+    else:
+        chain = [1]
+        for bit in bin(n)[3:]:
+            chain.append(chain[-1] * 2)
+            if bit == '1':
+                chain.append(chain[-1] + 1)
+    return tuple((a, b - a) for a, b in zip(chain, chain[1:]))
+
+
+def power_code(base, n, new_temp):
+    """Instructions computing base ^ n by the multiplications of power_chain(n), and the operand holding the result."""
+    powers = {1: base}
+    code = []
+    for a, b in power_chain(n):
+        temp = new_temp()
+        code.append(f"{temp} = {powers[a]} * {powers[b]}")
+        powers[a + b] = temp
+    return code, powers[n]
+
+
+def constant_exponent(value):
+    """The exponent n of a power lowered to multiplications, or None to keep the ^."""
+    if value.isdecimal() and int(value) > 0:
+        return int(value)
+    return None
+
 
 class IntermediateCodeGenerator:
     def __init__(self, id_map=None):
         self.temp_counter = 1
         self.instructions = []
         self.id_map = id_map if id_map is not None else {}
+        # Operands of shared nodes already generated, by id: nodes whose value
+        # can't change hold for the whole program, the rest for one statement
+        self.assigned = set()
+        self.shared = {}
+        self.local = {}
+        self.purity = {}
 
     def new_temp(self):
         temp = f"temp{self.temp_counter}"
@@ -15,35 +85,156 @@ class IntermediateCodeGenerator:
         if node is None:
             return None
 
-       
-        if node.left and node.left.value == "int_to_float":
-            operand = self.generate(node.left.left)
-            temp = self.new_temp()
-            self.instructions.append(f"{temp} = int_to_float({operand})")
-            return temp
+        if node.value == ';':
+            for statement in statements(node):
+                self.generate(statement)
+                # Its assignment may change what the impure shared nodes compute
+                self.local.clear()
+            return None
+
+        # Post-order with an explicit stack; the operands of the node being
+        # finished are the last entries of results
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node is None:
+                results.append(None)
+                continue
+            key = id(node)
+            if not visited:
+                known = self.shared.get(key) or self.local.get(key)
+                if known is not None:
+                    results.append(known)
+                    continue
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(self.operands(node)))
+                continue
 
+            count = len(self.operands(node))
+            operand = self.generate_value(node, results[len(results) - count:])
+            del results[len(results) - count:]
+            if node.convert:
+                temp = self.new_temp()
+                self.instructions.append(f"{temp} = int_to_float({operand})")
+                operand = temp
+            if node.kind == 'op' or node.convert:
+                (self.shared if self.is_pure(node) else self.local)[key] = operand
+            results.append(operand)
+        return results[0]
 
+    def is_pure(self, node):
+        """True if the subtree reads no variable the program assigns, so its value never changes."""
+        purity = self.purity
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if id(current) in purity:
+                stack.pop()
+                continue
+            if current.left is None and current.right is None:
+                purity[id(current)] = current.kind == 'literal' or current.value not in self.assigned
+                stack.pop()
+                continue
+            children = [child for child in (current.left, current.right) if child is not None]
+            pending = [child for child in children if id(child) not in purity]
+            if pending:
+                stack.extend(pending)
+                continue
+            purity[id(current)] = all(purity[id(child)] for child in children)
+            stack.pop()
+        return purity[id(node)]
+
+    def operands(self, node):
+        """The children generated before a node: none for a leaf, only the base of a power lowered to multiplications."""
         if node.left is None and node.right is None:
-            return self.id_map.get(node.value, node.value)
+            return ()
+        if node.value == '^' and node.right.kind == 'literal' and constant_exponent(node.right.value) is not None:
+            return (node.left,)
+        return (node.left, node.right)
 
+    def generate_value(self, node, operands):
+        if node.value == '^' and node.right.kind == 'literal':
+            n = constant_exponent(node.right.value)
+            if n is not None:
+                code, operand = power_code(operands[0], n, self.new_temp)
+                self.instructions.extend(code)
+                return operand
 
-        if node.value in ('+', '-', '*', '/'):
-            left_val = self.generate(node.left)
-            right_val = self.generate(node.right)
+        if node.kind == 'op':
+            left_val, right_val = operands
             temp = self.new_temp()
             self.instructions.append(f"{temp} = {left_val} {node.value} {right_val}")
             return temp
         
-        elif node.value == '=':
-
-            left_val = self.generate(node.left)
-            right_val = self.generate(node.right)
+        elif node.kind == 'assign':
+            left_val, right_val = operands
             self.instructions.append(f"{left_val} = {right_val}")
             return left_val
 
-        return node.value
+        return self.id_map.get(node.value, node.value)
 
 def generate_intermediate_code(tree, id_map=None):
+    """
+    Three-address code for a syntax tree. In a hash-consed tree (see
+    syntax.NodeTable) a shared node is generated once and its temp reused
+    only while that is safe: pure nodes for the whole program, and nodes
+    reading an assigned variable within their statement. On the generated
+    corpora of benchmarks.bench_hashcons that saves at most 3% of the
+    instructions generated for the unshared tree.
+    """
     icg = IntermediateCodeGenerator(id_map)
+    if tree is not None:
+        icg.assigned = {s.left.value for s in statements(tree) if s.kind == 'assign' and s.left is not None}
     icg.generate(tree)
     return icg.instructions
+
+
+def generate_flat_code(ast, id_map=None):
+    """
+    generate_intermediate_code for a FlatAST. Its nodes are in post-order,
+    which is the order the tree walker emits code in, so one forward loop
+    gives the same instructions and temp numbering as for the unshared tree
+    (build_syntax_tree with share=False); shared subtrees are only computed
+    once there.
+    """
+    id_map = id_map if id_map is not None else {}
+    kind, op, left, right, ref = ast.kind, ast.op, ast.left, ast.right, ast.ref
+    convert, symbols = ast.convert, ast.symbols
+    instructions = []
+    operands = [None] * len(ast)
+    temps = 0
+
+    def new_temp():
+        nonlocal temps
+        temps += 1
+        return f"temp{temps}"
+
+    for i in range(len(ast)):
+        k = kind[i]
+        n = None
+        if k == OP and op[i] == POWER and kind[right[i]] == LITERAL:
+            n = constant_exponent(symbols[ref[right[i]]])
+        if n is not None:
+            code, operand = power_code(operands[left[i]], n, new_temp)
+            instructions.extend(code)
+        elif k == OP:
+            temps += 1
+            operand = f"temp{temps}"
+            instructions.append(f"{operand} = {operands[left[i]]} {OPERATORS[op[i]]} {operands[right[i]]}")
+        elif k == ASSIGN:
+            operand = operands[left[i]]
+            instructions.append(f"{operand} = {operands[right[i]]}")
+        elif k == SEQ:
+            continue
+        else:
+            symbol = symbols[ref[i]]
+            operand = id_map.get(symbol, symbol)
+
+        if convert[i]:
+            temps += 1
+            instructions.append(f"temp{temps} = int_to_float({operand})")
+            operand = f"temp{temps}"
+        operands[i] = operand
+
+    return instructions
@@ -1,5 +1,7 @@
+import bisect
 import string
-from typing import List, Dict, Tuple
+import threading
+from typing import Iterator, List, Dict, Tuple
 
 class Token:
     def __init__(self, token_type: str, value: str):
@@ -32,16 +34,25 @@ def read_number(equation: str, start: int) -> tuple[str, int, str]:
     return num, i, token_type
 
 
-def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
-    i = 0
+def scan(equation: str, i: int = 0, prev_type: str = None) -> Iterator[Tuple[Token, int, int]]:
+    """
+    Yields (token, start, end) for the tokens of `equation` from position i on.
+    prev_type is the type of the token just before i, since runs of separators
+    collapse into one. A trailing separator is still yielded.
+    """
     n = len(equation)
-    id_counter = 1
-    tokens: List[Token] = []
-    display_tokens: List[str] = []
-    id_map: Dict[str, str] = {}  
 
     while i < n:
         ch = equation[i]
+        start = i
+
+        if ch in ";\n":
+            # Statement separator; runs of blank lines/semicolons collapse to one
+            i += 1
+            if prev_type is not None and prev_type != "SEPARATOR":
+                prev_type = "SEPARATOR"
+                yield Token("SEPARATOR", ";"), start, i
+            continue
 
         if ch.isspace():
             i += 1
@@ -52,8 +63,7 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
 
             if i < n and (equation[i].isalpha() or equation[i] == "_"):
                 raise ValueError(f"Invalid token '{equation[i]}' after number '{num}'")
-            tokens.append(Token(token_type, num))
-            display_tokens.append(num)
+            token = Token(token_type, num)
 
         elif ch in string.ascii_letters or ch == "_":
             ident = ch
@@ -66,14 +76,14 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
                 raise ValueError(f"Invalid token: identifier '{ident}' cannot be followed by '.'")
 
             if ident.lower() == "pi":
-                tokens.append(Token("FLOAT", "3.14"))
-                display_tokens.append("3.14")
+                token = Token("FLOAT", "3.14")
             else:
-                tokens.append(Token("IDENTIFIER", ident))
-                if ident not in id_map:
-                    id_map[ident] = f"ID{id_counter}"
-                    id_counter += 1
-                display_tokens.append(id_map[ident])
+                token = Token("IDENTIFIER", ident)
+
+        elif ch == "^" or equation.startswith("**", i):
+            # ** is an alternative spelling of the exponent operator
+            token = Token("OPERATOR", "^")
+            i += 1 if ch == "^" else 2
 
         elif ch in "+-*/=()":
             token_type = (
@@ -82,12 +92,135 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
                 "RPAREN" if ch == ")" else
                 "OPERATOR"
             )
-            tokens.append(Token(token_type, ch))
-            display_tokens.append(ch)
+            token = Token(token_type, ch)
             i += 1
 
         else:
             raise ValueError(f"Invalid character '{ch}' at position {i}")
 
-    print(f"\nToken String: {' '.join(display_tokens)}")
-    return tokens, id_map
\ No newline at end of file
+        prev_type = token.type
+        yield token, start, i
+
+
+def identifier_map(tokens: List[Token]) -> Dict[str, str]:
+    """ID1, ID2, ... for each identifier, in order of first appearance."""
+    id_map: Dict[str, str] = {}
+    for t in tokens:
+        if t.type == "IDENTIFIER" and t.value not in id_map:
+            id_map[t.value] = f"ID{len(id_map) + 1}"
+    return id_map
+
+
+def display_string(tokens: List[Token], id_map: Dict[str, str]) -> str:
+    return " ".join(id_map.get(t.value, t.value) if t.type == "IDENTIFIER" else t.value for t in tokens)
+
+
+def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
+    tokens = [token for token, _, _ in scan(equation)]
+
+    if tokens and tokens[-1].type == "SEPARATOR":
+        tokens.pop()
+
+    id_map = identifier_map(tokens)
+    print(f"\nToken String: {display_string(tokens, id_map)}")
+    return tokens, id_map
+
+
+class IncrementalLexer:
+    """
+    Lexes successive versions of an equation that is being edited, reusing the
+    tokens outside the edited span. Only the text between the last token that
+    ends before the edit and the first old token boundary after it is scanned
+    again; the tokens behind that boundary are reused, shifted by the change
+    in length.
+    """
+
+    def __init__(self):
+        self.equation = ""
+        self.tokens: List[Token] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.reused = 0
+        self.lock = threading.Lock()
+
+    def lex(self, equation: str) -> Tuple[List[Token], Dict[str, str]]:
+        with self.lock:
+            return self._lex(equation)
+
+    def _lex(self, equation: str) -> Tuple[List[Token], Dict[str, str]]:
+        old = self.equation
+        limit = min(len(old), len(equation))
+        prefix = 0
+        while prefix < limit and old[prefix] == equation[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == equation[-1 - suffix]:
+            suffix += 1
+        delta = len(equation) - len(old)
+        edit_end = len(equation) - suffix
+
+        # Tokens ending strictly before the edit (the scanner looks one
+        # character past a token, so a token ending at the edit may change)
+        keep = bisect.bisect_left(self.ends, prefix)
+        tokens = self.tokens[:keep]
+        starts = self.starts[:keep]
+        ends = self.ends[:keep]
+        position = ends[-1] if keep else 0
+        prev_type = tokens[-1].type if keep else None
+
+        # First old token that starts after the edit
+        resume = bisect.bisect_left(self.starts, len(old) - suffix)
+
+        tail = None
+        for token, start, end in scan(equation, position, prev_type):
+            k = bisect.bisect_left(self.starts, start - delta, resume)
+            if start >= edit_end and k < len(self.starts) and self.starts[k] == start - delta:
+                # Same text from here on, and the same separator state
+                old_prev = self.tokens[k - 1].type if k else None
+                new_prev = tokens[-1].type if tokens else None
+                if old_prev == new_prev:
+                    tail = k
+                    break
+            tokens.append(token)
+            starts.append(start)
+            ends.append(end)
+
+        if tail is not None:
+            tokens.extend(self.tokens[tail:])
+            starts.extend(s + delta for s in self.starts[tail:])
+            ends.extend(e + delta for e in self.ends[tail:])
+            self.reused = keep + len(self.tokens) - tail
+        else:
+            self.reused = keep
+
+        self.equation = equation
+        self.tokens, self.starts, self.ends = tokens, starts, ends
+
+        tokens = tokens[:-1] if tokens and tokens[-1].type == "SEPARATOR" else list(tokens)
+        return tokens, identifier_map(tokens)
+
+
+def input_identifiers(tokens: List[Token]) -> List[str]:
+    """
+    Identifiers whose value is read before the program assigns them, in order
+    of first use. These are the program's inputs, i.e. the only identifiers
+    whose type (or value) has to come from the user.
+    """
+    inputs: List[str] = []
+    seen = set()
+    assigned = set()
+    targets = []
+
+    for i, t in enumerate(tokens):
+        if t.type == "SEPARATOR":
+            # A target only counts as assigned once its whole statement has run
+            assigned.update(targets)
+            targets = []
+        elif t.type == "IDENTIFIER":
+            if i + 1 < len(tokens) and tokens[i + 1].type == "ASSIGN":
+                targets.append(t.value)
+            elif t.value not in assigned and t.value not in seen:
+                seen.add(t.value)
+                inputs.append(t.value)
+
+    return inputs
\ No newline at end of file
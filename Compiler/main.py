@@ -1,13 +1,25 @@
-from lexer.lexer import lexical_walk
+import argparse
+
+from lexer.lexer import lexical_walk, input_identifiers
 from syntax.syntax import build_syntax_tree
 from semantic.semantic import semantic_analysis
 from icg.icg import generate_intermediate_code
-from optimization.optimizer import optimize_code
+from optimization.optimizer import optimize_code, add_optimizer_arguments, PassStats
+from optimization.egraph import optimize_tree, EGRAPH_LEVEL
 from assembly.assembly import generate_assembly
-from utils.tree_utils import print_tree, convert_tree_to_display
+from assembly.target import TARGETS, add_target_arguments
+from utils.tree_utils import print_tree, display_view
+from metrics.metrics import add_metrics_arguments, configure_from_args, flush
 
 
 def main():
+    parser = argparse.ArgumentParser(description="UniCompiler command line interface")
+    add_optimizer_arguments(parser)
+    add_target_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    recorder = configure_from_args(args)
+    target = TARGETS[args.target]
 
     while True:
         id_types = {}
@@ -17,24 +29,10 @@ def main():
             if not equation:
                 continue
             
-            tokens, id_map = lexical_walk(equation)
-
-            for var_name in id_map:
-                # Check if variable is used only on LHS (assignment target)
-                is_lhs = False
-                is_rhs = False
-                
-                for i, t in enumerate(tokens):
-                    if t.type == "IDENTIFIER" and t.value == var_name:
-                        if i + 1 < len(tokens) and tokens[i+1].type == "ASSIGN":
-                            is_lhs = True
-                        else:
-                            is_rhs = True
-                
-                # If variable is only assigned to and never read, we don't need its type from user
-                if is_lhs and not is_rhs:
-                    continue
+            with recorder.phase("lexical"):
+                tokens, id_map = lexical_walk(equation)
 
+            for var_name in input_identifiers(tokens):
                 if var_name not in id_types:
                     while True:
                         type_input = input(f"Enter type for {var_name} (int/float): ").strip().lower()
@@ -43,38 +41,63 @@ def main():
                             break
                         print("Invalid type. Please enter 'int' or 'float'.")
 
-            tree = build_syntax_tree(tokens)
-            display_tree = convert_tree_to_display(tree, id_map)
+            with recorder.phase("syntax"):
+                tree = build_syntax_tree(tokens)
+            display_tree = display_view(tree, id_map)
             
 
             print("\nSyntax Tree:")
             print_tree(display_tree)
             print()
             
-            semantic_tree = semantic_analysis(tree, id_types)
-            semantic_display_tree = convert_tree_to_display(semantic_tree, id_map)
+            with recorder.phase("semantic"):
+                semantic_tree = semantic_analysis(tree, id_types)
+            semantic_display_tree = display_view(semantic_tree, id_map)
         
             print("Semantic Tree:")
             print_tree(semantic_display_tree)
             print()
 
-            icg_instructions = generate_intermediate_code(semantic_tree, id_map)
+            if args.opt_level >= EGRAPH_LEVEL:
+                with recorder.phase("egraph"):
+                    semantic_tree = optimize_tree(semantic_tree)
+                print(f"Rewritten Tree (-O{args.opt_level}):")
+                print_tree(display_view(semantic_tree, id_map))
+                print()
+
+            with recorder.phase("icg"):
+                icg_instructions = generate_intermediate_code(semantic_tree, id_map)
             print("Intermediate Code:")
             for instr in icg_instructions:
                 print(instr)
             print()
 
-            optimized_instructions = optimize_code(icg_instructions)
-            print("Optimized Code:")
+            pass_stats = PassStats()
+            with recorder.phase("optimization"):
+                optimized_instructions = optimize_code(icg_instructions, level=args.opt_level, stats=pass_stats)
+            recorder.optimized(pass_stats.rows())
+            print(f"Optimized Code (-O{args.opt_level}):")
             for instr in optimized_instructions:
                 print(instr)
             print()
 
-            assembly_code = generate_assembly(optimized_instructions, id_types)
-            print("Assembly Code:")
+            if args.pass_stats:
+                print("Optimizer Passes:")
+                for line in pass_stats.format():
+                    print(line)
+                print()
+
+            with recorder.phase("assembly"):
+                assembly_code = generate_assembly(optimized_instructions, id_types, target)
+            recorder.compiled(icg_instructions, assembly_code)
+            print(f"Assembly Code ({target.name}):")
             for instr in assembly_code:
                 print(instr)
+            cycles, stalls = target.simulate(assembly_code)
+            print(f"{len(assembly_code)} instructions, {target.code_size(assembly_code)} bytes, "
+                  f"{cycles} cycles ({stalls} stalls)")
             print()
+            flush(args)
             
         except KeyboardInterrupt:
             print("\nExiting...")
@@ -85,5 +108,7 @@ def main():
         except Exception as e:
             print(f"Error: {e}\n")
 
+    flush(args)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,407 @@
+"""
+Equality-saturation optimizer for semantic trees (-O3).
+
+An e-graph holds many equivalent forms of an expression at once: an
+e-class is a set of equivalent e-nodes, and an e-node is an operator whose
+operands are e-classes, so a rewrite adds a form without losing the
+others. Rewrite rules are applied to every e-node until they add nothing
+new (saturation), or until a node, iteration or time budget runs out.
+Then the cheapest form of each statement's expression under the target's
+INSTRUCTION_COSTS is extracted as a new tree for intermediate code
+generation.
+
+Reassociation, distribution and most identities only hold exactly for INT
+expressions: FLOAT addition is not associative, and x - x is not 0 when x
+is an infinity. FLOAT classes are only commuted, folded and simplified by
+exact identities such as x * 1.0.
+"""
+
+import time
+
+from syntax.syntax import Node, statements
+from assembly.assembly import OPCODES, INSTRUCTION_COSTS
+from icg.icg import power_chain, constant_exponent
+from optimization.optimizer import fold, format_literal
+
+EGRAPH_LEVEL = 3        # lowest -O level that runs the e-graph optimizer
+
+# Budgets per statement, except TIME_LIMIT, which is for the whole program.
+# Statements reached after it has run out are left as they are.
+NODE_LIMIT = 2_000
+ITERATION_LIMIT = 12
+TIME_LIMIT = 0.5
+
+LEAVES = ('name', 'literal')
+CONVERT = 'convert'
+
+
+class EGraph:
+    """
+    E-nodes are tuples: (kind, value) for a leaf, (CONVERT, operand) for an
+    int_to_float conversion and (operator, left, right) for an operation,
+    with e-class ids as operands. Classes are merged through a union-find;
+    rebuild() restores congruence (equal operands make equal e-nodes) after
+    merges. Each class has a type, and the literal text of its value when
+    it is known to be constant.
+    """
+
+    def __init__(self):
+        self.parent = []
+        self.types = []
+        self.nodes = {}         # class id -> e-nodes, as an insertion-ordered dict
+        self.memo = {}          # e-node -> class id
+        self.constants = {}     # class id -> literal text
+        self.size = 0
+
+    def find(self, c):
+        parent = self.parent
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    def canonical(self, enode):
+        if enode[0] in LEAVES:
+            return enode
+        return (enode[0],) + tuple(self.find(c) for c in enode[1:])
+
+    def node_type(self, enode):
+        if enode[0] == 'literal':
+            return 'FLOAT' if '.' in enode[1] else 'INT'
+        if enode[0] == CONVERT:
+            return 'FLOAT'
+        return 'FLOAT' if 'FLOAT' in (self.types[self.find(c)] for c in enode[1:]) else 'INT'
+
+    def add(self, enode, type=None):
+        enode = self.canonical(enode)
+        c = self.memo.get(enode)
+        if c is not None:
+            return self.find(c)
+        c = len(self.parent)
+        self.parent.append(c)
+        self.types.append(type or self.node_type(enode))
+        self.nodes[c] = {enode: None}
+        self.memo[enode] = c
+        self.size += 1
+        if enode[0] == 'literal':
+            self.constants[c] = enode[1]
+        return c
+
+    def add_term(self, term):
+        """Class of a term: a class id, or an e-node tuple whose operands are terms."""
+        classes = []
+        stack = [(term, False)]
+        while stack:
+            term, visited = stack.pop()
+            if isinstance(term, int):
+                classes.append(self.find(term))
+            elif term[0] in LEAVES:
+                classes.append(self.add(term))
+            elif not visited:
+                # Operands are added left to right, then the e-node over them
+                stack.append((term, True))
+                stack.extend((operand, False) for operand in reversed(term[1:]))
+            else:
+                operands = classes[len(classes) - (len(term) - 1):]
+                del classes[len(classes) - len(operands):]
+                classes.append(self.add((term[0],) + tuple(operands)))
+        return classes[0]
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b or self.types[a] != self.types[b]:
+            return False
+        if len(self.nodes[a]) < len(self.nodes[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.nodes[a].update(self.nodes.pop(b))
+        constant = self.constants.pop(b, None)
+        if constant is not None:
+            self.constants.setdefault(a, constant)
+        return True
+
+    def rebuild(self):
+        while True:
+            memo = {}
+            merges = []
+            for c, enodes in self.nodes.items():
+                canonical = {}
+                for enode in enodes:
+                    enode = self.canonical(enode)
+                    canonical[enode] = None
+                    other = memo.setdefault(enode, c)
+                    if other != c:
+                        merges.append((other, c))
+                self.nodes[c] = canonical
+            if not merges:
+                self.memo = memo
+                self.size = len(memo)
+                return
+            for a, b in merges:
+                self.union(a, b)
+
+    def operations(self, c, operator):
+        """(left, right) operands of the operator's e-nodes in class c."""
+        return [enode[1:] for enode in self.nodes[self.find(c)] if enode[0] == operator]
+
+    def constant(self, c):
+        return self.constants.get(self.find(c))
+
+
+REWRITES = {}
+
+
+def register_rewrite(name):
+    """
+    Registers a rewrite rule, a function (egraph, class, e-node) yielding
+    terms (see EGraph.add_term) equal to the class.
+    """
+    def register(fn):
+        REWRITES[name] = fn
+        return fn
+    return register
+
+
+def constant_number(egraph, c):
+    text = egraph.constant(c)
+    if text is None:
+        return None
+    return float(text) if '.' in text else int(text)
+
+
+@register_rewrite("commute")
+def commute(egraph, c, enode):
+    if enode[0] in ('+', '*'):
+        yield (enode[0], enode[2], enode[1])
+
+
+@register_rewrite("associate")
+def associate(egraph, c, enode):
+    # (x op y) op z -> x op (y op z); with commute this reaches every
+    # grouping. (x + y) - z -> x + (y - z) lets y - y cancel.
+    op = enode[0]
+    if op in ('+', '*', '-') and egraph.types[c] == 'INT':
+        for x, y in egraph.operations(enode[1], '+' if op == '-' else op):
+            yield ('+' if op == '-' else op, x, (op, y, enode[2]))
+
+
+@register_rewrite("distribute")
+def distribute(egraph, c, enode):
+    if enode[0] == '*' and egraph.types[c] == 'INT':
+        x = enode[1]
+        for op in ('+', '-'):
+            for y, z in egraph.operations(enode[2], op):
+                yield (op, ('*', x, y), ('*', x, z))
+
+
+@register_rewrite("factor")
+def factor(egraph, c, enode):
+    # x * y + x * z -> x * (y + z), and the same for -
+    op = enode[0]
+    if op in ('+', '-') and egraph.types[c] == 'INT':
+        for x, y in egraph.operations(enode[1], '*'):
+            for x2, z in egraph.operations(enode[2], '*'):
+                if egraph.find(x) == egraph.find(x2):
+                    yield ('*', x, (op, y, z))
+
+
+@register_rewrite("identities")
+def identities(egraph, c, enode):
+    if enode[0] in LEAVES or enode[0] == CONVERT:
+        return
+    op, x, y = enode
+    exact = egraph.types[c] == 'INT'
+    a, b = constant_number(egraph, x), constant_number(egraph, y)
+    if op in ('-', '/', '*', '^') and b == (0 if op == '-' else 1):
+        yield x                             # x - 0, x / 1, x * 1, x ^ 1
+    if op == '*' and a == 1:
+        yield y
+    if not exact:
+        return
+    if op == '+':
+        if b == 0:
+            yield x
+        if a == 0:
+            yield y
+    elif op == '*' and 0 in (a, b):
+        yield ('literal', '0')
+    elif op == '-' and egraph.find(x) == egraph.find(y):
+        yield ('literal', '0')
+    elif op == '^' and b == 0:
+        yield ('literal', '1')
+
+
+@register_rewrite("fold")
+def fold_constants(egraph, c, enode):
+    if enode[0] in LEAVES or egraph.constant(c) is not None:
+        return
+    if enode[0] == CONVERT:
+        text = egraph.constant(enode[1])
+        value = format_literal(float(text)) if text is not None else None
+    else:
+        left, right = egraph.constant(enode[1]), egraph.constant(enode[2])
+        value = fold(left, enode[0], right) if left is not None and right is not None else None
+    if value is not None and ('.' in value) == (egraph.types[c] == 'FLOAT'):
+        yield ('literal', value)
+
+
+def node_cost(egraph, c, enode, costs):
+    op = enode[0]
+    if op in LEAVES or op == CONVERT:
+        # An int_to_float operand is loaded with LOADF at no extra cost
+        return 0
+    suffix = 'F' if egraph.types[c] == 'FLOAT' else ''
+    if op == '^':
+        text = egraph.constant(enode[2])
+        n = constant_exponent(text) if text is not None else None
+        if n is not None:
+            # Lowered to multiplications by code generation
+            return len(power_chain(n)) * costs['MUL' + suffix]
+    return costs[OPCODES[op] + suffix]
+
+
+def add_tree(egraph, tree):
+    """Class of a semantic tree's expression, added node by node."""
+    classes = {}
+    stack = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if id(node) in classes:
+            continue
+        if node.left is None and node.right is None:
+            c = egraph.add((node.kind, node.value), node.type)
+        elif not visited:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+            continue
+        else:
+            c = egraph.add((node.value, classes[id(node.left)], classes[id(node.right)]))
+        if node.convert:
+            c = egraph.add((CONVERT, c))
+        classes[id(node)] = c
+    return classes[id(tree)]
+
+
+def matches(egraph):
+    """(class, term) for every rewrite of every e-node, in a fixed order."""
+    for c, enodes in egraph.nodes.items():
+        for enode in enodes:
+            for rewrite in REWRITES.values():
+                for term in rewrite(egraph, c, enode):
+                    yield c, term
+
+
+def saturate(egraph, deadline, node_limit=NODE_LIMIT, iterations=ITERATION_LIMIT):
+    """Applies REWRITES until saturation or a budget runs out. Returns True if saturated."""
+    for _ in range(iterations):
+        # Matches are collected before any is applied. There can be far
+        # more of them than e-nodes once associativity and commutativity
+        # have multiplied the forms of a class, so they are capped too.
+        found = []
+        complete = True
+        for match in matches(egraph):
+            if len(found) >= node_limit or time.perf_counter() > deadline:
+                complete = False
+                break
+            found.append(match)
+
+        changed = False
+        for c, term in found:
+            if egraph.size >= node_limit or time.perf_counter() > deadline:
+                complete = False
+                break
+            changed |= egraph.union(c, egraph.add_term(term))
+        egraph.rebuild()
+        if not complete:
+            return False
+        if not changed:
+            return True
+    return False
+
+
+def extract(egraph, root, costs):
+    """Cheapest tree of class root, and its cost."""
+    best = {}       # class -> (cost, size, e-node)
+    changed = True
+    while changed:
+        changed = False
+        for c, enodes in egraph.nodes.items():
+            for enode in enodes:
+                operands = () if enode[0] in LEAVES else enode[1:]
+                if any(egraph.find(o) not in best for o in operands):
+                    continue
+                cost = node_cost(egraph, c, enode, costs)
+                size = 1
+                for o in operands:
+                    cost += best[egraph.find(o)][0]
+                    size += best[egraph.find(o)][1]
+                if c not in best or (cost, size) < best[c][:2]:
+                    best[c] = (cost, size, enode)
+                    changed = True
+
+    built = {}
+    stack = [(egraph.find(root), False)]
+    while stack:
+        c, visited = stack.pop()
+        if c in built:
+            continue
+        enode = best[c][2]
+        if enode[0] in LEAVES:
+            built[c] = Node(enode[1], kind=enode[0], type=egraph.types[c])
+            continue
+        operands = [egraph.find(o) for o in enode[1:]]
+        if not visited:
+            stack.append((c, True))
+            stack.extend((o, False) for o in reversed(operands))
+            continue
+        if enode[0] == CONVERT:
+            inner = built[operands[0]]
+            built[c] = Node(inner.value, inner.left, inner.right, inner.kind, inner.type, True)
+        else:
+            built[c] = Node(enode[0], built[operands[0]], built[operands[1]], 'op', egraph.types[c])
+    return built[egraph.find(root)], best[egraph.find(root)][0]
+
+
+def tree_cost(tree, costs=None):
+    """Cost of a semantic tree's expression by the same model, without rewriting it."""
+    egraph = EGraph()
+    return extract(egraph, add_tree(egraph, tree), costs or INSTRUCTION_COSTS)[1]
+
+
+def optimize_expression(tree, deadline, costs, node_limit=NODE_LIMIT):
+    if tree is None or (tree.left is None and tree.right is None):
+        return tree
+    egraph = EGraph()
+    root = add_tree(egraph, tree)
+    if egraph.size >= node_limit:
+        return tree
+    original = extract(egraph, root, costs)[1]
+    saturate(egraph, deadline, node_limit)
+    optimized, cost = extract(egraph, root, costs)
+    # Keep the input, with any subtrees it shares, unless something was gained
+    return optimized if cost < original else tree
+
+
+def optimize_tree(tree, costs=None, node_limit=NODE_LIMIT, time_limit=TIME_LIMIT):
+    """
+    A semantic tree with each statement's expression replaced by its
+    cheapest equivalent form (see the module docstring). Types and
+    conversions are kept; the input tree is not modified.
+    """
+    if tree is None:
+        return None
+    costs = costs or INSTRUCTION_COSTS
+    deadline = time.perf_counter() + time_limit
+
+    result = None
+    for statement in statements(tree):
+        if time.perf_counter() <= deadline:
+            if statement.kind == 'assign':
+                value = optimize_expression(statement.right, deadline, costs, node_limit)
+                if value is not statement.right:
+                    statement = Node('=', statement.left, value)
+            else:
+                statement = optimize_expression(statement, deadline, costs, node_limit)
+        result = statement if result is None else Node(';', result, statement)
+    return result
@@ -1,122 +1,525 @@
-import re
+"""
+Optimizer for three-address intermediate code.
 
-def optimize_code(instructions):
+Optimization is a list of registered passes, each taking and returning an
+instruction list. An -O level selects a pipeline of them; a group of
+passes that enable each other is repeated until the code stops changing.
+Wall time and instruction-count change of every pass run can be collected
+in a PassStats.
+
+Instructions are `lhs = operand` or `lhs = operand op operand`, where an
+operand is a name, a literal or int_to_float(operand). Passes take them
+apart with str.split and rewrite operands through dict lookups (operand
+tables), so each pass is one linear walk with no regular expressions.
+"""
+
+import math
+import time
+
+from assembly.assembly import INSTRUCTION_COSTS
+from icg.icg import power_chain, power_code
+
+OPERATORS = frozenset('+-*/^')
+# Integer powers are only folded up to this exponent, keeping literals short
+MAX_FOLDED_EXPONENT = 64
+CONVERSION = 'int_to_float('
+
+
+def is_literal(operand):
+    whole, dot, fraction = operand.partition('.')
+    return whole.isdecimal() and (not dot or fraction.isdecimal())
+
+
+def is_temp(name):
+    return name.startswith('temp')
+
+
+def split_conversion(operand):
+    """The operand inside int_to_float(...), or None if operand is not a conversion."""
+    if operand.startswith(CONVERSION) and operand.endswith(')'):
+        return operand[len(CONVERSION):-1]
+    return None
+
+
+def map_operand(operand, table):
+    """operand with the name it reads replaced by table[name], if there is one."""
+    value = table.get(operand)
+    if value is not None:
+        return value
+    inner = split_conversion(operand)
+    if inner is not None:
+        value = table.get(inner)
+        if value is not None:
+            return f"{CONVERSION}{value})"
+    return operand
+
+
+def rhs_identifiers(rhs):
+    names = []
+    for operand in rhs.split():
+        if operand in OPERATORS:
+            continue
+        operand = split_conversion(operand) or operand
+        if not is_literal(operand):
+            names.append(operand)
+    return names
+
+
+def constant_value(operand):
+    """Value of a literal operand, or of int_to_float(literal); None for anything else."""
+    inner = split_conversion(operand)
+    text = operand if inner is None else inner
+    if not is_literal(text):
+        return None
+    return float(text) if '.' in text or inner is not None else int(text)
+
+
+def format_literal(value):
+    """Literal text for a folded value, or None if it cannot be written as one."""
+    if isinstance(value, int):
+        return str(value) if value >= 0 else None
+    text = repr(value)
+    # No unary minus or exponent syntax in the source language
+    return text if '.' in text and is_literal(text) else None
+
+
+def fold(left, op, right):
+    """Fold `left op right` on literal operands; None when unsafe or not representable."""
+    is_float = '.' in left or '.' in right
+    a = float(left) if is_float else int(left)
+    b = float(right) if is_float else int(right)
+
+    if op == '+':
+        value = a + b
+    elif op == '-':
+        value = a - b
+    elif op == '*':
+        value = a * b
+    elif op == '/':
+        if b == 0:
+            return None
+        if is_float:
+            value = a / b
+        elif a % b == 0:
+            value = a // b
+        else:
+            # Integer division semantics belong to the target; leave it
+            return None
+    elif is_float:
+        try:
+            value = a ** b
+        except (OverflowError, ZeroDivisionError):
+            return None
+        if isinstance(value, complex):
+            return None
+    else:
+        if b > MAX_FOLDED_EXPONENT:
+            return None
+        value = a ** b
+    return format_literal(value)
+
+
+PASSES = {}
+
+
+def register_pass(name):
+    """Registers an optimization pass, a function (instructions, live_out) -> instructions."""
+    def register(fn):
+        PASSES[name] = fn
+        return fn
+    return register
+
+
+@register_pass("constant-propagation")
+def propagate_constants(instructions, live_out=None):
     """
-    Optimizes intermediate code by:
-    1. Inlining simple temporary variables (literals, identifiers, int_to_float).
-    2. Merging complex operations into final assignments where possible.
-    3. Preventing multiple binary operations in a single statement.
+    Global constant and copy propagation with constant folding across statements.
+
+    Walks the straight-line program in order, remembering every variable (user
+    variable or temp) whose current value is a literal or a copy of another
+    variable, and substitutes those into later operands until the variable or
+    its source is reassigned.
     """
-    if not instructions:
-        return []
+    known = {}      # name -> literal or source variable
+    copies = {}     # source variable -> names currently holding a copy of it
+    result = []
 
-    definitions = {}  # Stores inlinable expressions for temps
-    optimized_instructions = []
-    
-    # Track the last emitted instruction that was a "complex" temp assignment
-    # Format: {'index': int, 'temp': str}
-    last_complex_instr = None
+    def forget(name):
+        source = known.pop(name, None)
+        if source is not None and source in copies:
+            copies[source].discard(name)
+        for holder in copies.pop(name, ()):
+            known.pop(holder, None)
 
-    def is_complex(expr):
-        # Check for binary operators +, -, *, /
-        # We assume int_to_float(...) is NOT complex in this context
-        # as it can be part of a single operation.
-        return any(op in expr for op in ['+', '-', '*', '/'])
+    def substitute(operand):
+        inner = split_conversion(operand)
+        if inner is not None:
+            inner = known.get(inner, inner)
+            if inner.isdecimal():
+                return str(float(inner))
+            return f"{CONVERSION}{inner})"
+        return known.get(operand, operand)
 
     for instr in instructions:
         if '=' not in instr:
-            optimized_instructions.append(instr)
-            last_complex_instr = None
+            result.append(instr)
             continue
-            
+
         lhs, rhs = instr.split('=', 1)
         lhs = lhs.strip()
         rhs = rhs.strip()
-        
-        # 1. Substitute existing definitions into RHS
-        def replace_match(match):
-            word = match.group(0)
-            if word in definitions:
-                return definitions[word]
-            return word
-            
-        # Replace identifiers in RHS with their definitions
-        new_rhs = re.sub(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', replace_match, rhs)
-        
-        # 2. Analyze the new RHS
-        rhs_is_complex = is_complex(new_rhs)
-        
-        # 3. Decide what to do based on LHS type
-        if lhs.startswith('temp'):
-            if not rhs_is_complex:
-                # Simple expression (literal, ID, or int_to_float)
-                # Store in definitions for future inlining
-                definitions[lhs] = new_rhs
-                # Do NOT emit yet
+
+        operands = rhs.split()
+        if len(operands) == 3 and operands[1] in OPERATORS:
+            left = substitute(operands[0])
+            op = operands[1]
+            right = substitute(operands[2])
+            rhs = f"{left} {op} {right}"
+            if is_literal(left) and is_literal(right):
+                rhs = fold(left, op, right) or rhs
+        else:
+            rhs = substitute(rhs)
+
+        forget(lhs)
+        if is_literal(rhs):
+            known[lhs] = rhs
+        elif rhs.isidentifier() and rhs != lhs and not is_temp(rhs):
+            # Temps are folded into their users by inline-temps
+            known[lhs] = rhs
+            copies.setdefault(rhs, set()).add(lhs)
+
+        result.append(f"{lhs} = {rhs}")
+
+    return result
+
+
+@register_pass("dead-store-elimination")
+def eliminate_dead_stores(instructions, live_out=None):
+    """
+    Drops assignments whose target is never read afterwards.
+
+    Temps are never live at exit. User variables are live at exit unless
+    `live_out` names the only variables the program has to produce, so by
+    default only stores that are overwritten before being read are removed.
+    """
+    live = set(live_out) if live_out is not None else set()
+    assigned_later = set()
+    kept = []
+
+    for instr in reversed(instructions):
+        if '=' not in instr:
+            kept.append(instr)
+            continue
+
+        lhs, rhs = instr.split('=', 1)
+        lhs = lhs.strip()
+
+        if lhs in live:
+            needed = True
+        elif is_temp(lhs) or live_out is not None:
+            needed = False
+        else:
+            needed = lhs not in assigned_later
+        assigned_later.add(lhs)
+
+        if not needed:
+            continue
+        live.discard(lhs)
+        live.update(rhs_identifiers(rhs))
+        kept.append(instr)
+
+    kept.reverse()
+    return kept
+
+
+@register_pass("inline-temps")
+def inline_temps(instructions, live_out=None):
+    """
+    Inlines temps holding a simple expression (literal, identifier or
+    int_to_float) into the instructions that read them, and drops their
+    definitions. Temps holding a binary operation are kept, so no
+    instruction ends up with more than one operation.
+    """
+    definitions = {}    # temp -> the simple operand it holds
+    result = []
+
+    for instr in instructions:
+        lhs, eq, rhs = instr.partition('=')
+        if not eq:
+            result.append(instr)
+            continue
+
+        lhs = lhs.strip()
+        operands = rhs.split()
+        if len(operands) == 3:
+            left, op, right = operands
+            result.append(f"{lhs} = {map_operand(left, definitions)} {op} {map_operand(right, definitions)}")
+        elif len(operands) == 1:
+            operand = map_operand(operands[0], definitions)
+            if is_temp(lhs):
+                definitions[lhs] = operand
             else:
-                # Complex expression (has binary ops)
-                # We must emit this, as we don't want to inline it into another op
-                optimized_instructions.append(f"{lhs} = {new_rhs}")
-                
-                # Track this instruction for potential peephole optimization
-                last_complex_instr = {
-                    'index': len(optimized_instructions) - 1,
-                    'temp': lhs
-                }
+                result.append(f"{lhs} = {operand}")
         else:
-            # LHS is a User Variable (e.g., x, y, id1)
-            # We always emit assignments to user variables
-            
-            # Peephole Optimization:
-            # If we are assigning a temp that was just computed in the previous complex instruction,
-            # we can merge them.
-            # Example:
-            #   temp3 = int_to_float(3) * int_to_float(4)  (last_complex_instr)
-            #   x = temp3
-            # Becomes:
-            #   x = int_to_float(3) * int_to_float(4)
-            
-            merged = False
-            if last_complex_instr and new_rhs == last_complex_instr['temp']:
-                # Modify the previous instruction
-                prev_idx = last_complex_instr['index']
-                prev_instr = optimized_instructions[prev_idx]
-                # Replace the LHS of previous instruction with current LHS
-                # prev_instr is "tempX = expr"
-                _, prev_rhs = prev_instr.split('=', 1)
-                optimized_instructions[prev_idx] = f"{lhs} = {prev_rhs.strip()}"
-                merged = True
-            
-            if not merged:
-                optimized_instructions.append(f"{lhs} = {new_rhs}")
-            
-            # Reset last_complex_instr because we've moved past it
-            last_complex_instr = None
-            
-    # 4. Renumber temporary variables
-    final_instructions = []
-    temp_map = {}
-    temp_counter = 1
-    
-    for instr in optimized_instructions:
-        # Replace old temps with new temps in the instruction string
-        # We need to be careful to replace only whole words
-        
-        # First, identify if LHS is a temp definition
+            result.append(instr)
+
+    return result
+
+
+def is_power_of_two(value):
+    return value > 0 and math.frexp(value)[0] == 0.5
+
+
+@register_pass("strength-reduction")
+def reduce_strength(instructions, live_out=None, costs=None):
+    """
+    Rewrites multiplications and divisions by constants into cheaper
+    operations, where the target's instruction costs (INSTRUCTION_COSTS
+    unless `costs` is given) say the rewrite is cheaper:
+
+    x * n    integer n: additions, doubling x for each bit of n after the
+             first and adding x for each one bit (x * 4 = (x + x) + (x + x)).
+    x * 2.0  float powers of two: doublings, which are exact. Only done
+             when x is visibly FLOAT (a conversion, or a temp computed
+             from one or from a float literal): the back end types
+             operations by their operands.
+    x / c    float power of two c: x * (1 / c). The reciprocal of a power
+             of two is exact, so the result is the same.
+    x ^ n    integer n >= 1, as left by constant propagation: the
+             multiplications of the shortest addition chain for n
+             (icg.power_chain), so x ^ 8 takes three: x * x, squared,
+             squared again.
+
+    An operand with an int literal is an INT operation (semantic analysis
+    converts the literal of a mixed operation), a float literal or
+    int_to_float(literal) makes it FLOAT.
+    """
+    costs = costs or INSTRUCTION_COSTS
+    next_temp = 1
+    for instr in instructions:
+        lhs = instr.partition('=')[0].strip()
+        if is_temp(lhs) and lhs[4:].isdecimal():
+            next_temp = max(next_temp, int(lhs[4:]) + 1)
+
+    def is_float(operand):
+        return operand in float_temps or split_conversion(operand) is not None or '.' in operand
+
+    float_temps = set()
+    result = []
+    for instr in instructions:
+        lhs, eq, rhs = instr.partition('=')
+        operands = rhs.split()
+        if eq and is_temp(lhs.strip()) and any(is_float(operand) for operand in operands):
+            float_temps.add(lhs.strip())
+        if not eq or len(operands) != 3 or operands[1] not in ('*', '/', '^'):
+            result.append(instr)
+            continue
+        lhs = lhs.strip()
+        left, op, right = operands
+
+        if op == '^':
+            n = constant_value(right)
+            suffix = 'F' if is_float(left) else ''
+            if (not isinstance(n, int) or n < 1 or constant_value(left) is not None
+                    or len(power_chain(n)) * costs['MUL' + suffix] >= costs['POW' + suffix]):
+                result.append(instr)
+            elif n == 1:
+                result.append(f"{lhs} = {left}")
+            else:
+                multiplications = len(power_chain(n))
+                targets = [f"temp{t}" for t in range(next_temp, next_temp + multiplications - 1)] + [lhs]
+                next_temp += multiplications - 1
+                result.extend(power_code(left, n, iter(targets).__next__)[0])
+            continue
+
+        if op == '/':
+            divisor = constant_value(right)
+            if (not isinstance(divisor, float) or not is_power_of_two(divisor)
+                    or format_literal(1 / divisor) is None or costs['MULF'] >= costs['DIVF']):
+                result.append(instr)
+                continue
+            op, right = '*', format_literal(1 / divisor)
+
+        factor, x = constant_value(right), left
+        if factor is None:
+            factor, x = constant_value(left), right
+        if factor is None or constant_value(x) is not None:
+            result.append(f"{lhs} = {left} {op} {right}")
+            continue
+
+        suffix = 'F' if isinstance(factor, float) else ''
+        n = int(factor) if factor >= 2 and factor == int(factor) else 0
+        if suffix and not (is_power_of_two(n) and is_float(x)):
+            n = 0
+        additions = n.bit_length() - 1 + bin(n).count('1') - 1
+        if n < 2 or additions * costs['ADD' + suffix] >= costs['MUL' + suffix]:
+            result.append(f"{lhs} = {left} {op} {right}")
+            continue
+
+        targets = [f"temp{t}" for t in range(next_temp, next_temp + additions - 1)] + [lhs]
+        next_temp += additions - 1
+        target = iter(targets)
+        current = x
+        for bit in bin(n)[3:]:
+            doubled = next(target)
+            result.append(f"{doubled} = {current} + {current}")
+            current = doubled
+            if bit == '1':
+                added = next(target)
+                result.append(f"{added} = {current} + {x}")
+                current = added
+
+    return result
+
+
+@register_pass("merge-assignments")
+def merge_assignments(instructions, live_out=None):
+    """
+    Peephole merge of a temp computed by the previous instruction into the
+    user variable assigned from it:
+
+        temp3 = int_to_float(3) * int_to_float(4)
+        x = temp3
+
+    becomes `x = int_to_float(3) * int_to_float(4)`. Only temps read once
+    are merged; temps of shared subexpressions are read again later.
+    """
+    temp_reads = {}
+    for instr in instructions:
         if '=' in instr:
-            lhs, rhs = instr.split('=', 1)
-            lhs = lhs.strip()
-            if lhs.startswith('temp'):
-                if lhs not in temp_map:
-                    temp_map[lhs] = f"temp{temp_counter}"
-                    temp_counter += 1
-        
-        # Now replace all occurrences of old temps in the instruction
-        def replace_temp(match):
-            word = match.group(0)
-            return temp_map.get(word, word)
-            
-        new_instr = re.sub(r'\btemp\d+\b', replace_temp, instr)
-        final_instructions.append(new_instr)
-
-    return final_instructions
+            for word in rhs_identifiers(instr.split('=', 1)[1]):
+                if is_temp(word):
+                    temp_reads[word] = temp_reads.get(word, 0) + 1
+
+    result = []
+    last_temp = None    # temp assigned by the last instruction in result
+    for instr in instructions:
+        if '=' not in instr:
+            result.append(instr)
+            last_temp = None
+            continue
+
+        lhs, rhs = instr.split('=', 1)
+        lhs = lhs.strip()
+        rhs = rhs.strip()
+
+        if is_temp(lhs):
+            result.append(instr)
+            last_temp = lhs
+            continue
+
+        if last_temp is not None and rhs == last_temp and temp_reads.get(rhs) == 1:
+            _, prev_rhs = result[-1].split('=', 1)
+            result[-1] = f"{lhs} = {prev_rhs.strip()}"
+        else:
+            result.append(instr)
+        last_temp = None
+
+    return result
+
+
+@register_pass("renumber-temps")
+def renumber_temps(instructions, live_out=None):
+    """Renames temps to temp1, temp2, ... in order of definition."""
+    temp_map = {}
+    result = []
+    for instr in instructions:
+        lhs, eq, rhs = instr.partition('=')
+        if not eq:
+            result.append(instr)
+            continue
+
+        lhs = lhs.strip()
+        if is_temp(lhs) and lhs not in temp_map:
+            temp_map[lhs] = f"temp{len(temp_map) + 1}"
+        operands = rhs.split()
+        if len(operands) == 3:
+            left, op, right = operands
+            rhs = f"{map_operand(left, temp_map)} {op} {map_operand(right, temp_map)}"
+        else:
+            rhs = " ".join([map_operand(operand, temp_map) for operand in operands])
+        result.append(f"{temp_map.get(lhs, lhs)} = {rhs}")
+    return result
+
+
+# Each level is a list of stages: a pass name, or a tuple of passes that
+# is repeated until it no longer changes the code
+PIPELINES = {
+    0: [],
+    1: ["inline-temps", "strength-reduction", "merge-assignments", "renumber-temps"],
+    2: [("constant-propagation", "dead-store-elimination", "inline-temps", "strength-reduction",
+         "merge-assignments"),
+        "renumber-temps"],
+}
+# -O3 adds the e-graph optimizer on the semantic tree (optimization.egraph)
+PIPELINES[3] = PIPELINES[2]
+DEFAULT_LEVEL = 2
+MAX_ITERATIONS = 10
+
+
+class PassStats:
+    """Per-pass totals over optimizer runs: runs, wall time and instruction-count change."""
+
+    def __init__(self):
+        self.passes = {}    # name -> [runs, seconds, delta]
+
+    def record(self, name, seconds, before, after):
+        totals = self.passes.setdefault(name, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += after - before
+
+    def rows(self):
+        """(name, runs, seconds, delta) for each pass, in the order they first ran."""
+        return [(name, runs, seconds, delta) for name, (runs, seconds, delta) in self.passes.items()]
+
+    def format(self):
+        return [f"{name:<24} {runs:>3} run{'s' if runs != 1 else ' '} {seconds * 1000:>9.3f} ms {delta:>+7d}"
+                for name, runs, seconds, delta in self.rows()]
+
+
+def run_pass(name, instructions, live_out, stats):
+    start = time.perf_counter()
+    result = PASSES[name](instructions, live_out)
+    if stats is not None:
+        stats.record(name, time.perf_counter() - start, len(instructions), len(result))
+    return result
+
+
+def optimize_code(instructions, live_out=None, level=DEFAULT_LEVEL, stats=None):
+    """
+    Optimizes intermediate code with the pipeline of an -O level:
+
+    -O0  no optimization.
+    -O1  local cleanup: inline simple temps, strength reduction, merge a
+         temp into the assignment that reads it, renumber temps.
+    -O2  constant and copy propagation with folding and dead-store
+         elimination (see eliminate_dead_stores for `live_out`) together
+         with the -O1 passes, repeated to a fixed point.
+    -O3  as -O2. Callers first rewrite the semantic tree with
+         optimization.egraph.optimize_tree at this level.
+
+    Pass times and instruction-count changes are added to `stats`, a
+    PassStats, when one is given.
+    """
+    if not instructions:
+        return []
+
+    instructions = list(instructions)
+    for stage in PIPELINES[level]:
+        if isinstance(stage, str):
+            instructions = run_pass(stage, instructions, live_out, stats)
+            continue
+        for _ in range(MAX_ITERATIONS):
+            previous = instructions
+            for name in stage:
+                instructions = run_pass(name, instructions, live_out, stats)
+            if instructions == previous:
+                break
+    return instructions
+
+
+def add_optimizer_arguments(parser):
+    parser.add_argument("-O", dest="opt_level", type=int, choices=sorted(PIPELINES), default=DEFAULT_LEVEL,
+                        metavar="LEVEL", help=f"optimization level 0-{max(PIPELINES)} (default: {DEFAULT_LEVEL})")
+    parser.add_argument("--pass-stats", action="store_true", help="print per-pass time and instruction-count changes")
@@ -1,62 +1,197 @@
 from syntax.syntax import Node
+from syntax.flat_ast import NAME, LITERAL, OP, ASSIGN, DIVIDE, POWER, INT, FLOAT
 
+def leaf_type(node, id_types):
+    if node.kind == 'name':
+        return id_types.get(node.value, 'INT')
+    return 'FLOAT' if '.' in node.value else 'INT'
 
-def has_float(node, id_types):
-
-    if node is None:
-        return False
-    
-    if id_types and node.value in id_types:
-        if id_types[node.value] == 'FLOAT':
-            return True
-    
-    if node.value not in ('+', '-', '*', '/', '='):
-        try:
-            val = float(node.value)
-            if '.' in str(node.value) or isinstance(node.value, float):
-                return True
-        except (ValueError, TypeError):
-            pass  
-    
-    return has_float(node.left, id_types) or has_float(node.right, id_types)
-
-
-def is_int_value(value):
-    try:
-        val_str = str(value)
-        if '.' not in val_str:
-            int(value)
-            return True
-        return False
-    except (ValueError, TypeError):
-        return False
-
-
-def add_type_conversions(node, needs_conversion, id_types):
-    if node is None:
+
+def to_float(node, has_division):
+    """
+    Marks an INT subtree used where a FLOAT is expected for conversion (on a
+    copy of its root, since subtrees may be shared). Without a division
+    inside, converting its result once gives the same value as converting
+    every operand. An integer division would truncate, so its operands are
+    converted instead and the division is done in floating point. An
+    exponent is never converted; only the base of a power is.
+    """
+    # Post-order; each occurrence of a shared subtree is copied separately
+    results = []
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if (current.left is None and current.right is None) or not has_division[id(current)]:
+            results.append(Node(current.value, current.left, current.right, current.kind, 'INT', True))
+        elif not visited:
+            stack.append((current, True))
+            if current.value != '^':
+                stack.append((current.right, False))
+            stack.append((current.left, False))
+        else:
+            right = current.right if current.value == '^' else results.pop()
+            left = results.pop()
+            results.append(Node(current.value, left, right, current.kind, 'FLOAT'))
+    return results[0]
+
+
+def infer_types(expression, id_types, expected='INT'):
+    """
+    Single post-order pass over an expression: each node's type is inferred
+    once from its children (FLOAT if either operand is FLOAT) and stored in
+    node.type, and an INT
+    operand only gets a conversion where it meets a FLOAT operand, or where
+    the whole expression is `expected` to be FLOAT. The exponent of a power
+    keeps its type, so a constant integer exponent can still be lowered to
+    multiplications.
+
+    Returns the typed tree and its type. The input tree is not restructured
+    (syntax trees may share cached subtrees); nodes on the path of a
+    conversion are rebuilt.
+    """
+    has_division = {}
+    typed = {}
+    converted = {}
+
+    def convert(operand):
+        # A shared operand is converted once per statement
+        key = id(operand)
+        if key not in converted:
+            converted[key] = to_float(operand, has_division)
+        return converted[key]
+
+    stack = [(expression, False)]
+    while stack:
+        node, visited = stack.pop()
+        key = id(node)
+        if key in typed:
+            continue
+        left, right = node.left, node.right
+        if left is None and right is None:
+            node.type = leaf_type(node, id_types)
+            has_division[key] = False
+            typed[key] = node
+            continue
+        if not visited:
+            stack.append((node, True))
+            if right is not None:
+                stack.append((right, False))
+            if left is not None:
+                stack.append((left, False))
+            continue
+
+        new_left = typed[id(left)] if left is not None else None
+        new_right = typed[id(right)] if right is not None else None
+        left_type = left.type if left is not None else 'INT'
+        right_type = right.type if right is not None else 'INT'
+
+        if 'FLOAT' in (left_type, right_type):
+            node.type = 'FLOAT'
+            has_division[key] = False
+            if left is not None and left_type == 'INT':
+                new_left = convert(new_left)
+            if right is not None and right_type == 'INT' and node.value != '^':
+                new_right = convert(new_right)
+        else:
+            # Both operands are INT, so nothing below needs rebuilding
+            node.type = 'INT'
+            has_division[key] = (node.value == '/'
+                                 or (left is not None and has_division[id(left)])
+                                 or (right is not None and node.value != '^' and has_division[id(right)]))
+
+        if new_left is left and new_right is right:
+            typed[key] = node
+        else:
+            typed[key] = Node(node.value, new_left, new_right, node.kind, node.type)
+
+    result, result_type = typed[id(expression)], expression.type
+    if expected == 'FLOAT' and result_type == 'INT':
+        result, result_type = to_float(result, has_division), 'FLOAT'
+    return result, result_type
+
+
+def analyze_statement(statement, id_types):
+    if statement is None:
         return None
-    
-    node.left = add_type_conversions(node.left, needs_conversion, id_types)
-    node.right = add_type_conversions(node.right, needs_conversion, id_types)
-    
-    if needs_conversion and node.value not in ('+', '-', '*', '/', '='):
-        is_int_id = node.value in id_types and id_types[node.value] == 'INT'
-        if is_int_value(node.value) or is_int_id:
-            
-            if is_int_id:
-                val = node.value
-            else:
-                val = str(float(node.value))
-            
-            result_node = Node(val)
-            result_node.left = Node("int_to_float")
-            result_node.left.left = Node(node.value)
-            return result_node
-    
-    return node
+
+    if statement.value != '=' or statement.left is None:
+        typed, _ = infer_types(statement, id_types)
+        return typed
+
+    # Assigning an INT to a FLOAT variable converts it; a FLOAT value makes the target FLOAT
+    target = statement.left
+    value, value_type = infer_types(statement.right, id_types, id_types.get(target.value, 'INT'))
+
+    # Record the target's type in the shared symbol table so later
+    # statements that read it are typed without asking the user.
+    id_types[target.value] = value_type
+    if value is statement.right:
+        return statement
+    return Node('=', target, value)
 
 
 def semantic_analysis(tree, id_types):
-       
-    needs_conversion = has_float(tree, id_types)    
-    return add_type_conversions(tree, needs_conversion, id_types)
\ No newline at end of file
+
+    if tree is None or tree.value != ';':
+        return analyze_statement(tree, id_types)
+
+    # Programs are analyzed one statement at a time, in order
+    sequence = []
+    node = tree
+    while node.value == ';':
+        sequence.append(node)
+        node = node.left
+    result = analyze_statement(node, id_types)
+    for node in reversed(sequence):
+        result = Node(';', result, analyze_statement(node.right, id_types))
+    return result
+
+
+def analyze_flat(ast, id_types):
+    """
+    semantic_analysis for a FlatAST, by index: the same typing and
+    conversion rules, written into its type and convert columns in place.
+    Nodes are in post-order, so one forward loop sees every operand typed
+    before its operator and every statement after the ones before it.
+    """
+    kind, op, left, right, ref = ast.kind, ast.op, ast.left, ast.right, ast.ref
+    types, convert, symbols = ast.type, ast.convert, ast.symbols
+    has_division = bytearray(len(ast))
+
+    def to_float(i):
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            if kind[j] != OP or not has_division[j]:
+                convert[j] = 1
+            else:
+                types[j] = FLOAT
+                if op[j] != POWER:
+                    stack.append(right[j])
+                stack.append(left[j])
+
+    for i in range(len(ast)):
+        k = kind[i]
+        if k == NAME:
+            types[i] = FLOAT if id_types.get(symbols[ref[i]], 'INT') == 'FLOAT' else INT
+        elif k == LITERAL:
+            types[i] = FLOAT if '.' in symbols[ref[i]] else INT
+        elif k == OP:
+            l, r = left[i], right[i]
+            if types[l] == FLOAT or types[r] == FLOAT:
+                types[i] = FLOAT
+                if types[l] == INT:
+                    to_float(l)
+                if types[r] == INT and op[i] != POWER:
+                    to_float(r)
+            else:
+                types[i] = INT
+                has_division[i] = op[i] == DIVIDE or has_division[l] or (has_division[r] and op[i] != POWER)
+        elif k == ASSIGN:
+            target, value = symbols[ref[left[i]]], right[i]
+            if types[value] == INT and id_types.get(target) == 'FLOAT':
+                to_float(value)
+            is_float = types[value] == FLOAT or convert[value]
+            types[i] = FLOAT if is_float else INT
+            id_types[target] = 'FLOAT' if is_float else 'INT'
+    return ast
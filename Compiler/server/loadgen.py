@@ -0,0 +1,121 @@
+"""
+Load generator for the compile server.
+
+Opens several concurrent connections, keeps a fixed number of pipelined
+requests in flight on each, and reports throughput and latency percentiles.
+
+    python -m server.loadgen --tcp 127.0.0.1:8765 --clients 8 --pipeline 16 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+EQUATIONS = [
+    "x = a * 2 + b / 3",
+    "y = (a + b) * (a - b)",
+    "z = a * 3.5 + 2",
+    "w = a + b + a * b - 1",
+    "v = (a * a + b * b) / 2.0",
+]
+
+
+def make_request(request_id, method, rng, distinct):
+    equation = rng.choice(EQUATIONS)
+    # `distinct` controls how often parameters repeat, i.e. the cache hit ratio
+    seed = rng.randrange(distinct) if distinct else request_id
+    if method == "compile":
+        types = {"a": "int" if seed % 2 else "float", "b": "int" if seed % 3 else "float"}
+        params = {"equation": equation + f" + {seed}", "types": types}
+    else:
+        params = {"equation": equation, "values": {"a": seed % 97 + 1, "b": float(seed % 13 + 1)}}
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+async def run_client(args, count, first_id, latencies, errors):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix, limit=2 ** 24)
+    else:
+        host, _, port = args.tcp.rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port), limit=2 ** 24)
+
+    rng = random.Random(first_id)
+    sent_at = {}
+    window = asyncio.Semaphore(args.pipeline)
+
+    async def send_all():
+        for request_id in range(first_id, first_id + count):
+            await window.acquire()
+            sent_at[request_id] = time.perf_counter()
+            writer.write(json.dumps(make_request(request_id, args.method, rng, args.distinct)).encode() + b"\n")
+            await writer.drain()
+
+    async def receive_all():
+        for _ in range(count):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            response = json.loads(line)
+            latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+            if "error" in response:
+                errors.append(response["error"])
+            window.release()
+
+    await asyncio.gather(send_all(), receive_all())
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run(args):
+    latencies = []
+    errors = []
+    per_client = args.requests // args.clients
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(args, per_client, i * per_client, latencies, errors)
+        for i in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Requests:    {total} ({len(errors)} errors) over {args.clients} clients, pipeline depth {args.pipeline}")
+    print(f"Elapsed:     {elapsed:.3f} s")
+    print(f"Throughput:  {total / elapsed:.1f} req/s")
+    print("Latency (ms): " + "  ".join(
+        f"p{p}={percentile(latencies, p) * 1000:.2f}" for p in (50, 90, 99)
+    ) + f"  max={latencies[-1] * 1000 if latencies else 0:.2f}")
+    if errors:
+        print(f"First error: {errors[0]}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UniCompiler compile server load generator")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--unix", metavar="PATH", help="connect to a Unix socket")
+    where.add_argument("--tcp", metavar="HOST:PORT", default="127.0.0.1:8765")
+    parser.add_argument("--method", choices=("compile", "execute"), default="compile")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--pipeline", type=int, default=8, help="in-flight requests per connection")
+    parser.add_argument("--requests", type=int, default=10000, help="total requests")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="number of distinct parameter sets (0 = all unique)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+UniCompiler - Compile Server
+
+Long-running JSON-RPC 2.0 service over a Unix socket or localhost TCP.
+Requests are newline-delimited JSON objects:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "compile",
+     "params": {"equation": "x = a * 2", "types": {"a": "int"}}}
+
+    {"jsonrpc": "2.0", "id": 2, "method": "execute",
+     "params": {"equation": "x = a * 2", "values": {"a": 3}}}
+
+Clients may pipeline any number of requests on one connection; responses
+carry the request id and are written as soon as each job finishes.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from server import worker
+from optimization.optimizer import add_optimizer_arguments, DEFAULT_LEVEL
+from assembly.target import add_target_arguments, DEFAULT_TARGET
+from metrics.metrics import get_recorder, add_metrics_arguments, configure_from_args, flush
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+COMPILE_ERROR = -32000
+SERVER_ERROR = -32603
+
+MAX_LINE = 16 * 1024 * 1024
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ResultCache:
+    """Small LRU cache of finished artifacts keyed by method and parameters."""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        if self.size <= 0:
+            return None
+        result = self.entries.get(key)
+        get_recorder().cache_lookup("results", result is not None)
+        if result is None:
+            return None
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        if self.size <= 0:
+            return
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class CompileServer:
+    def __init__(self, workers=None, queue_size=256, cache_size=1024, opt_level=DEFAULT_LEVEL,
+                 target=DEFAULT_TARGET):
+        self.workers = workers or os.cpu_count() or 2
+        self.opt_level = opt_level
+        self.target = target
+        self.queue_size = queue_size
+        self.cache = ResultCache(cache_size)
+        self.queue = None
+        self.pools = {}
+        self.dispatchers = []
+
+        # method -> (pool name, job function, name of the params mapping)
+        self.methods = {
+            "compile": ("compile", worker.compile_job, "types"),
+            "execute": ("execute", worker.execute_job, "values"),
+        }
+
+    def start_pools(self):
+        self.pools["compile"] = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=worker.init_compile_worker, initargs=(self.opt_level, self.target)
+        )
+        self.pools["execute"] = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=worker.init_execute_worker
+        )
+        # Spin every process up now instead of on the first request
+        for pool in self.pools.values():
+            for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+
+    async def start(self, host=None, port=None, unix_path=None):
+        self.start_pools()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+
+        # One dispatcher per worker slot keeps every process busy while the
+        # bounded queue throttles readers when the pool falls behind.
+        for _ in range(2 * self.workers * len(self.pools)):
+            self.dispatchers.append(asyncio.create_task(self.dispatch()))
+
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            return await asyncio.start_unix_server(self.handle_client, path=unix_path, limit=MAX_LINE)
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+
+    def shutdown(self):
+        for task in self.dispatchers:
+            task.cancel()
+        for pool in self.pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self.respond(writer, write_lock, self.error(None, INVALID_REQUEST, "Request too large"))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await self.respond(writer, write_lock, self.error(None, PARSE_ERROR, f"Parse error: {e}"))
+                    continue
+
+                # Blocks when the queue is full, which stops reading from this
+                # client until the workers catch up.
+                await self.queue.put((request, writer, write_lock))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            request, writer, write_lock = await self.queue.get()
+            try:
+                response = await self.process(loop, request)
+                if response is not None:
+                    await self.respond(writer, write_lock, response)
+            except ConnectionError:
+                pass
+            finally:
+                self.queue.task_done()
+
+    async def process(self, loop, request):
+        request_id = request.get("id") if isinstance(request, dict) else None
+        recorder = get_recorder()
+        start = time.perf_counter()
+        method = None
+        try:
+            method, params = self.validate(request)
+            pool_name, job, arg_name = self.methods[method]
+
+            key = (method, params["equation"], json.dumps(params[arg_name], sort_keys=True))
+            result = self.cache.get(key)
+            if result is None:
+                try:
+                    result, timings = await loop.run_in_executor(
+                        self.pools[pool_name], job, params["equation"], params[arg_name]
+                    )
+                except KeyError as e:
+                    raise RPCError(INVALID_PARAMS, str(e.args[0]))
+                except (ValueError, SyntaxError, ZeroDivisionError) as e:
+                    raise RPCError(COMPILE_ERROR, str(e))
+                self.cache.put(key, result)
+                self.record(recorder, method, result, timings)
+        except RPCError as e:
+            recorder.request(method or "invalid", time.perf_counter() - start, ok=False)
+            return self.error(request_id, e.code, e.message)
+        except Exception as e:
+            recorder.request(method or "invalid", time.perf_counter() - start, ok=False)
+            return self.error(request_id, SERVER_ERROR, f"Internal error: {e}")
+
+        recorder.request(method, time.perf_counter() - start)
+
+        # Notifications (no id) get no response
+        if not isinstance(request, dict) or "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def record(self, recorder, method, result, timings):
+        if not recorder.enabled:
+            return
+        for phase, seconds in timings.items():
+            recorder.observe_phase(phase, seconds)
+        if method == "compile":
+            recorder.compiled(result["icg"], result["assembly"])
+            recorder.optimized(timings.passes)
+        else:
+            recorder.evaluated()
+
+    def validate(self, request):
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0":
+            raise RPCError(INVALID_REQUEST, "Invalid request")
+
+        method = request.get("method")
+        if method not in self.methods:
+            raise RPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+        params = request.get("params")
+        arg_name = self.methods[method][2]
+        if not isinstance(params, dict) or not isinstance(params.get("equation"), str):
+            raise RPCError(INVALID_PARAMS, "params.equation must be a string")
+        params.setdefault(arg_name, {})
+        if not isinstance(params[arg_name], dict):
+            raise RPCError(INVALID_PARAMS, f"params.{arg_name} must be an object")
+        return method, params
+
+    def error(self, request_id, code, message):
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    async def respond(self, writer, write_lock, response):
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(response).encode() + b"\n")
+        async with write_lock:
+            await writer.drain()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UniCompiler compile server")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    where.add_argument("--tcp", metavar="HOST:PORT", default="127.0.0.1:8765",
+                       help="listen on TCP (default: 127.0.0.1:8765)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes per pool")
+    parser.add_argument("--queue-size", type=int, default=256, help="max queued requests before backpressure")
+    parser.add_argument("--cache-size", type=int, default=1024, help="LRU result cache entries (0 disables)")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="seconds between --metrics-file writes")
+    add_optimizer_arguments(parser)
+    add_target_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args(argv)
+
+
+async def write_metrics_periodically(args):
+    while True:
+        await asyncio.sleep(args.metrics_interval)
+        flush(args)
+
+
+async def serve(args):
+    configure_from_args(args)
+    server = CompileServer(args.workers, args.queue_size, args.cache_size, args.opt_level, args.target)
+    if args.unix:
+        listener = await server.start(unix_path=args.unix)
+        where = args.unix
+    else:
+        host, _, port = args.tcp.rpartition(":")
+        listener = await server.start(host or "127.0.0.1", int(port))
+        where = args.tcp
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Compile server listening on {where} ({server.workers} workers per pool, -O{server.opt_level}, "
+          f"target {server.target})")
+    writer = asyncio.create_task(write_metrics_periodically(args)) if args.metrics_file else None
+    async with listener:
+        await stop.wait()
+
+    print("\nShutting down...")
+    if writer:
+        writer.cancel()
+    server.shutdown()
+    flush(args)
+    if args.unix and os.path.exists(args.unix):
+        os.unlink(args.unix)
+
+
+def main(argv=None):
+    asyncio.run(serve(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
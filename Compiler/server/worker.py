@@ -0,0 +1,161 @@
+"""
+Worker-side jobs for the compile server.
+
+The Compiler and Hybrid front ends share module names (lexer, syntax,
+semantic, ...), so each worker process loads exactly one of them in its
+initializer and keeps it warm for every job it receives.
+"""
+
+import io
+import os
+import signal
+import sys
+import time
+from contextlib import redirect_stdout
+
+COMPILER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HYBRID_DIR = os.path.join(os.path.dirname(COMPILER_DIR), "Hybrid")
+
+_SHARED_MODULES = ("lexer", "syntax", "semantic", "tree_utils", "executor")
+
+_pipeline = {}
+
+
+def _load_from(directory):
+    # Ctrl+C is handled by the server process, which shuts the pools down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    for name in list(sys.modules):
+        if name.split(".")[0] in _SHARED_MODULES:
+            del sys.modules[name]
+    if directory in sys.path:
+        sys.path.remove(directory)
+    sys.path.insert(0, directory)
+
+
+def init_compile_worker(opt_level=None, target=None):
+    _load_from(COMPILER_DIR)
+
+    from lexer.lexer import lexical_walk, input_identifiers
+    from syntax.syntax import build_syntax_tree
+    from semantic.semantic import semantic_analysis
+    from icg.icg import generate_intermediate_code
+    from optimization.optimizer import optimize_code, PassStats, DEFAULT_LEVEL
+    from optimization.egraph import optimize_tree, EGRAPH_LEVEL
+    from assembly.assembly import generate_assembly
+    from assembly.target import TARGETS, DEFAULT_TARGET
+
+    _pipeline.update(
+        lexical_walk=lexical_walk,
+        input_identifiers=input_identifiers,
+        build_syntax_tree=build_syntax_tree,
+        semantic_analysis=semantic_analysis,
+        generate_intermediate_code=generate_intermediate_code,
+        optimize_tree=optimize_tree,
+        egraph_level=EGRAPH_LEVEL,
+        optimize_code=optimize_code,
+        PassStats=PassStats,
+        opt_level=DEFAULT_LEVEL if opt_level is None else opt_level,
+        generate_assembly=generate_assembly,
+        target=TARGETS[target or DEFAULT_TARGET],
+    )
+    # Warm up the pipeline once so the first real request does not pay for it
+    compile_job("x = a * 2 + 1.5", {"a": "int"})
+
+
+def init_execute_worker():
+    _load_from(HYBRID_DIR)
+
+    from lexer import lexical_walk, input_identifiers
+    from syntax import build_syntax_tree
+    from semantic import semantic_analysis
+    from executor import direct_execute
+
+    _pipeline.update(
+        lexical_walk=lexical_walk,
+        input_identifiers=input_identifiers,
+        build_syntax_tree=build_syntax_tree,
+        semantic_analysis=semantic_analysis,
+        direct_execute=direct_execute,
+    )
+    execute_job("x = a * 2 + 1.5", {"a": 1})
+
+
+class _Timings(dict):
+    """Per-phase wall times for one job, reported back to the server's recorder."""
+
+    passes = ()     # PassStats rows of a compile job
+
+    def run(self, phase, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self[phase] = time.perf_counter() - start
+        return result
+
+
+def _lex(equation, timings):
+    # lexical_walk prints the token string; keep worker output quiet
+    with redirect_stdout(io.StringIO()):
+        return timings.run("lexical", _pipeline["lexical_walk"], equation)
+
+
+def compile_job(equation, types):
+    """Returns (artifacts, phase timings)."""
+    timings = _Timings()
+    tokens, id_map = _lex(equation, timings)
+
+    id_types = {}
+    for var_name in _pipeline["input_identifiers"](tokens):
+        type_name = str(types.get(var_name, "")).upper()
+        if type_name not in ("INT", "FLOAT"):
+            raise KeyError(f"Missing or invalid type for '{var_name}' (expected int/float)")
+        id_types[var_name] = type_name
+
+    tree = timings.run("syntax", _pipeline["build_syntax_tree"], tokens)
+    semantic_tree = timings.run("semantic", _pipeline["semantic_analysis"], tree, id_types)
+    if _pipeline["opt_level"] >= _pipeline["egraph_level"]:
+        semantic_tree = timings.run("egraph", _pipeline["optimize_tree"], semantic_tree)
+    icg_instructions = timings.run("icg", _pipeline["generate_intermediate_code"], semantic_tree, id_map)
+    pass_stats = _pipeline["PassStats"]()
+    optimized_instructions = timings.run("optimization", _pipeline["optimize_code"],
+                                         icg_instructions, None, _pipeline["opt_level"], pass_stats)
+    timings.passes = pass_stats.rows()
+    assembly_code = timings.run("assembly", _pipeline["generate_assembly"], optimized_instructions, id_types,
+                                _pipeline["target"])
+
+    return {
+        "tokens": [[t.type, t.value] for t in tokens],
+        "id_map": id_map,
+        "icg": icg_instructions,
+        "optimized": optimized_instructions,
+        "assembly": assembly_code,
+    }, timings
+
+
+def execute_job(equation, values):
+    """Returns (result, phase timings)."""
+    timings = _Timings()
+    tokens, id_map = _lex(equation, timings)
+
+    id_types = {}
+    id_values = {}
+    for var_name in _pipeline["input_identifiers"](tokens):
+        if var_name not in values:
+            raise KeyError(f"Missing value for '{var_name}'")
+        value = values[var_name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise KeyError(f"Value for '{var_name}' must be a number")
+        id_types[var_name] = "FLOAT" if isinstance(value, float) else "INT"
+        id_values[var_name] = value
+
+    tree = timings.run("syntax", _pipeline["build_syntax_tree"], tokens)
+    timings.run("semantic", _pipeline["semantic_analysis"], tree, id_types)
+    result, steps, _, result_var = timings.run(
+        "execution", _pipeline["direct_execute"], tree, id_map, id_values
+    )
+
+    return {
+        "result": result,
+        "variable": result_var,
+        "steps": steps,
+    }, timings
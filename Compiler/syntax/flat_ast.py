@@ -0,0 +1,263 @@
+"""
+Flat, struct-of-arrays syntax trees.
+
+A FlatAST keeps one column per field instead of one object per node: kind,
+operator, left and right child index, and ref (index into the symbol table
+of identifier names and literal texts), plus the type and convert columns
+semantic analysis fills in. Nodes are stored in the order the parser
+completes them, which is post-order: children always come before their
+parent, so most passes are a single forward loop over the indices.
+"""
+
+from array import array
+
+from syntax.syntax import Node
+
+NAME, LITERAL, OP, ASSIGN, SEQ = range(5)
+KIND_NAMES = ('name', 'literal', 'op', 'assign', 'seq')
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+ASSIGN_SYMBOL = '='
+OPERATORS = ('+', '-', '*', '/', '^', ASSIGN_SYMBOL, ';')
+OPERATOR_CODES = {symbol: code for code, symbol in enumerate(OPERATORS)}
+DIVIDE = OPERATOR_CODES['/']
+POWER = OPERATOR_CODES['^']
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '^': 3}
+
+# type column: 0 until semantic analysis has run
+INT, FLOAT = 1, 2
+TYPE_NAMES = (None, 'INT', 'FLOAT')
+TYPE_CODES = {None: 0, 'INT': INT, 'FLOAT': FLOAT}
+
+
+class FlatAST:
+    def __init__(self):
+        self.kind = array('b')
+        self.op = array('b')
+        self.left = array('i')
+        self.right = array('i')
+        self.ref = array('i')
+        self.type = array('b')
+        self.convert = array('b')
+        self.symbols = []
+        self.symbol_ids = {}
+        self.root = -1
+
+    def __len__(self):
+        return len(self.kind)
+
+    def add_leaf(self, kind, text):
+        symbol = self.symbol_ids.get(text)
+        if symbol is None:
+            symbol = self.symbol_ids[text] = len(self.symbols)
+            self.symbols.append(text)
+        return self._add(kind, -1, -1, -1, symbol)
+
+    def add_node(self, kind, operator, left, right):
+        return self._add(kind, OPERATOR_CODES[operator], left, right, -1)
+
+    def _add(self, kind, op, left, right, ref):
+        self.kind.append(kind)
+        self.op.append(op)
+        self.left.append(left)
+        self.right.append(right)
+        self.ref.append(ref)
+        self.type.append(0)
+        self.convert.append(0)
+        return len(self.kind) - 1
+
+    def value(self, i):
+        """The text a Node would hold for index i."""
+        ref = self.ref[i]
+        return self.symbols[ref] if ref >= 0 else OPERATORS[self.op[i]]
+
+    def nbytes(self):
+        """Bytes held by the columns (the symbol strings are shared with the tokens)."""
+        columns = (self.kind, self.op, self.left, self.right, self.ref, self.type, self.convert)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+def build_flat_ast(tokens):
+    """
+    Parses tokens straight into a FlatAST. Same grammar and tree shape as
+    build_syntax_tree, but each expression is one left-to-right operator
+    precedence pass instead of repeated list splicing, so it is linear and
+    has no recursion.
+    """
+    if not tokens:
+        raise ValueError("Empty token list")
+
+    ast = FlatAST()
+    start = 0
+    for i in range(len(tokens) + 1):
+        if i == len(tokens) or tokens[i].type == "SEPARATOR":
+            if i > start:
+                statement = parse_statement(ast, tokens, start, i)
+                # Chained as each statement ends, so the ';' nodes stay in post-order
+                ast.root = statement if ast.root < 0 else ast.add_node(SEQ, ';', ast.root, statement)
+            start = i + 1
+
+    if ast.root < 0:
+        raise ValueError("Empty token list")
+    return ast
+
+
+def parse_statement(ast, tokens, start, end):
+    if end - start >= 2 and tokens[start + 1].type != "ASSIGN":
+        raise SyntaxError(f"Expected '{ASSIGN_SYMBOL}' as the second token")
+
+    if tokens[start].type == "ASSIGN" or end - start == 2:
+        raise ValueError("Invalid assignment expression")
+    if end - start == 1:
+        return parse_expr(ast, tokens, start, end)
+
+    target = tokens[start]
+    if target.type not in ("IDENTIFIER", "INT", "FLOAT"):
+        raise ValueError("Invalid assignment expression")
+    left = ast.add_leaf(NAME if target.type == "IDENTIFIER" else LITERAL, target.value)
+    right = parse_expr(ast, tokens, start + 2, end)
+    return ast.add_node(ASSIGN, ASSIGN_SYMBOL, left, right)
+
+
+def parse_expr(ast, tokens, start, end):
+    if start == end:
+        raise ValueError("Empty expression")
+
+    operands = []
+    operators = []
+    expect_operand = True
+
+    def reduce():
+        operator = operators.pop()
+        right = operands.pop()
+        left = operands.pop()
+        operands.append(ast.add_node(OP, operator, left, right))
+
+    for position in range(start, end):
+        t = tokens[position]
+        if t.type in ("IDENTIFIER", "INT", "FLOAT"):
+            if not expect_operand:
+                raise ValueError("Invalid expression structure")
+            operands.append(ast.add_leaf(NAME if t.type == "IDENTIFIER" else LITERAL, t.value))
+            expect_operand = False
+        elif t.type == "LPAREN":
+            if not expect_operand:
+                raise ValueError("Invalid expression structure")
+            operators.append("(")
+        elif t.type == "RPAREN":
+            if expect_operand:
+                if operators and operators[-1] == "(":
+                    raise ValueError("Empty expression")
+                raise ValueError(f"Invalid expression: operator at position {position - start - 1}")
+            while operators and operators[-1] != "(":
+                reduce()
+            if not operators:
+                raise ValueError("Unmatched parentheses")
+            operators.pop()
+        elif t.type == "OPERATOR":
+            if expect_operand:
+                raise ValueError(f"Invalid expression: operator at position {position - start}")
+            # ^ is right-associative: a pending ^ waits for the one that follows
+            while (operators and operators[-1] != "(" and
+                   (PRECEDENCE[operators[-1]] > PRECEDENCE[t.value] or
+                    PRECEDENCE[operators[-1]] == PRECEDENCE[t.value] and t.value != "^")):
+                reduce()
+            operators.append(t.value)
+            expect_operand = True
+        else:
+            raise ValueError("Invalid expression structure")
+
+    if expect_operand:
+        raise ValueError(f"Invalid expression: operator at position {end - start - 1}")
+    while operators:
+        if operators[-1] == "(":
+            raise ValueError("Unmatched parentheses")
+        reduce()
+    return operands[0]
+
+
+def from_tree(tree):
+    """FlatAST of a Node tree (shared subtrees are expanded), in post-order."""
+    ast = FlatAST()
+    if tree is None:
+        return ast
+
+    index = []
+    stack = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node.left is None and node.right is None:
+            i = ast.add_leaf(KIND_CODES[node.kind], node.value)
+        elif not visited:
+            stack.append((node, True))
+            if node.right is not None:
+                stack.append((node.right, False))
+            if node.left is not None:
+                stack.append((node.left, False))
+            continue
+        else:
+            right = index.pop() if node.right is not None else -1
+            left = index.pop() if node.left is not None else -1
+            i = ast.add_node(KIND_CODES[node.kind], node.value, left, right)
+        ast.type[i] = TYPE_CODES[node.type]
+        ast.convert[i] = node.convert
+        index.append(i)
+
+    ast.root = index[-1]
+    return ast
+
+
+def to_tree(ast):
+    """Node tree of a FlatAST."""
+    nodes = []
+    kind, left, right = ast.kind, ast.left, ast.right
+    for i in range(len(ast)):
+        l, r = left[i], right[i]
+        nodes.append(Node(ast.value(i), nodes[l] if l >= 0 else None, nodes[r] if r >= 0 else None,
+                          KIND_NAMES[kind[i]], TYPE_NAMES[ast.type[i]], bool(ast.convert[i])))
+    return nodes[ast.root] if nodes else None
+
+
+class FlatNode:
+    """
+    Node-like view of one index of a FlatAST, so code written against Node
+    can walk a flat tree without converting it. Views are made on access.
+    """
+    __slots__ = ('ast', 'index')
+
+    def __init__(self, ast, index):
+        self.ast = ast
+        self.index = index
+
+    @property
+    def value(self):
+        return self.ast.value(self.index)
+
+    @property
+    def left(self):
+        i = self.ast.left[self.index]
+        return FlatNode(self.ast, i) if i >= 0 else None
+
+    @property
+    def right(self):
+        i = self.ast.right[self.index]
+        return FlatNode(self.ast, i) if i >= 0 else None
+
+    @property
+    def kind(self):
+        return KIND_NAMES[self.ast.kind[self.index]]
+
+    @property
+    def type(self):
+        return TYPE_NAMES[self.ast.type[self.index]]
+
+    @type.setter
+    def type(self, value):
+        self.ast.type[self.index] = TYPE_CODES[value]
+
+    @property
+    def convert(self):
+        return bool(self.ast.convert[self.index])
+
+    def __repr__(self):
+        return f"FlatNode({self.value}, {self.left}, {self.right})"
@@ -1,23 +1,133 @@
+import hashlib
+
 from lexer.lexer import Token
 
+KINDS = {'+': 'op', '-': 'op', '*': 'op', '/': 'op', '^': 'op', '=': 'assign', ';': 'seq'}
+
+
 class Node:
-    def __init__(self, value, left=None, right=None):
+    """
+    Syntax tree node. kind is 'op', 'assign', 'seq', 'name' or 'literal'.
+    Semantic analysis fills in type ('INT' or 'FLOAT') and sets convert on an
+    INT value that is converted to FLOAT where it is used.
+    """
+    __slots__ = ('value', 'left', 'right', 'kind', 'type', 'convert')
+
+    def __init__(self, value, left=None, right=None, kind=None, type=None, convert=False):
         self.value = value
         self.left = left
         self.right = right
+        self.kind = kind or KINDS.get(value) or ('literal' if str(value)[:1].isdigit() else 'name')
+        self.type = type
+        self.convert = convert
     
     def __repr__(self):
         return f"Node({self.value}, {self.left}, {self.right})"
 
-def build_syntax_tree(tokens):
+
+class NodeTable:
+    """
+    Hash-consing for syntax trees: node() hands back the node it already
+    built for the same value, kind and children, so structurally identical
+    subtrees are a single shared object and the tree becomes a DAG. Children
+    are shared the same way, so their identity stands for their structure.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, value, left=None, right=None, kind=None):
+        key = (value, kind, id(left), id(right))
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = Node(value, left, right, kind)
+        return node
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def structural_hash(node, memo=None):
+    """
+    Stable hex digest of a subtree's structure (value, kind and children),
+    the same across runs and whether or not the tree is shared. memo maps
+    id(node) to digests already known, so each shared node is hashed once.
+    """
+    memo = {} if memo is None else memo
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if current is None or id(current) in memo:
+            continue
+        if not visited:
+            stack.append((current, True))
+            stack.append((current.right, False))
+            stack.append((current.left, False))
+            continue
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{current.kind}:{current.value}:".encode())
+        for child in (current.left, current.right):
+            digest.update(memo[id(child)].encode() if child is not None else b"-")
+            digest.update(b":")
+        memo[id(current)] = digest.hexdigest()
+    return memo[id(node)] if node is not None else None
+
+
+class SubtreeCache:
+    """
+    Trees of parenthesized subexpressions, keyed by the items inside the
+    parentheses, so re-parsing an edited equation reuses the groups the edit
+    did not touch. Only entries that the latest parse used or built survive
+    the next rotate(). Cached subtrees are shared, so later phases must not
+    restructure the syntax tree; the only thing written to its nodes is the
+    type semantic analysis infers, which depends on the subtree and the
+    symbol table of the run that wrote it. Runs sharing a cache must not
+    overlap (the GUI's BackgroundRunner runs one job at a time).
+    """
+
+    def __init__(self):
+        self.previous = {}
+        self.current = {}
+        self.hits = 0
+
+    def get(self, key):
+        tree = self.current.get(key)
+        if tree is None:
+            tree = self.previous.get(key)
+            if tree is not None:
+                self.current[key] = tree
+        if tree is not None:
+            self.hits += 1
+        return tree
+
+    def put(self, key, tree):
+        self.current[key] = tree
+
+    def rotate(self):
+        self.previous = self.current
+        self.current = {}
+        self.hits = 0
+
+
+def build_syntax_tree(tokens, cache=None, share=False):
+    """
+    Syntax tree of a token list. With share, identical subtrees are built
+    once and shared (see NodeTable), so the result may be a DAG; later
+    phases never restructure it. Sharing halves the nodes held but is often
+    slower to parse and generate code for (see benchmarks.bench_hashcons),
+    so it is off by default.
+    """
     if not tokens:
         raise ValueError("Empty token list")
-    
+
+    make = NodeTable().node if share else Node
 
     nodes = []
     for t in tokens:
-        if t.type in ("IDENTIFIER", "INT", "FLOAT"):
-            nodes.append(Node(t.value))
+        if t.type == "IDENTIFIER":
+            nodes.append(make(t.value, kind="name"))
+        elif t.type in ("INT", "FLOAT"):
+            nodes.append(make(t.value, kind="literal"))
         else:
             nodes.append(t.value)  
 
@@ -29,29 +139,65 @@ def build_syntax_tree(tokens):
     def parse_expr(expr_list):
         if not expr_list:
             raise ValueError("Empty expression")
-        
-        expr_list = expr_list.copy()  
 
+        # Match the parentheses first; each group is then reduced when its
+        # ')' is reached, with the enclosing lists kept on a stack
+        closing = {}
+        opened = []
+        for i, item in enumerate(expr_list):
+            value = get_value(item)
+            if value == "(":
+                opened.append(i)
+            elif value == ")" and opened:
+                closing[opened.pop()] = i
+        if opened:
+            raise ValueError("Unmatched parentheses")
 
+        enclosing = []      # (index of the group's ')', cache key, enclosing items)
+        items = []
         i = 0
         while i < len(expr_list):
-            if get_value(expr_list[i]) == "(":
-                depth = 1
-                j = i + 1
-                while j < len(expr_list) and depth > 0:
-                    val = get_value(expr_list[j])
-                    if val == "(":
-                        depth += 1
-                    elif val == ")":
-                        depth -= 1
-                    j += 1
-                if depth != 0:
-                    raise ValueError("Unmatched parentheses")
-
-                sub_tree = parse_expr(expr_list[i + 1:j - 1])
-                expr_list[i:j] = [sub_tree]
+            item = expr_list[i]
+            if get_value(item) == "(":
+                j = closing[i]
+                key = None
+                if cache is not None:
+                    group = expr_list[i + 1:j]
+                    key = tuple((isinstance(g, Node), g.value if isinstance(g, Node) else g) for g in group)
+                    sub_tree = cache.get(key)
+                    if sub_tree is not None:
+                        items.append(sub_tree)
+                        i = j + 1
+                        continue
+                enclosing.append((j, key, items))
+                items = []
+            elif enclosing and i == enclosing[-1][0]:
+                _, key, outer = enclosing.pop()
+                sub_tree = reduce_expr(items)
+                if key is not None:
+                    cache.put(key, sub_tree)
+                outer.append(sub_tree)
+                items = outer
             else:
-                i += 1
+                items.append(item)
+            i += 1
+        return reduce_expr(items)
+
+    def reduce_expr(expr_list):
+        """Tree of an expression without parentheses, an item list."""
+        if not expr_list:
+            raise ValueError("Empty expression")
+
+        # ^ binds tightest and groups right to left: a ^ b ^ c is a ^ (b ^ c)
+        i = len(expr_list) - 2
+        while i > 0:
+            if get_value(expr_list[i]) == "^":
+                left = expr_list[i - 1]
+                right = expr_list[i + 1]
+                if get_value(left) is not None or get_value(right) is not None:
+                    raise ValueError(f"Invalid expression: operator at position {i}")
+                expr_list[i - 1:i + 2] = [make("^", left, right)]
+            i -= 1
 
 
         i = 1
@@ -61,7 +207,7 @@ def build_syntax_tree(tokens):
                     raise ValueError(f"Invalid expression: operator at position {i}")
                 left = expr_list[i - 1]
                 right = expr_list[i + 1]
-                expr_list[i - 1:i + 2] = [Node(expr_list[i], left, right)]
+                expr_list[i - 1:i + 2] = [make(expr_list[i], left, right)]
             else:
                 i += 1
 
@@ -73,7 +219,7 @@ def build_syntax_tree(tokens):
                     raise ValueError(f"Invalid expression: operator at position {i}")
                 left = expr_list[i - 1]
                 right = expr_list[i + 1]
-                expr_list[i - 1:i + 2] = [Node(expr_list[i], left, right)]
+                expr_list[i - 1:i + 2] = [make(expr_list[i], left, right)]
             else:
                 i += 1
 
@@ -83,22 +229,57 @@ def build_syntax_tree(tokens):
         return expr_list[0]
 
 
-    if len(nodes) >= 2:
-        if get_value(nodes[1]) != "=":
-            raise SyntaxError("Expected '=' as the second token")
+    def parse_statement(nodes):
+        if len(nodes) >= 2:
+            if get_value(nodes[1]) != "=":
+                raise SyntaxError("Expected '=' as the second token")
+
+
+        eq_index = None
+        for i, n in enumerate(nodes):
+            if get_value(n) == "=":
+                eq_index = i
+                break
+
+        if eq_index is not None:
+            if eq_index == 0 or eq_index >= len(nodes) - 1:
+                raise ValueError("Invalid assignment expression")
+            left = nodes[eq_index - 1]
+            right = parse_expr(nodes[eq_index + 1:])
+            return make("=", left, right)
+        else:
+            return parse_expr(nodes)
+
+
+    # Split the program into statements on ';' / newline separators
+    program = []
+    start = 0
+    for i, n in enumerate(tokens):
+        if n.type == "SEPARATOR":
+            if i > start:
+                program.append(parse_statement(nodes[start:i]))
+            start = i + 1
+    if start < len(nodes):
+        program.append(parse_statement(nodes[start:]))
+
+    if not program:
+        raise ValueError("Empty token list")
 
+    # Several statements are chained into a left-leaning sequence:
+    # ;(;(s1, s2), s3) so every phase still sees a binary tree.
+    tree = program[0]
+    for statement in program[1:]:
+        tree = make(";", tree, statement)
+    return tree
 
-    eq_index = None
-    for i, n in enumerate(nodes):
-        if get_value(n) == "=":
-            eq_index = i
-            break
 
-    if eq_index is not None:
-        if eq_index == 0 or eq_index >= len(nodes) - 1:
-            raise ValueError("Invalid assignment expression")
-        left = nodes[eq_index - 1]
-        right = parse_expr(nodes[eq_index + 1:])
-        return Node("=", left, right)
-    else:
-        return parse_expr(nodes)
+def statements(tree):
+    """Flatten a (possibly single-statement) program into its statements, in order."""
+    result = []
+    node = tree
+    while node is not None and node.value == ";":
+        result.append(node.right)
+        node = node.left
+    result.append(node)
+    result.reverse()
+    return result
@@ -0,0 +1,103 @@
+"""
+Paged, bulk-rendered listings in a Tk Text widget.
+
+A listing is a list of lines, each a list of (text, tag) segments. Only
+one page of lines lives in the widget at a time. A page goes in with a
+single insert, followed by one tag_add per tag that carries all of that
+tag's precomputed ranges, instead of one insert call per segment.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+PAGE_LINES = 1000
+
+
+def wrap_words(words, width=100):
+    """Join words into lines of about `width` characters (long token strings)."""
+    lines = []
+    current = []
+    length = 0
+    for word in words:
+        if current and length + len(word) + 1 > width:
+            lines.append(" ".join(current))
+            current = []
+            length = 0
+        current.append(word)
+        length += len(word) + 1
+    if current or not lines:
+        lines.append(" ".join(current))
+    return lines
+
+
+def render_page(lines):
+    """Returns the page text and {tag: [start, end, start, end, ...]} for it."""
+    chunks = []
+    ranges = {}
+    for row, segments in enumerate(lines, 1):
+        column = 0
+        for i, (text, tag) in enumerate(segments):
+            if tag is not None:
+                start = f"{row}.{column}"
+                # The last segment's range takes in the newline, so per-line tag
+                # options (spacing, margins) apply to the whole line
+                end = f"{row + 1}.0" if i == len(segments) - 1 else f"{row}.{column + len(text)}"
+                ranges.setdefault(tag, []).extend((start, end))
+            chunks.append(text)
+            column += len(text)
+        chunks.append("\n")
+    return "".join(chunks), ranges
+
+
+class ListingView:
+    def __init__(self, parent, page_lines=PAGE_LINES, **text_options):
+        self.page_lines = page_lines
+        self.lines = []
+        self.page = 0
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        self.nav = ttk.Frame(self.frame)
+        self.prev_btn = ttk.Button(self.nav, text="< Prev", command=lambda: self.show_page(self.page - 1))
+        self.prev_btn.pack(side=tk.LEFT)
+        self.next_btn = ttk.Button(self.nav, text="Next >", command=lambda: self.show_page(self.page + 1))
+        self.next_btn.pack(side=tk.LEFT, padx=(10, 0))
+        self.page_var = tk.StringVar()
+        ttk.Label(self.nav, textvariable=self.page_var, padding=(10, 0)).pack(side=tk.LEFT)
+
+        self.text = tk.Text(self.frame, **text_options)
+        self.text.pack(fill=tk.BOTH, expand=True)
+
+    def tag_configure(self, tag, **options):
+        self.text.tag_configure(tag, **options)
+
+    def clear(self):
+        self.lines = []
+        self.page = 0
+        self.text.delete(1.0, tk.END)
+        self.nav.pack_forget()
+
+    def show(self, lines):
+        self.lines = lines
+        if len(lines) > self.page_lines:
+            self.nav.pack(fill=tk.X, before=self.text, pady=(0, 5))
+        else:
+            self.nav.pack_forget()
+        self.show_page(0)
+
+    def show_page(self, page):
+        pages = max(1, -(-len(self.lines) // self.page_lines))
+        self.page = min(max(page, 0), pages - 1)
+        start = self.page * self.page_lines
+        end = min(start + self.page_lines, len(self.lines))
+
+        text, ranges = render_page(self.lines[start:end])
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, text)
+        for tag, indices in ranges.items():
+            self.text.tag_add(tag, *indices)
+
+        self.page_var.set(f"Lines {start + 1}-{end} of {len(self.lines)}")
+        self.prev_btn.state(['!disabled' if self.page > 0 else 'disabled'])
+        self.next_btn.state(['!disabled' if self.page < pages - 1 else 'disabled'])
@@ -0,0 +1,170 @@
+"""
+Linear-time tidy tree layout (Reingold-Tilford, in Buchheim, Junger and
+Leipert's O(n) formulation).
+
+Trees are given as preorder-indexed arrays (left, right, parent with -1 for
+"none"), so every walk is a loop over indices instead of a recursion:
+children always come after their parent in preorder, so walking the
+indices backwards visits children first and walking them forwards visits
+parents first.
+
+Layouts are cached by a structural fingerprint of the tree; labels do not
+affect positions, so any tree of the same shape reuses them.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def tidy_layout(left, right, parent, distance):
+    """
+    x coordinate of every node: each level keeps at least `distance` between
+    neighbours, parents sit centred over their children, and subtrees are
+    packed as close as their contours allow. The leftmost node is at x = 0.
+    """
+    n = len(parent)
+    if n == 0:
+        return []
+
+    prelim = [0.0] * n
+    mod = [0.0] * n
+    change = [0.0] * n
+    shift = [0.0] * n
+    thread = [-1] * n
+    ancestor = list(range(n))
+    number = [1] * n
+    midpoint = [0.0] * n
+
+    for i in range(n):
+        if left[i] >= 0 and right[i] >= 0:
+            number[right[i]] = 2
+
+    def next_left(v):
+        c = left[v] if left[v] >= 0 else right[v]
+        return c if c >= 0 else thread[v]
+
+    def next_right(v):
+        c = right[v] if right[v] >= 0 else left[v]
+        return c if c >= 0 else thread[v]
+
+    def apportion(v, w, default_ancestor):
+        # v is a right child, w its left sibling: push v's subtree right until
+        # its left contour clears w's right contour at every level
+        vir = vor = v
+        vil = vol = w
+        sir = sor = mod[v]
+        sil = sol = mod[w]
+        nil, nir = next_right(vil), next_left(vir)
+        while nil >= 0 and nir >= 0:
+            vil, vir = nil, nir
+            vol = next_left(vol)
+            vor = next_right(vor)
+            ancestor[vor] = v
+            gap = (prelim[vil] + sil) - (prelim[vir] + sir) + distance
+            if gap > 0:
+                a = ancestor[vil]
+                wl = a if parent[a] == parent[v] else default_ancestor
+                subtrees = number[v] - number[wl]
+                change[v] -= gap / subtrees
+                shift[v] += gap
+                change[wl] += gap / subtrees
+                prelim[v] += gap
+                mod[v] += gap
+                sir += gap
+                sor += gap
+            sil += mod[vil]
+            sir += mod[vir]
+            sol += mod[vol]
+            sor += mod[vor]
+            nil, nir = next_right(vil), next_left(vir)
+
+        if nil >= 0 and next_right(vor) < 0:
+            thread[vor] = nil
+            mod[vor] += sil - sor
+        else:
+            if nir >= 0 and next_left(vol) < 0:
+                thread[vol] = nir
+                mod[vol] += sir - sol
+            default_ancestor = v
+        return default_ancestor
+
+    # First walk, children before parents. A node's own midpoint is known
+    # when it finishes; its position relative to its sibling is settled by
+    # the parent, which sees both children complete.
+    for v in range(n - 1, -1, -1):
+        l, r = left[v], right[v]
+        if l < 0 and r < 0:
+            continue
+        if l >= 0 and r >= 0:
+            prelim[l] = midpoint[l]
+            prelim[r] = prelim[l] + distance
+            if left[r] >= 0 or right[r] >= 0:
+                mod[r] = prelim[r] - midpoint[r]
+            apportion(r, l, l)
+            # execute_shifts over [l, r], right to left
+            total_shift = total_change = 0.0
+            for w in (r, l):
+                prelim[w] += total_shift
+                mod[w] += total_shift
+                total_change += change[w]
+                total_shift += shift[w] + total_change
+            midpoint[v] = (prelim[l] + prelim[r]) / 2
+        else:
+            c = l if l >= 0 else r
+            prelim[c] = midpoint[c]
+            midpoint[v] = prelim[c]
+
+    # Second walk, parents before children: add up the modifiers
+    x = [0.0] * n
+    offset = [0.0] * n
+    x[0] = prelim[0] = midpoint[0]
+    for i in range(1, n):
+        p = parent[i]
+        offset[i] = offset[p] + mod[p]
+        x[i] = prelim[i] + offset[i]
+
+    least = min(x)
+    if least:
+        x = [value - least for value in x]
+    return x
+
+
+def fingerprint(left, right, *params):
+    """Structural hash of a preorder tree: two bits per node say which children it has."""
+    shape = bytes((l >= 0) << 1 | (r >= 0) for l, r in zip(left, right))
+    digest = hashlib.blake2b(shape, digest_size=16)
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """Small thread-safe LRU of layouts keyed by fingerprint."""
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
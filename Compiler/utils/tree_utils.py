@@ -1,46 +1,80 @@
-from syntax.syntax import Node
+import sys
 
-def print_tree(node, prefix="", is_left=None):
-    if node is None:
-        return
-    
-
-    if is_left is None:  
-        print(f"{node.value}")
-    else:
-        connector = "├── " if is_left else "└── "
-        print(f"{prefix}{connector}{node.value}")
-    
-
-    if is_left is None:  
-        new_prefix = ""
-    else:
-        extension = "│   " if is_left else "    "
-        new_prefix = prefix + extension
-    
-    if node.left is not None or node.right is not None:
-        if node.left is not None:
-            print_tree(node.left, new_prefix, True)
-        else:
-            print(f"{new_prefix}├── None")
-        
-        if node.right is not None:
-            print_tree(node.right, new_prefix, False)
-        else:
-            print(f"{new_prefix}└── None")
-
-
-def convert_tree_to_display(node, id_map):
+PLAIN, CONVERTED, INT_TO_FLOAT = range(3)
+
+
+class DisplayNode:
+    """
+    Node-like view of a syntax tree as it is displayed: identifiers show
+    their id_map label and, with conversions, a converted value is drawn as
+    value -> int_to_float -> operand. Nothing is copied; the view only maps
+    labels when they are read, and child views are made on access.
+    """
+    __slots__ = ('node', 'id_map', 'conversions', 'stage')
+
+    def __init__(self, node, id_map, conversions=True, stage=PLAIN):
+        self.node = node
+        self.id_map = id_map
+        self.conversions = conversions
+        self.stage = stage
+
+    @property
+    def value(self):
+        node = self.node
+        if self.stage == INT_TO_FLOAT:
+            return "int_to_float"
+        if self.stage == CONVERTED and node.kind == 'literal':
+            return str(float(node.value))
+        return self.id_map.get(node.value, node.value)
+
+    @property
+    def left(self):
+        if self.stage == CONVERTED:
+            return DisplayNode(self.node, self.id_map, self.conversions, INT_TO_FLOAT)
+        if self.stage == INT_TO_FLOAT:
+            return DisplayNode(self.node, self.id_map, self.conversions, PLAIN)
+        return display_view(self.node.left, self.id_map, self.conversions)
+
+    @property
+    def right(self):
+        if self.stage != PLAIN:
+            return None
+        return display_view(self.node.right, self.id_map, self.conversions)
+
+    def __repr__(self):
+        return f"DisplayNode({self.value}, {self.left}, {self.right})"
+
+
+def display_view(node, id_map, conversions=True):
+    """The tree as displayed with id_map labels (see DisplayNode), or None."""
     if node is None:
         return None
-    
-    if node.value in id_map:
-        display_value = id_map[node.value]
-    else:
-        display_value = node.value
-    
-    new_node = Node(display_value)
-    new_node.left = convert_tree_to_display(node.left, id_map)
-    new_node.right = convert_tree_to_display(node.right, id_map)
-    
-    return new_node
\ No newline at end of file
+    stage = CONVERTED if conversions and node.convert else PLAIN
+    return DisplayNode(node, id_map, conversions, stage)
+
+
+def print_tree(node, file=None):
+    """Prints the tree with box-drawing connectors, in one write."""
+    if node is None:
+        return
+
+    lines = []
+    # (node, prefix, is_left); is_left is None for the root, and a missing
+    # child of a node with one child is shown as None
+    stack = [(node, "", None)]
+    while stack:
+        node, prefix, is_left = stack.pop()
+        connector = "" if is_left is None else ("├── " if is_left else "└── ")
+        if node is None:
+            lines.append(f"{prefix}{connector}None")
+            continue
+        lines.append(f"{prefix}{connector}{node.value}")
+
+        left, right = node.left, node.right
+        if left is not None or right is not None:
+            new_prefix = "" if is_left is None else prefix + ("│   " if is_left else "    ")
+            stack.append((right, new_prefix, False))
+            stack.append((left, new_prefix, True))
+
+    lines.append("")
+    (file or sys.stdout).write("\n".join(lines))
@@ -0,0 +1,107 @@
+"""
+Runs compiler phases on a worker thread and hands their results to Tk.
+
+A job is a generator that does one phase of work between yields. The
+worker thread drives it and puts every yielded value on a queue, which the
+main loop drains with `after()`, so widgets are only ever touched from the
+Tk thread. Cancelling a job stops it at the next phase boundary and drops
+anything it still had in flight; jobs run one at a time, so the next one
+starts once the cancelled one has got there.
+"""
+
+import queue
+import threading
+
+POLL_MS = 15
+
+class BackgroundRunner:
+    def __init__(self, root):
+        self.root = root
+        self.queue = queue.Queue()
+        self.generation = 0
+        self.cancel_event = None
+        self.handlers = None
+        self.thread = None
+        self.polling = False
+
+    @property
+    def busy(self):
+        return self.handlers is not None
+
+    def start(self, job, on_result, on_error=None, on_done=None):
+        """
+        Run the generator function `job` on a worker thread. `on_result` is
+        called on the Tk thread with every value it yields, `on_error` with an
+        exception it raised, and `on_done(cancelled)` once it has finished.
+        """
+        self.cancel()
+        self.generation += 1
+        self.cancel_event = threading.Event()
+        self.handlers = (on_result, on_error, on_done)
+
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(self.generation, job, self.cancel_event, self.thread),
+            daemon=True,
+        )
+        self.thread.start()
+
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        """Stop the current job; results it posts from now on are discarded."""
+        if self.handlers is None:
+            return
+        self.cancel_event.set()
+        on_done = self.handlers[2]
+        self.handlers = None
+        # A new generation makes everything the old thread still posts stale
+        self.generation += 1
+        if on_done:
+            on_done(True)
+
+    def _run(self, generation, job, cancel_event, previous):
+        try:
+            # Each job works on its own tree and copies of the types and
+            # values, but a cancelled job still computes until the end of its
+            # phase; waiting for it keeps it from competing with this one
+            if previous is not None:
+                previous.join()
+            if cancel_event.is_set():
+                return
+            for item in job():
+                if cancel_event.is_set():
+                    return
+                self.queue.put((generation, "result", item))
+        except Exception as e:
+            self.queue.put((generation, "error", e))
+        finally:
+            self.queue.put((generation, "done", cancel_event.is_set()))
+
+    def _poll(self):
+        try:
+            while True:
+                generation, kind, payload = self.queue.get_nowait()
+                if generation != self.generation or self.handlers is None:
+                    continue
+                on_result, on_error, on_done = self.handlers
+                if kind == "result":
+                    on_result(payload)
+                elif kind == "error":
+                    if on_error:
+                        on_error(payload)
+                else:
+                    self.handlers = None
+                    if on_done:
+                        on_done(payload)
+                # Hand control back to Tk between results so it can repaint
+                break
+        except queue.Empty:
+            pass
+
+        if self.handlers is None and self.queue.empty():
+            self.polling = False
+        else:
+            self.root.after(POLL_MS if self.queue.empty() else 1, self._poll)
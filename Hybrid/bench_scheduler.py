@@ -0,0 +1,117 @@
+"""
+Benchmark: wave-parallel execution of synthetic formula sheets.
+
+Generates wide, deep and layered statement DAGs and random input rows,
+runs each sheet on every row with the sequential DirectExecutor and with
+the wave scheduler, checks that both produce the same values, and reports
+DAG parallelism and speedup. The scheduler's pool is started before
+timing and kept across sheets, as a long-lived executor's would be.
+
+    python bench_scheduler.py [--statements 2000] [--terms 60] [--rows 100] [--workers N]
+"""
+
+import argparse
+import io
+import os
+import random
+import time
+from contextlib import redirect_stdout
+
+from lexer import lexical_walk
+from syntax import build_syntax_tree
+from executor import DirectExecutor
+from scheduler import ParallelExecutor
+
+INPUTS = [f"a{i}" for i in range(32)]
+
+
+def expression(rng, terms, extra=()):
+    operands = list(extra) + [rng.choice(INPUTS) for _ in range(terms - len(extra))]
+    parts = [operands[0]]
+    for i, operand in enumerate(operands[1:], 1):
+        # Dependencies enter additively so values stay bounded down a deep chain
+        parts.append("+" if i < len(extra) + 1 else rng.choice("+-*"))
+        parts.append(f"{operand}" if rng.random() < 0.8 else f"({operand} * 2)")
+    return " ".join(parts)
+
+
+def wide_program(rng, count, terms):
+    return [f"w{i} = {expression(rng, terms)}" for i in range(count)]
+
+
+def deep_program(rng, count, terms):
+    lines = [f"d0 = {expression(rng, terms)}"]
+    for i in range(1, count):
+        lines.append(f"d{i} = {expression(rng, terms, [f'd{i - 1}'])}")
+    return lines
+
+
+def layered_program(rng, count, terms, width=64):
+    lines = []
+    for i in range(count):
+        layer, column = divmod(i, width)
+        extra = [] if layer == 0 else [f"l{layer - 1}_{rng.randrange(width)}", f"l{layer - 1}_{rng.randrange(width)}"]
+        lines.append(f"l{layer}_{column} = {expression(rng, terms, extra)}")
+    return lines
+
+
+def parse(lines):
+    with redirect_stdout(io.StringIO()):
+        tokens, _ = lexical_walk("\n".join(lines))
+    return build_syntax_tree(tokens)
+
+
+def close(a, b):
+    return a == b or abs(a - b) <= 1e-9 * max(abs(a), abs(b))
+
+
+def run(name, lines, columns, executor):
+    tree = parse(lines)
+    rows = len(next(iter(columns.values())))
+
+    start = time.perf_counter()
+    sequential = []
+    for row in range(rows):
+        row_executor = DirectExecutor({}, {variable: column[row] for variable, column in columns.items()})
+        row_executor.execute(tree)
+        sequential.append(row_executor.id_values)
+    seq_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    values, stats = executor.execute_rows(tree, columns)
+    par_time = time.perf_counter() - start
+
+    assert all(close(values[k][row], v) for row, expected in enumerate(sequential)
+               for k, v in expected.items()), f"{name}: results differ"
+
+    print(f"{name:<8} {stats['statements']:>6} stmts  {stats['waves']:>6} waves  width {stats['max_width']:>5}"
+          f"  parallelism {stats['parallelism']:>8.1f}  {stats['parallel_waves']:>5} in parallel  |  sequential {seq_time:7.3f} s"
+          f"  parallel {par_time:7.3f} s  speedup {seq_time / par_time:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--terms", type=int, default=60, help="operands per statement")
+    parser.add_argument("--rows", type=int, default=100, help="input rows each sheet is evaluated on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--min-parallel", type=int, default=None,
+                        help="statement evaluations a wave needs to go to the pool (default: the executor's)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    columns = {name: [rng.uniform(0.5, 1.5) for _ in range(args.rows)] for name in INPUTS}
+    print(f"{args.workers} workers, {args.terms} operands per statement, {args.rows} rows\n")
+
+    options = {} if args.min_parallel is None else {"min_parallel": args.min_parallel}
+    with ParallelExecutor(args.workers, **options) as executor:
+        if executor.workers > 1:
+            # Start the workers outside the timings
+            list(executor.start().map(abs, range(executor.workers)))
+        run("wide", wide_program(rng, args.statements, args.terms), columns, executor)
+        run("layered", layered_program(rng, args.statements, args.terms), columns, executor)
+        run("deep", deep_program(rng, args.statements, args.terms), columns, executor)
+
+
+if __name__ == "__main__":
+    main()
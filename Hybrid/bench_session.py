@@ -0,0 +1,68 @@
+"""
+Benchmark: incremental recomputation on a long dependency chain.
+
+Builds a session with a chain of N formulas
+
+    v0 IS x + 1;  v1 IS v0 + 1;  ...;  vK IS v(K-1) + y;  ...;  v(N-1) IS v(N-2) + 1
+
+and compares a full re-run of every formula with updating one input
+(`y` near the end of the chain, then `x` at its head).
+
+    python bench_session.py [--formulas 100000] [--tail 1000]
+"""
+
+import argparse
+import io
+import time
+from contextlib import redirect_stdout
+
+from lexer import lexical_walk
+from syntax import build_syntax_tree
+from session import Session
+
+
+def build_chain(formulas, tail):
+    lines = ["v0 = x + 1"]
+    for i in range(1, formulas):
+        operand = "y" if i == formulas - tail else "1"
+        lines.append(f"v{i} = v{i - 1} + {operand}")
+    with redirect_stdout(io.StringIO()):
+        tokens, _ = lexical_walk("\n".join(lines))
+    return build_syntax_tree(tokens)
+
+
+def timed(label, session, fn, *args):
+    before = session.evaluations
+    start = time.perf_counter()
+    updates = fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:10.2f} ms  {session.evaluations - before:>8} evaluations"
+          f"  ({len(updates)} values updated)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formulas", type=int, default=100_000)
+    parser.add_argument("--tail", type=int, default=1000, help="formulas downstream of input y")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tree = build_chain(args.formulas, args.tail)
+    session = Session()
+    session.set_value("x", 1)
+    session.set_value("y", 2)
+    session.run(tree)
+    print(f"Loaded {args.formulas} formulas in {time.perf_counter() - start:.2f} s\n")
+
+    full = timed("Full re-run of every formula", session, session.recompute_all)
+    tail = timed(f"Update y ({args.tail} downstream)", session, session.set_value, "y", 3)
+    head = timed("Update x (whole chain downstream)", session, session.set_value, "x", 5)
+
+    print(f"\nSpeedup updating y vs full re-run: {full / tail:.1f}x")
+    print(f"Overhead updating x vs full re-run: {head / full:.2f}x")
+    print(f"Last value: v{args.formulas - 1} = {session.values[f'v{args.formulas - 1}']}")
+
+
+if __name__ == "__main__":
+    main()
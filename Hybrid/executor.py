@@ -1,4 +1,38 @@
-from syntax import Node
+from syntax import Node, statements
+from flat_ast import LITERAL, OP, ASSIGN, SEQ, OPERATORS
+
+
+def power(base, exponent):
+    """base ^ exponent; ValueError where it has no real value."""
+    if base == 0 and exponent < 0:
+        raise ValueError("Zero raised to a negative power")
+    try:
+        result = base ** exponent
+    except OverflowError:
+        raise ValueError("Power overflows") from None
+    if isinstance(result, complex):
+        raise ValueError("Negative number raised to a fractional power")
+    return result
+
+
+OPERATOR_VALUES = ('+', '-', '*', '/', '^')
+
+
+def operate(op, left_val, right_val):
+    """A binary operator applied to its operand values; ValueError where it has no value."""
+    if op == '+':
+        return left_val + right_val
+    elif op == '-':
+        return left_val - right_val
+    elif op == '*':
+        return left_val * right_val
+    elif op == '/':
+        if right_val == 0:
+            raise ValueError("Division by zero")
+        return left_val / right_val
+    elif op == '^':
+        return power(left_val, right_val)
+    return 0
 
 
 class DirectExecutor:
@@ -21,39 +55,23 @@ class DirectExecutor:
     
     def evaluate(self, node):
         """
-        Recursively evaluate the syntax tree from bottom to top.
+        Evaluate the syntax tree from bottom to top.
         Returns the computed value.
         """
         if node is None:
             return 0
         
-        # Handle int_to_float conversion nodes
-        if node.left and isinstance(node.left, Node) and node.left.value == "int_to_float":
-            # The actual value is in node.left.left
-            inner_val = self.evaluate(node.left.left)
-            return float(inner_val)
+        # Program: run the statements in order, the last one gives the result
+        if node.value == ";":
+            result = 0
+            for statement in statements(node):
+                result = self.evaluate(statement)
+            return result
         
         # Leaf node: number or identifier
         if node.left is None and node.right is None:
-            val_str = str(node.value)
-            
-            # Check if it's a number
-            try:
-                if '.' in val_str:
-                    return float(val_str)
-                return int(val_str)
-            except ValueError:
-                pass
-            
-            # It's an identifier - look up its value
-            # node.value could be original name or V-name
-            if node.value in self.id_values:
-                return self.id_values[node.value]
-            elif node.value in self.reverse_id_map:
-                orig_name = self.reverse_id_map[node.value]
-                return self.id_values.get(orig_name, 0)
-            
-            return 0
+            value = self.leaf_value(node)
+            return float(value) if node.convert else value
         
         # Assignment node (IS)
         if node.value == "IS":
@@ -68,6 +86,8 @@ class DirectExecutor:
             
             self.result = result
             self.result_var = var_name
+            # Later statements read the assigned value
+            self.id_values[var_name] = result
             
             # Record the step
             self.execution_steps.append(f"{v_name} IS {result}")
@@ -75,24 +95,50 @@ class DirectExecutor:
             
             return result
         
-        # Binary operation
-        left_val = self.evaluate(node.left)
-        right_val = self.evaluate(node.right)
+        # Binary operations, bottom up with an explicit stack; the operands
+        # of the operator being finished are the last two values
+        values = []
+        stack = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node is None:
+                values.append(0)
+            elif node.left is None and node.right is None:
+                value = self.leaf_value(node)
+                values.append(float(value) if node.convert else value)
+            elif node.value in (";", "IS"):
+                values.append(self.evaluate(node))
+            elif not visited:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            else:
+                right_val = values.pop()
+                left_val = values.pop()
+                values.append(operate(node.value, left_val, right_val))
+        return values[0]
+    
+    def leaf_value(self, node):
+        """Value of a number or identifier leaf."""
+        val_str = str(node.value)
         
-        if node.value == '+':
-            result = left_val + right_val
-        elif node.value == '-':
-            result = left_val - right_val
-        elif node.value == '*':
-            result = left_val * right_val
-        elif node.value == '/':
-            if right_val == 0:
-                raise ValueError("Division by zero")
-            result = left_val / right_val
-        else:
-            result = 0
+        # Check if it's a number
+        try:
+            if '.' in val_str:
+                return float(val_str)
+            return int(val_str)
+        except ValueError:
+            pass
+        
+        # It's an identifier - look up its value
+        # node.value could be original name or V-name
+        if node.value in self.id_values:
+            return self.id_values[node.value]
+        elif node.value in self.reverse_id_map:
+            orig_name = self.reverse_id_map[node.value]
+            return self.id_values.get(orig_name, 0)
         
-        return result
+        return 0
     
     def execute(self, tree):
         """Execute the tree and return results."""
@@ -102,94 +148,86 @@ class DirectExecutor:
     
     def evaluate_subtree(self, node):
         """Evaluate a subtree and return the numeric result."""
-        if node is None:
-            return 0
-        
-        # Handle int_to_float nodes
-        if node.left and isinstance(node.left, Node) and node.left.value == "int_to_float":
-            inner_val = self.evaluate_subtree(node.left.left)
-            return float(inner_val)
-        
-        # Leaf node
-        if node.left is None and node.right is None:
-            val_str = str(node.value)
-            try:
-                if '.' in val_str:
-                    return float(val_str)
-                return int(val_str)
-            except ValueError:
-                pass
-            
-            if node.value in self.id_values:
-                return self.id_values[node.value]
-            elif node.value in self.reverse_id_map:
-                orig_name = self.reverse_id_map[node.value]
-                return self.id_values.get(orig_name, 0)
-            return 0
-        
-        # Binary operation
-        left_val = self.evaluate_subtree(node.left)
-        right_val = self.evaluate_subtree(node.right)
-        
-        if node.value == '+':
-            return left_val + right_val
-        elif node.value == '-':
-            return left_val - right_val
-        elif node.value == '*':
-            return left_val * right_val
-        elif node.value == '/':
-            if right_val == 0:
-                return 0
-            return left_val / right_val
-        
-        return 0
+        return self.value_tree(node)[1]
+
+    def value_tree(self, node, strict=False):
+        """
+        (copy of an expression with its values shown, its value), built
+        bottom up. Errors give 0 rather than raising, since the tree is
+        only displayed; with strict they raise as in evaluate.
+        """
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node is None:
+                results.append((None, 0))
+            elif node.left is None and node.right is None:
+                # Leaf node (converted values show as floats)
+                val = self.get_node_value(node)
+                value = self.leaf_value(node)
+                results.append((Node(str(float(val) if node.convert else val)), float(value) if node.convert else value))
+            elif not visited:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            else:
+                (left_tree, left_val), (right_tree, right_val) = results[-2:]
+                del results[-2:]
+                try:
+                    result = operate(node.value, left_val, right_val)
+                except ValueError:
+                    if strict:
+                        raise
+                    result = 0
+                # Operator node - show result
+                new_node = Node(f"{node.value}  ({result})" if node.value in OPERATOR_VALUES else node.value)
+                new_node.left = left_tree
+                new_node.right = right_tree
+                results.append((new_node, result))
+        return results[0]
     
-    def create_value_tree(self, node):
+    def create_value_tree(self, node, strict=False):
         """
         Create a copy of the tree with actual values substituted for identifiers.
         For LHS variables (no value), use V-notation.
         Operators show their computed result.
+        Assignments are recorded in the steps and result as execute records
+        them, so with strict (errors raise) this is execute in the same pass.
         """
         if node is None:
             return None
         
-        # Handle int_to_float nodes
-        if node.left and isinstance(node.left, Node) and node.left.value == "int_to_float":
-            inner_val = self.get_node_value(node.left.left)
-            return Node(str(float(inner_val)))
+        # Program: each statement sees the values assigned before it
+        if node.value == ";":
+            program = statements(node)
+            new_node = self.create_value_tree(program[0], strict)
+            for statement in program[1:]:
+                new_node = Node(";", new_node, self.create_value_tree(statement, strict))
+            return new_node
         
         # Assignment node (IS) - special handling for LHS
         if node.value == "IS":
-            result = self.evaluate_subtree(node.right)
+            # RHS: evaluate with actual values
+            value_tree, result = self.value_tree(node.right, strict)
             new_node = Node(f"IS  ({result})")
+            var_name = node.left.value if node.left else "unknown"
+            v_name = self.id_map.get(var_name, var_name)
             # LHS: use V-notation
             if node.left:
-                var_name = node.left.value
-                v_name = self.id_map.get(var_name, var_name)
                 new_node.left = Node(v_name)
-            # RHS: evaluate with actual values
-            new_node.right = self.create_value_tree(node.right)
-            return new_node
-        
-        # Leaf node
-        if node.left is None and node.right is None:
-            val = self.get_node_value(node)
-            return Node(str(val))
-        
-        # Operator node - show result
-        if node.value in ['+', '-', '*', '/']:
-            result = self.evaluate_subtree(node)
-            new_node = Node(f"{node.value}  ({result})")
-            new_node.left = self.create_value_tree(node.left)
-            new_node.right = self.create_value_tree(node.right)
+            new_node.right = value_tree
+            if node.left:
+                self.id_values[node.left.value] = result
+
+            self.result = result
+            self.result_var = var_name
+            self.execution_steps.append(f"{v_name} IS {result}")
+            self.execution_steps.append(f"{var_name} = {result}")
             return new_node
         
-        # Create new node with evaluated children
-        new_node = Node(node.value)
-        new_node.left = self.create_value_tree(node.left)
-        new_node.right = self.create_value_tree(node.right)
-        
-        return new_node
+        value_tree, self.result = self.value_tree(node, strict)
+        return value_tree
     
     def get_node_value(self, node):
         """Get the actual value of a node."""
@@ -222,7 +260,57 @@ def direct_execute(tree, id_map, id_values):
     Execute the syntax tree directly with given values.
     Returns: (result, execution_steps, value_tree)
     """
-    executor = DirectExecutor(id_map, id_values)
-    result, steps = executor.execute(tree)
-    value_tree = executor.create_value_tree(tree)
-    return result, steps, value_tree, executor.result_var
+    # One pass computes the values, the steps and the value tree
+    executor = DirectExecutor(id_map, dict(id_values))
+    value_tree = executor.create_value_tree(tree, strict=True)
+    return executor.result, executor.execution_steps, value_tree, executor.result_var
+
+
+def execute_flat(ast, id_map, id_values):
+    """
+    Runs a FlatAST by index: nodes are in post-order, so one forward loop
+    computes every operand before its operator. Same values and steps as
+    DirectExecutor.execute. Returns (result, execution_steps, result_var).
+    """
+    kind, op, left, right, ref = ast.kind, ast.op, ast.left, ast.right, ast.ref
+    convert, symbols = ast.convert, ast.symbols
+    id_values = dict(id_values)
+    values = [0] * len(ast)
+    steps = []
+    result_var = None
+
+    for i in range(len(ast)):
+        k = kind[i]
+        if k == OP:
+            a, b = values[left[i]], values[right[i]]
+            operator = OPERATORS[op[i]]
+            if operator == '+':
+                value = a + b
+            elif operator == '-':
+                value = a - b
+            elif operator == '*':
+                value = a * b
+            elif operator == '^':
+                value = power(a, b)
+            else:
+                if b == 0:
+                    raise ValueError("Division by zero")
+                value = a / b
+        elif k == ASSIGN:
+            var_name = symbols[ref[left[i]]]
+            value = values[right[i]]
+            id_values[var_name] = value
+            result_var = var_name
+            steps.append(f"{id_map.get(var_name, var_name)} IS {value}")
+            steps.append(f"{var_name} = {value}")
+        elif k == SEQ:
+            value = values[right[i]]
+        else:
+            text = symbols[ref[i]]
+            if k == LITERAL:
+                value = float(text) if '.' in text else int(text)
+            else:
+                value = id_values.get(text, 0)
+        values[i] = float(value) if convert[i] else value
+
+    return (values[ast.root] if len(ast) else 0), steps, result_var
@@ -46,6 +46,14 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
     while i < n:
         ch = equation[i]
 
+        if ch in ";\n":
+            # Statement separator; runs of blank lines/semicolons collapse to one
+            if tokens and tokens[-1].type != "SEPARATOR":
+                tokens.append(Token("SEPARATOR", ";"))
+                display_tokens.append(";")
+            i += 1
+            continue
+
         if ch.isspace():
             i += 1
             continue
@@ -83,6 +91,12 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
             display_tokens.append("IS")
             i += 1
 
+        elif ch == "^" or equation.startswith("**", i):
+            # ** is an alternative spelling of the exponent operator
+            tokens.append(Token("OPERATOR", "^"))
+            display_tokens.append("^")
+            i += 1 if ch == "^" else 2
+
         elif ch in "+-*/()":
             token_type = (
                 "LPAREN" if ch == "(" else
@@ -96,5 +110,34 @@ def lexical_walk(equation: str) -> Tuple[List[Token], Dict[str, str]]:
         else:
             raise ValueError(f"Invalid character '{ch}' at position {i}")
 
+    if tokens and tokens[-1].type == "SEPARATOR":
+        tokens.pop()
+        display_tokens.pop()
+
     print(f"\nToken String: {' '.join(display_tokens)}")
     return tokens, id_map
+
+
+def input_identifiers(tokens: List[Token]) -> List[str]:
+    """
+    Identifiers read before the program assigns them, in order of first use.
+    These are the only identifiers whose type and value come from the user.
+    """
+    inputs: List[str] = []
+    seen = set()
+    assigned = set()
+    targets = []
+
+    for i, t in enumerate(tokens):
+        if t.type == "SEPARATOR":
+            # A target only counts as assigned once its whole statement has run
+            assigned.update(targets)
+            targets = []
+        elif t.type == "IDENTIFIER":
+            if i + 1 < len(tokens) and tokens[i + 1].type == "ASSIGN":
+                targets.append(t.value)
+            elif t.value not in assigned and t.value not in seen:
+                seen.add(t.value)
+                inputs.append(t.value)
+
+    return inputs
@@ -3,14 +3,24 @@ Hybrid Compiler - Command Line Interface
 Supports direct execution with V-notation and IS syntax.
 """
 
-from lexer import lexical_walk
-from syntax import build_syntax_tree
+import argparse
+
+from lexer import lexical_walk, input_identifiers
+from syntax import Node, build_syntax_tree, statements
 from semantic import semantic_analysis
-from executor import direct_execute
-from tree_utils import print_tree, convert_tree_to_display
+from executor import DirectExecutor, direct_execute
+from session import Session
+from tree_utils import print_tree, display_view
+from metrics import add_metrics_arguments, configure_from_args, flush
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Hybrid compiler command line interface")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    recorder = configure_from_args(args)
+    session = Session()
+    id_types = {}
    
     while True:
         try:
@@ -23,28 +33,20 @@ def main():
                 print("Exiting...")
                 break
             
-            # Lexical Analysis
-            tokens, id_map = lexical_walk(equation)
+            if equation.lower() == 'vars':
+                for name, value in session.values.items():
+                    kind = "formula" if name in session.formulas else "input"
+                    print(f"  {name} = {value}  ({kind})")
+                continue
             
-            # Get types and values for RHS identifiers
-            id_types = {}
-            id_values = {}
+            # Lexical Analysis
+            with recorder.phase("lexical"):
+                tokens, id_map = lexical_walk(equation)
             
-            for var_name in id_map:
-                is_lhs = False
-                is_rhs = False
-                
-                for i, t in enumerate(tokens):
-                    if t.type == "IDENTIFIER" and t.value == var_name:
-                        if i + 1 < len(tokens) and tokens[i+1].type == "ASSIGN":
-                            is_lhs = True
-                        else:
-                            is_rhs = True
-                
-                if is_lhs and not is_rhs:
-                    continue
-
-                if var_name not in id_types:
+            # Ask only for inputs the session does not already know;
+            # earlier values and formulas persist between equations
+            for var_name in input_identifiers(tokens):
+                if var_name not in session.values:
                     while True:
                         type_input = input(f"Enter type for {var_name} ({id_map[var_name]}) (int/float): ").strip().lower()
                         if type_input in ('int', 'float'):
@@ -56,29 +58,52 @@ def main():
                         value_input = input(f"Enter value for {var_name} ({id_map[var_name]}): ").strip()
                         try:
                             if id_types[var_name] == 'INT':
-                                id_values[var_name] = int(value_input)
+                                session.set_value(var_name, int(value_input))
                             else:
-                                id_values[var_name] = float(value_input)
+                                session.set_value(var_name, float(value_input))
                             break
                         except ValueError:
                             print(f"Invalid {id_types[var_name].lower()} value.")
 
             # Syntax Analysis
-            tree = build_syntax_tree(tokens)
-            display_tree = convert_tree_to_display(tree, id_map)
+            with recorder.phase("syntax"):
+                tree = build_syntax_tree(tokens)
+            display_tree = display_view(tree, id_map)
             
             print("\n--- Syntax Tree ---")
             print_tree(display_tree)
             
             # Semantic Analysis
-            semantic_tree = semantic_analysis(tree, id_types)
-            semantic_display_tree = convert_tree_to_display(semantic_tree, id_map)
+            with recorder.phase("semantic"):
+                semantic_tree = semantic_analysis(tree, id_types)
+            semantic_display_tree = display_view(semantic_tree, id_map)
             
             print("\n--- Semantic Tree ---")
             print_tree(semantic_display_tree)
             
-            # Direct Execution
-            result, steps, value_tree, result_var = direct_execute(tree, id_map, id_values)
+            # Direct Execution: a program of assignments runs in the session,
+            # which keeps them as live formulas; each statement is evaluated
+            # once, by the executor that records the steps and value tree
+            program = statements(tree)
+            downstream = []
+            with recorder.phase("execution"):
+                if all(statement.value == "IS" for statement in program):
+                    executor = DirectExecutor(id_map, session.values)
+                    value_trees = []
+
+                    def evaluate(statement):
+                        value_trees.append(executor.create_value_tree(statement, strict=True))
+                        return executor.result
+
+                    targets = {statement.left.value for statement in program}
+                    downstream = [(name, value) for name, value in session.run(tree, evaluate) if name not in targets]
+                    steps = executor.execution_steps
+                    value_tree = value_trees[0]
+                    for statement_tree in value_trees[1:]:
+                        value_tree = Node(";", value_tree, statement_tree)
+                else:
+                    _, steps, value_tree, _ = direct_execute(tree, id_map, session.values)
+            recorder.evaluated()
             
             print("\n--- Direct Execution ---")
             print_tree(value_tree)
@@ -87,6 +112,13 @@ def main():
             for step in steps:
                 print(f"  {step}")
             
+            # Refresh what depends on the assignments
+            if downstream:
+                print("\n--- Updated Dependents ---")
+                for name, value in downstream:
+                    print(f"  {name} = {value}")
+            flush(args)
+            
         except KeyboardInterrupt:
             print("\nExiting...")
             break
@@ -96,6 +128,8 @@ def main():
         except Exception as e:
             print(f"Error: {e}\n")
 
+    flush(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,293 @@
+"""
+Metrics registry for long-running compiler processes.
+
+Entry points talk to a *recorder*. By default that is a NullRecorder whose
+methods do nothing, so instrumented code costs one attribute lookup and a
+no-op call per phase. Installing a MetricsRecorder with set_recorder()
+turns on counters and histograms that can be exported in the Prometheus
+text format, either to a file or over a local HTTP endpoint.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        result = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            result.append((f"{name}_bucket", labels + (("le", _format_value(float(bound))),), cumulative))
+        result.append((f"{name}_sum", labels, total))
+        result.append((f"{name}_count", labels, count))
+        return result
+
+
+class MetricsRegistry:
+    """Named metric families, each holding one metric per label set."""
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = {"kind": cls.kind, "help": help_text, "metrics": {}}
+            metric = family["metrics"].get(key)
+            if metric is None:
+                metric = family["metrics"][key] = cls(**kwargs)
+        return metric
+
+    def counter(self, name, help_text, **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, **labels):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            families = [(name, dict(family, metrics=dict(family["metrics"])))
+                        for name, family in sorted(self.families.items())]
+
+        for name, family in families:
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for labels, metric in sorted(family["metrics"].items()):
+                for sample_name, sample_labels, value in metric.samples(name, labels):
+                    lines.append(f"{sample_name}{_format_labels(sample_labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class NullRecorder:
+    """Recorder used when metrics are disabled; every hook is a no-op."""
+
+    enabled = False
+    _no_phase = nullcontext()
+
+    def phase(self, name):
+        return self._no_phase
+
+    def compiled(self, icg_instructions, assembly_code):
+        pass
+
+    def cache_lookup(self, cache, hit):
+        pass
+
+    def evaluated(self, count=1):
+        pass
+
+    def request(self, method, seconds, ok=True):
+        pass
+
+
+class _PhaseTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRecorder(NullRecorder):
+    enabled = True
+
+    def __init__(self, registry=None, prefix="unicompiler"):
+        self.registry = registry or MetricsRegistry()
+        self.prefix = prefix
+        self._phases = {}
+        self._caches = {}
+
+        r, p = self.registry, prefix
+        r.gauge(f"{p}_start_time_seconds", "Unix time the process started recording metrics.").set(time.time())
+        self.compiles = r.counter(f"{p}_compiles_total", "Equations compiled to assembly.")
+        self.icg_instructions = r.counter(f"{p}_icg_instructions_total", "Intermediate code instructions produced.")
+        self.icg_bytes = r.counter(f"{p}_icg_bytes_total", "Bytes of intermediate code produced.")
+        self.asm_instructions = r.counter(f"{p}_assembly_instructions_total", "Assembly instructions produced.")
+        self.asm_bytes = r.counter(f"{p}_assembly_bytes_total", "Bytes of assembly produced.")
+        self.evaluations = r.counter(f"{p}_executor_evaluations_total", "Equations evaluated by the direct executor.")
+
+    def phase(self, name):
+        histogram = self._phases.get(name)
+        if histogram is None:
+            histogram = self._phases[name] = self.registry.histogram(
+                f"{self.prefix}_phase_seconds", "Wall time spent in each pipeline phase.", phase=name
+            )
+        return _PhaseTimer(histogram)
+
+    def observe_phase(self, name, seconds):
+        self.phase(name).histogram.observe(seconds)
+
+    def compiled(self, icg_instructions, assembly_code):
+        self.compiles.inc()
+        self.icg_instructions.inc(len(icg_instructions))
+        self.icg_bytes.inc(sum(len(line) + 1 for line in icg_instructions))
+        self.asm_instructions.inc(len(assembly_code))
+        self.asm_bytes.inc(sum(len(line) + 1 for line in assembly_code))
+
+    def cache_lookup(self, cache, hit):
+        counters = self._caches.get(cache)
+        if counters is None:
+            r, p = self.registry, self.prefix
+            counters = self._caches[cache] = (
+                r.counter(f"{p}_cache_hits_total", "Cache lookups that found an entry.", cache=cache),
+                r.counter(f"{p}_cache_misses_total", "Cache lookups that missed.", cache=cache),
+                r.gauge(f"{p}_cache_hit_ratio", "Hits divided by lookups since start.", cache=cache),
+            )
+        hits, misses, ratio = counters
+        (hits if hit else misses).inc()
+        ratio.set(hits.value / (hits.value + misses.value))
+
+    def evaluated(self, count=1):
+        self.evaluations.inc(count)
+
+    def request(self, method, seconds, ok=True):
+        r, p = self.registry, self.prefix
+        r.counter(f"{p}_requests_total", "Server requests handled.",
+                  method=method, status="ok" if ok else "error").inc()
+        r.histogram(f"{p}_request_seconds", "Server request latency.", method=method).observe(seconds)
+
+    def write(self, path):
+        """Write the current metrics to `path` atomically (node_exporter textfile style)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a daemon thread and return the HTTP server."""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+_recorder = NullRecorder()
+
+
+def get_recorder():
+    return _recorder
+
+
+def set_recorder(recorder):
+    global _recorder
+    _recorder = recorder if recorder is not None else NullRecorder()
+    return _recorder
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-file", metavar="PATH", help="write Prometheus metrics to PATH after each run")
+    parser.add_argument("--metrics-port", metavar="PORT", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT")
+
+
+def configure_from_args(args):
+    """Install a MetricsRecorder when any metrics option was given."""
+    if not (args.metrics_file or args.metrics_port):
+        return get_recorder()
+    recorder = set_recorder(MetricsRecorder())
+    if args.metrics_port:
+        recorder.serve(args.metrics_port)
+    return recorder
+
+
+def flush(args):
+    recorder = get_recorder()
+    if recorder.enabled and args.metrics_file:
+        recorder.write(args.metrics_file)
@@ -0,0 +1,207 @@
+"""
+Dependency-aware parallel execution of multi-statement Hybrid programs.
+
+The statements of a program form a DAG: a statement depends on the last
+earlier statement that wrote a variable it reads (read-after-write), on
+the last earlier write of its own target (write-after-write) and on every
+earlier read of its target since that write (write-after-read). Statements
+on the same level of the DAG are independent, so each level ("wave") is
+split into batches and evaluated on a process pool. The executor works on
+columns of input rows: a task carries a batch of a wave's statements and
+the columns they read for a range of rows, and returns a column of values
+per statement.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from syntax import statements
+from executor import DirectExecutor
+from session import read_identifiers
+
+
+def build_dag(program):
+    """
+    Returns (targets, reads, deps) for a list of IS statements, where deps[i]
+    is the set of statement indices that statement i must run after.
+    """
+    targets = []
+    reads = []
+    deps = []
+    last_writer = {}
+    readers = {}    # variable -> statements that read it since its last write
+
+    for i, statement in enumerate(program):
+        if statement.value != "IS":
+            raise ValueError("Only assignments can be scheduled")
+        target = statement.left.value
+        names = read_identifiers(statement.right)
+
+        needs = set()
+        for name in names:
+            if name in last_writer:
+                needs.add(last_writer[name])
+        if target in last_writer:
+            needs.add(last_writer[target])
+        needs.update(readers.get(target, ()))
+        needs.discard(i)
+
+        for name in names:
+            readers.setdefault(name, []).append(i)
+        readers[target] = []
+        last_writer[target] = i
+
+        targets.append(target)
+        reads.append(names)
+        deps.append(needs)
+
+    return targets, reads, deps
+
+
+def schedule_waves(deps):
+    """Group statements by DAG level; every statement only depends on earlier waves."""
+    level = []
+    waves = []
+    for i, needs in enumerate(deps):
+        # deps only point backwards, so program order is a topological order
+        lvl = 1 + max((level[d] for d in needs), default=-1)
+        level.append(lvl)
+        if lvl == len(waves):
+            waves.append([])
+        waves[lvl].append(i)
+    return waves
+
+
+def evaluate_wave(expressions, columns, rows):
+    """
+    Values of independent expressions on every row of input columns
+    ({variable: sequence}), as one list per expression. Runs in the pool's
+    workers, and in-process for waves too small to ship.
+    """
+    executor = DirectExecutor({}, {})
+    results = [[] for _ in expressions]
+    names = list(columns)
+    for row in range(rows):
+        executor.id_values = {name: columns[name][row] for name in names}
+        for result, expression in zip(results, expressions):
+            result.append(executor.evaluate(expression))
+    return results
+
+
+class ParallelExecutor:
+    """
+    Runs a program wave by wave over many rows of inputs. A task evaluates
+    a batch of a wave's statements on a range of rows and sends back one
+    column per statement, so the cost of reaching a worker is paid once per
+    batch rather than once per value. Waves with fewer than `min_parallel`
+    statement evaluations (statements times rows) run in-process, as does
+    everything when there is a single worker.
+
+    The process pool is started for the first wide wave and kept until
+    close(), so a program run again on new rows, or another program, reuses
+    it. Use the executor as a context manager to shut the pool down.
+    """
+
+    def __init__(self, workers=None, min_parallel=5_000):
+        self.workers = workers or os.cpu_count() or 2
+        self.min_parallel = min_parallel
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """The worker pool, started now if it is not running yet."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def execute(self, tree, id_values):
+        """
+        One row: (values after the program ran, scheduling statistics).
+        A single row is never worth shipping, so it runs in-process.
+        """
+        columns, stats = self.execute_rows(tree, {name: [value] for name, value in id_values.items()})
+        return {name: column[0] for name, column in columns.items()}, stats
+
+    def execute_rows(self, tree, columns):
+        """
+        Every row of input columns ({variable: sequence}, all of one
+        length). Returns (columns of every variable after the program ran,
+        scheduling statistics).
+        """
+        program = statements(tree)
+        targets, reads, deps = build_dag(program)
+        waves = schedule_waves(deps)
+
+        values = {name: list(column) for name, column in columns.items()}
+        rows = len(next(iter(values.values()))) if values else 1
+        if any(len(column) != rows for column in values.values()):
+            raise ValueError("Input columns differ in length")
+        parallel_waves = 0
+
+        for wave in waves:
+            if self.workers < 2 or len(wave) * rows < self.min_parallel:
+                expressions = [program[i].right for i in wave]
+                needed = set().union(*(reads[i] for i in wave))
+                results = evaluate_wave(expressions, {name: values[name] for name in needed if name in values}, rows)
+            else:
+                parallel_waves += 1
+                results = self._evaluate_parallel(program, wave, reads, values, rows)
+
+            # Statements in one wave never share a target (that would be a
+            # write-after-write edge), so results merge in any order
+            for i, column in zip(wave, results):
+                values[targets[i]] = column
+
+        stats = {
+            "statements": len(program),
+            "rows": rows,
+            "waves": len(waves),
+            "max_width": max((len(w) for w in waves), default=0),
+            "parallelism": len(program) / len(waves) if waves else 0.0,
+            "parallel_waves": parallel_waves,
+        }
+        return values, stats
+
+    def _evaluate_parallel(self, program, wave, reads, values, rows):
+        pool = self.start()
+        # About one task per worker: split the statements first, then the
+        # rows when the wave is narrower than the pool
+        batches = min(len(wave), self.workers)
+        size = -(-len(wave) // batches)
+        chunk = max(1, -(-rows // -(-self.workers // batches)))
+
+        tasks = []
+        for start in range(0, len(wave), size):
+            indices = wave[start:start + size]
+            expressions = [program[i].right for i in indices]
+            needed = [name for name in set().union(*(reads[i] for i in indices)) if name in values]
+            for first in range(0, rows, chunk):
+                last = min(first + chunk, rows)
+                columns = {name: values[name][first:last] for name in needed}
+                tasks.append((start, pool.submit(evaluate_wave, expressions, columns, last - first)))
+
+        results = [[] for _ in wave]
+        for start, task in tasks:
+            # Tasks are in order of statement batch, then of rows
+            for offset, column in enumerate(task.result()):
+                results[start + offset].extend(column)
+        return results
+
+
+def parallel_execute(tree, id_values, workers=None):
+    """
+    Execute a program on a process pool.
+    Returns: (values after the program ran, scheduling statistics)
+    """
+    with ParallelExecutor(workers) as executor:
+        return executor.execute(tree, id_values)
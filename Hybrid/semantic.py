@@ -1,24 +1,30 @@
 from syntax import Node
+from flat_ast import NAME, LITERAL, ASSIGN, SEQ, INT, FLOAT
 
 
 def has_float(node, id_types):
     """Check if expression contains any float values."""
-    if node is None:
-        return False
-    
-    if id_types and node.value in id_types:
-        if id_types[node.value] == 'FLOAT':
-            return True
-    
-    if node.value not in ('+', '-', '*', '/', 'IS'):
-        try:
-            val = float(node.value)
-            if '.' in str(node.value) or isinstance(node.value, float):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+
+        if id_types and node.value in id_types:
+            if id_types[node.value] == 'FLOAT':
                 return True
-        except (ValueError, TypeError):
-            pass
-    
-    return has_float(node.left, id_types) or has_float(node.right, id_types)
+
+        if node.value not in ('+', '-', '*', '/', '^', 'IS', ';'):
+            try:
+                val = float(node.value)
+                if '.' in str(node.value) or isinstance(node.value, float):
+                    return True
+            except (ValueError, TypeError):
+                pass
+
+        stack.append(node.right)
+        stack.append(node.left)
+    return False
 
 
 def is_int_value(value):
@@ -33,30 +39,96 @@ def is_int_value(value):
 
 
 def add_type_conversions(node, needs_conversion, id_types):
+    def converted(node):
+        if needs_conversion and node.value not in ('+', '-', '*', '/', '^', 'IS', ';'):
+            is_int_id = node.value in id_types and id_types[node.value] == 'INT'
+            if is_int_value(node.value) or is_int_id:
+                return Node(node.value, kind=node.kind, type='INT', convert=True)
+        return node
+
     if node is None:
         return None
-    
-    node.left = add_type_conversions(node.left, needs_conversion, id_types)
-    node.right = add_type_conversions(node.right, needs_conversion, id_types)
-    
-    if needs_conversion and node.value not in ('+', '-', '*', '/', 'IS'):
-        is_int_id = node.value in id_types and id_types[node.value] == 'INT'
-        if is_int_value(node.value) or is_int_id:
-            
-            if is_int_id:
-                val = node.value
-            else:
-                val = str(float(node.value))
-            
-            result_node = Node(val)
-            result_node.left = Node("int_to_float")
-            result_node.left.left = Node(node.value)
-            return result_node
-    
-    return node
+
+    # Only values are replaced, and they have no children, so every node
+    # can swap in its children's replacements on the way down
+    stack = [node]
+    while stack:
+        parent = stack.pop()
+        if parent.left is not None:
+            parent.left = converted(parent.left)
+            stack.append(parent.left)
+        if parent.right is not None:
+            parent.right = converted(parent.right)
+            stack.append(parent.right)
+    return converted(node)
+
+
+def analyze_statement(statement, id_types):
+    """Type one statement and record its target's type in the shared symbol table."""
+    needs_conversion = has_float(statement, id_types)
+    statement = add_type_conversions(statement, needs_conversion, id_types)
+
+    if statement is not None and statement.value == 'IS' and statement.left is not None:
+        id_types[statement.left.value] = 'FLOAT' if needs_conversion else 'INT'
+    return statement
 
 
 def semantic_analysis(tree, id_types):
     """Hybrid Semantic Analysis with IS instead of ="""
-    needs_conversion = has_float(tree, id_types)    
-    return add_type_conversions(tree, needs_conversion, id_types)
+    if tree is None or tree.value != ';':
+        return analyze_statement(tree, id_types)
+
+    # Programs are analyzed one statement at a time, in order
+    sequence = []
+    node = tree
+    while node.value == ';':
+        sequence.append(node)
+        node = node.left
+    sequence[-1].left = analyze_statement(sequence[-1].left, id_types)
+    for node in reversed(sequence):
+        node.right = analyze_statement(node.right, id_types)
+    return tree
+
+
+def analyze_flat(ast, id_types):
+    """
+    semantic_analysis for a FlatAST, by index, written into its type and
+    convert columns in place. Statements are contiguous runs of indices
+    (nodes are in post-order), so each is typed as soon as its root is seen.
+    """
+    kind, left, right, ref = ast.kind, ast.left, ast.right, ast.ref
+    types, convert, symbols = ast.type, ast.convert, ast.symbols
+
+    roots = bytearray(len(ast))
+    if len(ast):
+        roots[ast.root] = kind[ast.root] != SEQ
+    for i in range(len(ast)):
+        if kind[i] == SEQ:
+            roots[left[i]] = kind[left[i]] != SEQ
+            roots[right[i]] = 1
+
+    start = 0
+    for i in range(len(ast)):
+        if kind[i] == SEQ:
+            start = i + 1
+            continue
+        if not roots[i]:
+            continue
+
+        leaves = [j for j in range(start, i + 1) if kind[j] in (NAME, LITERAL)]
+        for j in leaves:
+            text = symbols[ref[j]]
+            if kind[j] == NAME:
+                types[j] = FLOAT if id_types.get(text) == 'FLOAT' else INT
+            else:
+                types[j] = FLOAT if '.' in text else INT
+        needs_conversion = any(types[j] == FLOAT for j in leaves)
+        if needs_conversion:
+            for j in leaves:
+                if types[j] == INT and (kind[j] == LITERAL or symbols[ref[j]] in id_types):
+                    convert[j] = 1
+
+        if kind[i] == ASSIGN:
+            id_types[symbols[ref[left[i]]]] = 'FLOAT' if needs_conversion else 'INT'
+        start = i + 1
+    return ast
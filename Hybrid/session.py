@@ -0,0 +1,179 @@
+"""
+Persistent Hybrid session with spreadsheet-style incremental recomputation.
+
+Variables keep their values between equations. Every assignment is kept as
+the formula for its target, and the session tracks which formulas read
+which variables. When a value changes, only the formulas downstream of it
+are re-evaluated, in dependency order.
+"""
+
+from collections import deque
+
+from syntax import statements
+from executor import DirectExecutor
+
+
+def read_identifiers(node):
+    """Identifiers read by an expression tree (leaves that are not literals)."""
+    names = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if n is None:
+            continue
+        if n.left is None and n.right is None:
+            # The lexer only produces identifiers starting with a letter or '_'
+            first = str(n.value)[:1]
+            if first.isalpha() or first == "_":
+                names.add(n.value)
+        else:
+            stack.append(n.left)
+            stack.append(n.right)
+    return names
+
+
+class Session:
+    def __init__(self):
+        self.values = {}        # variable -> current value
+        self.formulas = {}      # target -> RHS tree of its assignment
+        self.reads = {}         # target -> identifiers its formula reads
+        self.dependents = {}    # identifier -> targets whose formula reads it
+        self.executor = DirectExecutor({}, self.values)
+        self.evaluations = 0
+
+    def missing_inputs(self, tree):
+        """Identifiers a program reads that have neither a value nor a formula yet."""
+        missing = []
+        defined = set()
+        for statement in statements(tree):
+            rhs = statement.right if statement.value == "IS" else statement
+            for name in sorted(read_identifiers(rhs)):
+                if name not in self.values and name not in defined and name not in missing:
+                    missing.append(name)
+            if statement.value == "IS":
+                defined.add(statement.left.value)
+        return missing
+
+    def set_value(self, name, value):
+        """
+        Make `name` an input holding `value` (dropping any formula it had)
+        and recompute everything downstream of it.
+        Returns the list of (variable, value) pairs that were updated.
+        """
+        self._remove_formula(name)
+        self.values[name] = value
+        return [(name, value)] + self.recompute([name])
+
+    def define(self, statement, evaluate=None):
+        """
+        Install an `IS` statement as the formula for its target and update
+        dependents. evaluate(statement), if given, computes the statement's
+        value instead of the session's executor, so a caller can record how
+        it was computed without evaluating it a second time.
+        """
+        if statement.value != "IS":
+            raise ValueError("Only assignments can be stored in a session")
+
+        target = statement.left.value
+        rhs = statement.right
+        reads = read_identifiers(rhs)
+
+        unknown = sorted(name for name in reads if name not in self.values)
+        if unknown:
+            raise ValueError(f"No value for {', '.join(unknown)}")
+
+        # x IS x + 1 is an update, not a formula: apply it once
+        if target in reads:
+            return self.set_value(target, self._evaluate_statement(statement, evaluate))
+
+        if self._reaches(target, reads):
+            raise ValueError(f"Circular reference: {target} depends on itself")
+
+        # Evaluated before it is installed, so a formula that fails is not kept
+        value = self._evaluate_statement(statement, evaluate)
+        self._remove_formula(target)
+        self.formulas[target] = rhs
+        self.reads[target] = reads
+        for name in reads:
+            self.dependents.setdefault(name, set()).add(target)
+
+        self.values[target] = value
+        return [(target, self.values[target])] + self.recompute([target])
+
+    def run(self, tree, evaluate=None):
+        """Define every statement of a program in order (see define); returns all updates."""
+        updates = []
+        for statement in statements(tree):
+            updates.extend(self.define(statement, evaluate))
+        return updates
+
+    def recompute(self, changed):
+        """
+        Re-evaluate the formulas downstream of `changed`, each exactly once and
+        only after everything it reads is up to date (Kahn's algorithm over the
+        affected subgraph).
+        """
+        affected = set()
+        queue = deque(changed)
+        while queue:
+            for target in self.dependents.get(queue.popleft(), ()):
+                if target not in affected:
+                    affected.add(target)
+                    queue.append(target)
+        return self._evaluate_in_order(affected)
+
+    def recompute_all(self):
+        """Re-evaluate every formula from scratch (the non-incremental baseline)."""
+        return self._evaluate_in_order(set(self.formulas))
+
+    def _evaluate_in_order(self, affected):
+        if not affected:
+            return []
+
+        pending = {
+            target: sum(1 for name in self.reads[target] if name in affected)
+            for target in affected
+        }
+        ready = deque(target for target, count in pending.items() if count == 0)
+        updates = []
+
+        while ready:
+            target = ready.popleft()
+            self.values[target] = self._evaluate(self.formulas[target])
+            updates.append((target, self.values[target]))
+            for dependent in self.dependents.get(target, ()):
+                if dependent in pending:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        ready.append(dependent)
+        return updates
+
+    def _evaluate(self, rhs):
+        self.evaluations += 1
+        return self.executor.evaluate(rhs)
+
+    def _evaluate_statement(self, statement, evaluate):
+        if evaluate is None:
+            return self._evaluate(statement.right)
+        self.evaluations += 1
+        return evaluate(statement)
+
+    def _remove_formula(self, target):
+        if target not in self.formulas:
+            return
+        for name in self.reads.pop(target):
+            self.dependents[name].discard(target)
+        del self.formulas[target]
+
+    def _reaches(self, target, reads):
+        """True if any of `reads` is (transitively) computed from `target`."""
+        seen = set()
+        stack = [target]
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent in reads:
+                    return True
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return False
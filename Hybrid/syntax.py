@@ -1,10 +1,23 @@
 from lexer import Token
 
+KINDS = {'+': 'op', '-': 'op', '*': 'op', '/': 'op', '^': 'op', 'IS': 'assign', ';': 'seq'}
+
+
 class Node:
-    def __init__(self, value, left=None, right=None):
+    """
+    Syntax tree node. kind is 'op', 'assign', 'seq', 'name' or 'literal';
+    convert is set by semantic analysis on an INT value that is converted
+    to FLOAT where it is used.
+    """
+    __slots__ = ('value', 'left', 'right', 'kind', 'type', 'convert')
+
+    def __init__(self, value, left=None, right=None, kind=None, type=None, convert=False):
         self.value = value
         self.left = left
         self.right = right
+        self.kind = kind or KINDS.get(value) or ('literal' if str(value)[:1].isdigit() else 'name')
+        self.type = type
+        self.convert = convert
     
     def __repr__(self):
         return f"Node({self.value}, {self.left}, {self.right})"
@@ -18,8 +31,10 @@ def build_syntax_tree(tokens):
     
     nodes = []
     for t in tokens:
-        if t.type in ("IDENTIFIER", "INT", "FLOAT"):
-            nodes.append(Node(t.value))
+        if t.type == "IDENTIFIER":
+            nodes.append(Node(t.value, kind="name"))
+        elif t.type in ("INT", "FLOAT"):
+            nodes.append(Node(t.value, kind="literal"))
         elif t.type == "ASSIGN":
             nodes.append("IS")
         else:
@@ -33,29 +48,49 @@ def build_syntax_tree(tokens):
     def parse_expr(expr_list):
         if not expr_list:
             raise ValueError("Empty expression")
-        
-        expr_list = expr_list.copy()
 
-        # Handle parentheses
-        i = 0
-        while i < len(expr_list):
-            if get_value(expr_list[i]) == "(":
-                depth = 1
-                j = i + 1
-                while j < len(expr_list) and depth > 0:
-                    val = get_value(expr_list[j])
-                    if val == "(":
-                        depth += 1
-                    elif val == ")":
-                        depth -= 1
-                    j += 1
-                if depth != 0:
-                    raise ValueError("Unmatched parentheses")
-
-                sub_tree = parse_expr(expr_list[i + 1:j - 1])
-                expr_list[i:j] = [sub_tree]
+        # Handle parentheses: match them first, then reduce each group when
+        # its ')' is reached, keeping the enclosing lists on a stack
+        closing = {}
+        opened = []
+        for i, item in enumerate(expr_list):
+            value = get_value(item)
+            if value == "(":
+                opened.append(i)
+            elif value == ")" and opened:
+                closing[opened.pop()] = i
+        if opened:
+            raise ValueError("Unmatched parentheses")
+
+        enclosing = []      # (index of the group's ')', enclosing items)
+        items = []
+        for i, item in enumerate(expr_list):
+            if get_value(item) == "(":
+                enclosing.append((closing[i], items))
+                items = []
+            elif enclosing and i == enclosing[-1][0]:
+                _, outer = enclosing.pop()
+                outer.append(reduce_expr(items))
+                items = outer
             else:
-                i += 1
+                items.append(item)
+        return reduce_expr(items)
+
+    def reduce_expr(expr_list):
+        """Tree of an expression without parentheses, an item list."""
+        if not expr_list:
+            raise ValueError("Empty expression")
+
+        # Handle ^, right to left: a ^ b ^ c is a ^ (b ^ c)
+        i = len(expr_list) - 2
+        while i > 0:
+            if get_value(expr_list[i]) == "^":
+                left = expr_list[i - 1]
+                right = expr_list[i + 1]
+                if get_value(left) is not None or get_value(right) is not None:
+                    raise ValueError(f"Invalid expression: operator at position {i}")
+                expr_list[i - 1:i + 2] = [Node("^", left, right)]
+            i -= 1
 
         # Handle * and /
         i = 1
@@ -86,22 +121,56 @@ def build_syntax_tree(tokens):
         
         return expr_list[0]
 
-    # Check for IS (assignment)
-    if len(nodes) >= 2:
-        if get_value(nodes[1]) != "IS":
-            raise SyntaxError("Expected 'IS' as the second token")
-
-    is_index = None
-    for i, n in enumerate(nodes):
-        if get_value(n) == "IS":
-            is_index = i
-            break
-
-    if is_index is not None:
-        if is_index == 0 or is_index >= len(nodes) - 1:
-            raise ValueError("Invalid assignment expression")
-        left = nodes[is_index - 1]
-        right = parse_expr(nodes[is_index + 1:])
-        return Node("IS", left, right)
-    else:
-        return parse_expr(nodes)
+    def parse_statement(nodes):
+        # Check for IS (assignment)
+        if len(nodes) >= 2:
+            if get_value(nodes[1]) != "IS":
+                raise SyntaxError("Expected 'IS' as the second token")
+
+        is_index = None
+        for i, n in enumerate(nodes):
+            if get_value(n) == "IS":
+                is_index = i
+                break
+
+        if is_index is not None:
+            if is_index == 0 or is_index >= len(nodes) - 1:
+                raise ValueError("Invalid assignment expression")
+            left = nodes[is_index - 1]
+            right = parse_expr(nodes[is_index + 1:])
+            return Node("IS", left, right)
+        else:
+            return parse_expr(nodes)
+
+    # Split the program into statements on ';' / newline separators
+    program = []
+    start = 0
+    for i, t in enumerate(tokens):
+        if t.type == "SEPARATOR":
+            if i > start:
+                program.append(parse_statement(nodes[start:i]))
+            start = i + 1
+    if start < len(nodes):
+        program.append(parse_statement(nodes[start:]))
+
+    if not program:
+        raise ValueError("Empty token list")
+
+    # Several statements are chained into a left-leaning sequence:
+    # ;(;(s1, s2), s3) so every phase still sees a binary tree.
+    tree = program[0]
+    for statement in program[1:]:
+        tree = Node(";", tree, statement)
+    return tree
+
+
+def statements(tree):
+    """Flatten a (possibly single-statement) program into its statements, in order."""
+    result = []
+    node = tree
+    while node is not None and node.value == ";":
+        result.append(node.right)
+        node = node.left
+    result.append(node)
+    result.reverse()
+    return result
@@ -1,35 +1,74 @@
-from syntax import Node
+import sys
 
-def print_tree(node, prefix="", is_left=True):
-    """Print tree in a visual format."""
-    if node is None:
-        return
-    
-    connector = "├── " if is_left else "└── "
-    print(prefix + connector + str(node.value))
-    
-    new_prefix = prefix + ("│   " if is_left else "    ")
-    
-    if node.left or node.right:
-        if node.left:
-            print_tree(node.left, new_prefix, True)
-        if node.right:
-            print_tree(node.right, new_prefix, False)
-
-
-def convert_tree_to_display(node, id_map):
-    """Convert tree to use V1, V2 notation for display."""
+PLAIN, CONVERTED, INT_TO_FLOAT = range(3)
+
+
+class DisplayNode:
+    """
+    Node-like view of a tree as it is displayed: identifiers show their
+    V-notation label and, with conversions, a converted value is drawn as
+    value -> int_to_float -> operand. Nothing is copied; the view only maps
+    labels when they are read, and child views are made on access.
+    """
+    __slots__ = ('node', 'id_map', 'conversions', 'stage')
+
+    def __init__(self, node, id_map, conversions=True, stage=PLAIN):
+        self.node = node
+        self.id_map = id_map
+        self.conversions = conversions
+        self.stage = stage
+
+    @property
+    def value(self):
+        node = self.node
+        if self.stage == INT_TO_FLOAT:
+            return "int_to_float"
+        if self.stage == CONVERTED and node.kind == 'literal':
+            return str(float(node.value))
+        return self.id_map.get(node.value, node.value)
+
+    @property
+    def left(self):
+        if self.stage == CONVERTED:
+            return DisplayNode(self.node, self.id_map, self.conversions, INT_TO_FLOAT)
+        if self.stage == INT_TO_FLOAT:
+            return DisplayNode(self.node, self.id_map, self.conversions, PLAIN)
+        return display_view(self.node.left, self.id_map, self.conversions)
+
+    @property
+    def right(self):
+        if self.stage != PLAIN:
+            return None
+        return display_view(self.node.right, self.id_map, self.conversions)
+
+    def __repr__(self):
+        return f"DisplayNode({self.value}, {self.left}, {self.right})"
+
+
+def display_view(node, id_map, conversions=True):
+    """The tree in V1, V2 notation for display (see DisplayNode), or None."""
     if node is None:
         return None
-    
-    new_value = node.value
-    
-    # Convert identifier to V-notation
-    if node.value in id_map:
-        new_value = id_map[node.value]
-    
-    new_node = Node(new_value)
-    new_node.left = convert_tree_to_display(node.left, id_map)
-    new_node.right = convert_tree_to_display(node.right, id_map)
-    
-    return new_node
+    stage = CONVERTED if conversions and node.convert else PLAIN
+    return DisplayNode(node, id_map, conversions, stage)
+
+
+def print_tree(node, file=None):
+    """Print tree in a visual format, in one write."""
+    if node is None:
+        return
+
+    lines = []
+    stack = [(node, "", True)]
+    while stack:
+        node, prefix, is_left = stack.pop()
+        lines.append(prefix + ("├── " if is_left else "└── ") + str(node.value))
+
+        new_prefix = prefix + ("│   " if is_left else "    ")
+        if node.right is not None:
+            stack.append((node.right, new_prefix, False))
+        if node.left is not None:
+            stack.append((node.left, new_prefix, True))
+
+    lines.append("")
+    (file or sys.stdout).write("\n".join(lines))
@@ -0,0 +1,406 @@
+"""
+Viewport-virtualized drawing of syntax trees on a Tk canvas.
+
+A TreeModel flattens a tree into arrays indexed by preorder position and
+lays it out once with the tidy layout; it can be built on a worker thread,
+and trees of the same shape share their geometry through a cache. A TreeView only
+keeps canvas items for the nodes that intersect the visible part of the
+scroll region. Items of nodes that scroll out of view are hidden and
+reused for nodes that scroll in. When zoomed out, a subtree whose
+shortest child edge is shorter than LOD_PIXELS on screen is drawn as a
+single summary glyph instead.
+
+Scroll with the mouse wheel (Shift for horizontal), zoom with Ctrl+wheel.
+"""
+
+import bisect
+import math
+
+from tree_layout import tidy_layout, fingerprint, LayoutCache
+
+LOD_PIXELS = 12     # a node whose child edges are shorter than this on screen collapses into a glyph
+MIN_FONT = 6        # labels smaller than this are hidden
+MAX_SCALE = 3.0
+MARGIN = 50
+
+# Everything derived from a tree's shape, shared by all trees of that shape
+GEOMETRY = ("x", "size", "min_x", "max_x", "max_depth", "collapse", "hidden",
+            "width", "height", "levels", "level_x", "reach")
+layout_cache = LayoutCache()
+
+
+class TreeModel:
+    def __init__(self, root, h_spacing=70, v_spacing=80):
+        self.h_spacing = h_spacing
+        self.v_spacing = v_spacing
+
+        labels = []
+        parent = []
+        depth = []
+        left = []
+        right = []
+
+        # Iterative preorder: expression trees can be as deep as they are long
+        stack = [(root, -1, 0, False)] if root is not None else []
+        while stack:
+            node, p, d, is_right = stack.pop()
+            i = len(labels)
+            labels.append(str(node.value))
+            parent.append(p)
+            depth.append(d)
+            left.append(-1)
+            right.append(-1)
+            if p >= 0:
+                if is_right:
+                    right[p] = i
+                else:
+                    left[p] = i
+            if node.right is not None:
+                stack.append((node.right, i, d + 1, True))
+            if node.left is not None:
+                stack.append((node.left, i, d + 1, False))
+
+        self.labels = labels
+        self.parent = parent
+        self.depth = depth
+        self.left = left
+        self.right = right
+
+        key = fingerprint(left, right, h_spacing, v_spacing)
+        geometry = layout_cache.get(key)
+        if geometry is None:
+            self.x = tidy_layout(left, right, parent, h_spacing)
+            self.summarize()
+            layout_cache.put(key, {name: getattr(self, name) for name in GEOMETRY})
+        else:
+            self.__dict__.update(geometry)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def summarize(self):
+        """Subtree sizes and extents, plus a per-level index for viewport queries."""
+        n = len(self.labels)
+        x, depth, parent = self.x, self.depth, self.parent
+
+        size = [1] * n
+        min_x = list(x)
+        max_x = list(x)
+        max_depth = list(depth)
+        for i in range(n - 1, 0, -1):
+            p = parent[i]
+            size[p] += size[i]
+            if min_x[i] < min_x[p]:
+                min_x[p] = min_x[i]
+            if max_x[i] > max_x[p]:
+                max_x[p] = max_x[i]
+            if max_depth[i] > max_depth[p]:
+                max_depth[p] = max_depth[i]
+
+        # A subtree collapses into a glyph below scale collapse[i], where its
+        # shortest child edge gets shorter than LOD_PIXELS. A node is hidden
+        # below hidden[i], the largest collapse scale of its ancestors.
+        collapse = [0.0] * n
+        for i in range(1, n):
+            p = parent[i]
+            scale = LOD_PIXELS / math.hypot(x[i] - x[p], self.v_spacing)
+            if scale > collapse[p]:
+                collapse[p] = scale
+        hidden = [0.0] * n
+        for i in range(1, n):
+            p = parent[i]
+            hidden[i] = max(hidden[p], collapse[p])
+
+        self.size = size
+        self.min_x = min_x
+        self.max_x = max_x
+        self.max_depth = max_depth
+        self.collapse = collapse
+        self.hidden = hidden
+        self.width = max_x[0] - min_x[0] if n else 0
+        self.height = max_depth[0] * self.v_spacing if n else 0
+
+        levels = [[] for _ in range(max_depth[0] + 1)] if n else []
+        for i in range(n):
+            levels[depth[i]].append(i)
+        self.levels = []
+        self.level_x = []
+        self.reach = []     # (left, right) distance a subtree or parent edge extends from its root
+        for level in levels:
+            level.sort(key=x.__getitem__)
+            reach_left = reach_right = 0
+            for i in level:
+                edge = abs(x[parent[i]] - x[i]) if parent[i] >= 0 else 0
+                reach_left = max(reach_left, x[i] - min_x[i], edge)
+                reach_right = max(reach_right, max_x[i] - x[i], edge)
+            self.levels.append(level)
+            self.level_x.append([x[i] for i in level])
+            self.reach.append((reach_left, reach_right))
+
+
+class TreeView:
+    def __init__(self, canvas, color=None, radius=20):
+        self.canvas = canvas
+        self.color = color or (lambda value: "#007acc")
+        self.radius = radius
+        self.model = None
+        self.scale = 1.0
+        self.min_scale = 1.0
+        self.offset_x = MARGIN
+        self.offset_y = MARGIN
+        self.region = (0, 0)
+        self.pending = None
+        self.relayout = False
+        self.reset_items()
+
+        canvas.bind("<Configure>", lambda e: self.resize())
+        canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", int(-1*(e.delta/120)), "units"))
+        canvas.bind("<Shift-MouseWheel>", lambda e: self.xview("scroll", int(-1*(e.delta/120)), "units"))
+        canvas.bind("<Control-MouseWheel>", lambda e: self.zoom(1.25 if e.delta > 0 else 0.8, e.x, e.y))
+        # X11 reports the wheel as buttons 4 and 5
+        canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        canvas.bind("<Shift-Button-4>", lambda e: self.xview("scroll", -1, "units"))
+        canvas.bind("<Shift-Button-5>", lambda e: self.xview("scroll", 1, "units"))
+        canvas.bind("<Control-Button-4>", lambda e: self.zoom(1.25, e.x, e.y))
+        canvas.bind("<Control-Button-5>", lambda e: self.zoom(0.8, e.x, e.y))
+
+    def reset_items(self):
+        self.nodes = {}     # node index -> (oval, text)
+        self.edges = {}     # child index -> line from its parent
+        self.glyphs = {}    # node index -> (polygon, text) summarizing its subtree
+        self.free_nodes = []
+        self.free_edges = []
+        self.free_glyphs = []
+
+    def clear(self):
+        self.canvas.delete("all")
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.model = None
+        self.reset_items()
+
+    def show(self, model):
+        self.clear()
+        if model is None or not len(model):
+            return
+        self.model = model
+        self.scale = 1.0
+        self.update_region()
+        # Start with the root in view
+        root_x = self.offset_x + model.x[0] * self.scale
+        self.canvas.xview_moveto((root_x - self.canvas.winfo_width() / 2) / self.region[0])
+        self.canvas.yview_moveto(0)
+        self.redraw()
+
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_redraw()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_redraw()
+
+    def resize(self):
+        if self.model is not None:
+            self.update_region()
+            self.schedule_redraw(relayout=True)
+
+    def zoom(self, factor, x=None, y=None):
+        if self.model is None:
+            return
+        scale = min(max(self.scale * factor, self.min_scale), MAX_SCALE)
+        if scale == self.scale:
+            return
+
+        canvas = self.canvas
+        if x is None:
+            x, y = canvas.winfo_width() / 2, canvas.winfo_height() / 2
+        # Keep the point under the pointer in place
+        world_x = (canvas.canvasx(x) - self.offset_x) / self.scale
+        world_y = (canvas.canvasy(y) - self.offset_y) / self.scale
+        self.scale = scale
+        self.update_region()
+        width, height = self.region
+        canvas.xview_moveto((self.offset_x + world_x * scale - x) / width)
+        canvas.yview_moveto((self.offset_y + world_y * scale - y) / height)
+        self.schedule_redraw(relayout=True)
+
+    def update_region(self):
+        canvas = self.canvas
+        canvas_width = canvas.winfo_width()
+        canvas_height = canvas.winfo_height()
+        if canvas_width < 100:
+            canvas_width = 960
+        if canvas_height < 100:
+            canvas_height = 600
+
+        model = self.model
+        self.min_scale = min(1.0, canvas_width / (model.width + 2 * MARGIN),
+                             canvas_height / (model.height + 2 * MARGIN))
+        tree_width = model.width * self.scale
+        tree_height = model.height * self.scale
+
+        if canvas_width > tree_width + 2 * MARGIN:
+            self.offset_x = (canvas_width - tree_width) / 2 - model.min_x[0] * self.scale
+        else:
+            self.offset_x = MARGIN - model.min_x[0] * self.scale
+        self.offset_y = MARGIN
+
+        self.region = (max(canvas_width, tree_width + 2 * MARGIN), max(canvas_height, tree_height + 2 * MARGIN))
+        canvas.configure(scrollregion=(0, 0) + self.region)
+
+    def schedule_redraw(self, relayout=False):
+        if relayout:
+            # Scale or offset changed: every item on the canvas is misplaced
+            self.relayout = True
+        if self.pending is None and self.model is not None:
+            self.pending = self.canvas.after_idle(self.redraw)
+
+    def redraw(self):
+        self.pending = None
+        model = self.model
+        if model is None:
+            return
+
+        canvas = self.canvas
+        s = self.scale
+        r = self.radius * s
+        view_left = canvas.canvasx(0)
+        view_top = canvas.canvasy(0)
+        view_right = view_left + max(canvas.winfo_width(), 100)
+        view_bottom = view_top + max(canvas.winfo_height(), 100)
+
+        # Visible window in layout coordinates, padded by a node radius
+        wl = (view_left - self.offset_x - r) / s
+        wr = (view_right - self.offset_x + r) / s
+        wt = (view_top - self.offset_y - r) / s
+        wb = (view_bottom - self.offset_y + r) / s
+        v = model.v_spacing
+        top = max(0, math.ceil(wt / v))
+        bottom = min(len(model.levels) - 1, math.floor(wb / v))
+        want_nodes, want_edges, want_glyphs = set(), set(), set()
+        if top <= bottom + 1 and top < len(model.levels):
+            x, parent = model.x, model.parent
+            min_x, max_x, size = model.min_x, model.max_x, model.size
+            left, right, depth = model.left, model.right, model.depth
+
+            collapse = model.collapse
+            stack = self.entry_points(top, wl, wr)
+            while stack:
+                i = stack.pop()
+                p = parent[i]
+                if p >= 0 and depth[p] >= top - 1:
+                    lo, hi = (x[p], x[i]) if x[p] < x[i] else (x[i], x[p])
+                    if hi >= wl and lo <= wr:
+                        want_edges.add(i)
+                if max_x[i] < wl or min_x[i] > wr or depth[i] > bottom:
+                    continue
+                if s < collapse[i]:
+                    want_glyphs.add(i)
+                    continue
+                if wl <= x[i] <= wr and depth[i] >= top:
+                    want_nodes.add(i)
+                if left[i] >= 0:
+                    stack.append(left[i])
+                if right[i] >= 0:
+                    stack.append(right[i])
+
+        relayout, self.relayout = self.relayout, False
+        self.sync(self.edges, self.free_edges, want_edges, self.new_edge, self.place_edge, relayout)
+        self.sync(self.glyphs, self.free_glyphs, want_glyphs, self.new_glyph, self.place_glyph, relayout)
+        self.sync(self.nodes, self.free_nodes, want_nodes, self.new_node, self.place_node, relayout)
+        canvas.tag_lower("edge")
+
+    def entry_points(self, top, wl, wr):
+        """Subtrees rooted on the topmost visible level that can reach the window."""
+        model = self.model
+        if top == 0:
+            return [0]
+
+        x, parent, hidden = model.x, model.parent, model.hidden
+        min_x, max_x = model.min_x, model.max_x
+        reach_left, reach_right = model.reach[top]
+        level, level_x = model.levels[top], model.level_x[top]
+        lo = bisect.bisect_left(level_x, wl - reach_right)
+        hi = bisect.bisect_right(level_x, wr + reach_left)
+
+        entries = set()
+        for i in level[lo:hi]:
+            p = parent[i]
+            edge_lo, edge_hi = (x[p], x[i]) if x[p] < x[i] else (x[i], x[p])
+            if (max_x[i] < wl or min_x[i] > wr) and (edge_hi < wl or edge_lo > wr):
+                continue
+            # Under a collapsed ancestor the glyph of that ancestor is drawn instead
+            while self.scale < hidden[i]:
+                i = parent[i]
+            entries.add(i)
+        return list(entries)
+
+    def sync(self, drawn, free, wanted, create, place, relayout):
+        canvas = self.canvas
+        for key in [key for key in drawn if key not in wanted]:
+            items = drawn.pop(key)
+            for item in items:
+                canvas.itemconfigure(item, state="hidden")
+            free.append(items)
+        for key in wanted:
+            if key in drawn:
+                if relayout:
+                    place(key, drawn[key])
+                continue
+            items = free.pop() if free else create()
+            place(key, items)
+            drawn[key] = items
+
+    def position(self, i):
+        model = self.model
+        return (self.offset_x + model.x[i] * self.scale,
+                self.offset_y + model.depth[i] * model.v_spacing * self.scale)
+
+    def font(self):
+        size = round(10 * self.scale)
+        return ("Segoe UI", min(size, 30), "bold"), size >= MIN_FONT
+
+    def new_node(self):
+        return (self.canvas.create_oval(0, 0, 0, 0, outline="white", width=2, tags="node"),
+                self.canvas.create_text(0, 0, fill="white", tags="node"))
+
+    def place_node(self, i, items):
+        oval, text = items
+        x, y = self.position(i)
+        r = max(self.radius * self.scale, 1.5)
+        label = self.model.labels[i]
+        font, readable = self.font()
+        self.canvas.coords(oval, x - r, y - r, x + r, y + r)
+        self.canvas.itemconfigure(oval, fill=self.color(label), width=2 if r > 6 else 1, state="normal")
+        self.canvas.coords(text, x, y)
+        self.canvas.itemconfigure(text, text=label, font=font, state="normal" if readable else "hidden")
+
+    def new_edge(self):
+        return (self.canvas.create_line(0, 0, 0, 0, fill="#888888", width=2, tags="edge"),)
+
+    def place_edge(self, i, items):
+        x1, y1 = self.position(self.model.parent[i])
+        x2, y2 = self.position(i)
+        self.canvas.coords(items[0], x1, y1, x2, y2)
+        self.canvas.itemconfigure(items[0], width=2 if self.scale > 0.3 else 1, state="normal")
+
+    def new_glyph(self):
+        return (self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="#555555", outline="#888888", tags="glyph"),
+                self.canvas.create_text(0, 0, fill="#dddddd", font=("Segoe UI", 8), tags="glyph"))
+
+    def place_glyph(self, i, items):
+        polygon, text = items
+        model = self.model
+        s = self.scale
+        x, y = self.position(i)
+        x_left = self.offset_x + model.min_x[i] * s
+        x_right = self.offset_x + model.max_x[i] * s
+        y_bottom = self.offset_y + model.max_depth[i] * model.v_spacing * s
+        # A wedge covering the collapsed subtree's extent, at least a few pixels wide
+        half = max((x_right - x_left) / 2, 3)
+        middle = (x_left + x_right) / 2
+        self.canvas.coords(polygon, x, y, middle - half, max(y_bottom, y + 6), middle + half, max(y_bottom, y + 6))
+        self.canvas.itemconfigure(polygon, fill=self.color(model.labels[i]), state="normal")
+        self.canvas.coords(text, middle, max(y_bottom, y + 6) + 8)
+        self.canvas.itemconfigure(text, text=f"{model.size[i]}", state="normal" if y_bottom - y > 30 else "hidden")